@@ -0,0 +1,256 @@
+# admission.py
+# -*- coding: utf-8 -*-
+# Gemini 앞단 입장 제어 (API 키별).
+#  - 동시 실행 수 제한(max_concurrent)
+#  - 분당 토큰 버킷(tokens_per_min): 입장 시 추정 토큰을 예약하고, 응답의 usageMetadata로 실제 값에 맞춰 정산
+#  - 우선순위 대기열(작을수록 먼저: 전화 턴 > 채팅 턴 > 요약 > 피드백), 길이 제한(max_queue)
+#  - 대기열이 가득 차거나 대기 시간이 다하면 Overloaded(retry_after) → 호출부가 503 + Retry-After로 응답
+#  - acquire(스레드에서 Condition 대기) / acquire_async(이벤트 루프에서 future 대기, 스레드를 잡지 않음)는 같은 대기열을 쓴다
+import asyncio, hashlib, heapq, itertools, math, threading, time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+PRIORITY = {"call": 0, "chat": 1, "summary": 2, "feedback": 3}
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: float, reason: str = "queue full"):
+        super().__init__(f"{reason} (retry after {retry_after:.0f}s)")
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+class Ticket:
+    __slots__ = ("cost", "actual")
+
+    def __init__(self, cost):
+        self.cost, self.actual = cost, None
+
+    def settle(self, tokens):
+        """응답의 실제 토큰 수(prompt + output). 반납 시 예약분과의 차이를 버킷에 반영한다."""
+        self.actual = tokens
+
+
+class KeyLimiter:
+    def __init__(self, max_concurrent: int = 8, tokens_per_min: int = 1_000_000,
+                 max_queue: int = 32, max_wait: float = 10.0):
+        self.max_concurrent = max_concurrent
+        self.capacity = float(tokens_per_min)
+        self.rate = tokens_per_min / 60.0
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._active = 0
+        self._waiters = []     # heap of [priority, seq]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._futures = {}     # acquire_async 대기자: future -> 그 이벤트 루프
+        self._pins = 0         # Admission.pinned() 중인 호출 수 (Admission._lock으로 보호)
+        self._stats = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0, "throttled": 0,
+                       "wait_ms": 0.0, "busy_ms": 0.0, "tokens_reserved": 0, "tokens_used": 0}
+
+    # ───── 입장/반납 ─────
+    def acquire(self, priority: int, cost: int, timeout: float = None) -> Ticket:
+        cost = min(max(0, int(cost)), int(self.capacity))
+        t0 = time.monotonic()
+        with self._cond:
+            queued = self._enqueue(priority, cost, t0, timeout)
+            if isinstance(queued, Ticket): return queued
+            try:
+                while True:
+                    r = self._step(queued, cost, t0)
+                    if isinstance(r, Ticket): return r
+                    self._cond.wait(r)
+            finally:
+                self._dequeue(queued)
+
+    async def acquire_async(self, priority: int, cost: int, timeout: float = None) -> Ticket:
+        """acquire와 같은 규칙. 대기는 스레드 대신 future로 하고 반납/대기열 변화 때 깨운다."""
+        loop = asyncio.get_running_loop()
+        cost = min(max(0, int(cost)), int(self.capacity))
+        t0 = time.monotonic()
+        with self._cond:
+            queued = self._enqueue(priority, cost, t0, timeout)
+            if isinstance(queued, Ticket): return queued
+        try:
+            while True:
+                fut = loop.create_future()
+                with self._cond:
+                    r = self._step(queued, cost, t0)
+                    if isinstance(r, Ticket): return r
+                    self._futures[fut] = loop
+                try:
+                    await asyncio.wait([fut], timeout=r)
+                finally:
+                    with self._cond: self._futures.pop(fut, None)
+        finally:
+            with self._cond: self._dequeue(queued)
+
+    def release(self, ticket: Ticket, busy_ms: float = 0.0):
+        with self._cond:
+            self._active -= 1
+            self._stats["busy_ms"] += busy_ms
+            if ticket.actual is not None:
+                self._tokens += ticket.cost - ticket.actual     # 예약보다 많이 썼으면 차감, 적게 썼으면 환급
+                self._stats["tokens_used"] += ticket.actual
+            self._wake()
+
+    def throttle(self):
+        # 업스트림이 429를 돌려줬다 = 실제 한도가 설정보다 빡빡하다 → 버킷을 비워 보충될 때까지 새 입장을 멈춘다
+        with self._cond:
+            self._tokens = min(self._tokens, 0.0)
+            self._stats["throttled"] += 1
+
+    def saturated(self):
+        """대기열이 가득 찼으면 retry_after(초), 아니면 None. 턴을 시작하기 전 빠른 거절용."""
+        with self._cond:
+            if len(self._waiters) < self.max_queue: return None
+            self._stats["rejected"] += 1
+            return Overloaded(self._retry_after(0)).retry_after
+
+    def idle(self) -> bool:
+        with self._cond: return self._pins == 0 and self._active == 0 and not self._waiters
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            s = dict(self._stats, active=self._active, waiting=len(self._waiters), tokens=int(self._tokens),
+                     max_concurrent=self.max_concurrent, tokens_per_min=int(self.capacity), max_queue=self.max_queue)
+        n = s["admitted"]
+        s["avg_wait_ms"] = round(s.pop("wait_ms") / n, 1) if n else 0.0
+        s["avg_busy_ms"] = round(s.pop("busy_ms") / n, 1) if n else 0.0
+        return s
+
+    # ───── 내부 (잠금 보유 상태에서 호출) ─────
+    def _enqueue(self, priority, cost, t0, timeout):
+        # 바로 들어갈 수 있으면 Ticket, 아니면 대기열에 넣고 (entry, deadline)
+        self._refill(t0)
+        if not self._waiters and self._ready(cost): return self._grant(cost, t0)
+        if len(self._waiters) >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise Overloaded(self._retry_after(cost))
+        entry = [priority, next(self._seq)]
+        heapq.heappush(self._waiters, entry)
+        self._stats["queued"] += 1
+        return entry, t0 + min(self.max_wait, timeout if timeout is not None else self.max_wait)
+
+    def _step(self, queued, cost, t0):
+        # 차례가 왔으면 Ticket, 아니면 다시 확인할 때까지 기다릴 초
+        entry, deadline = queued
+        now = time.monotonic()
+        self._refill(now)
+        if self._waiters[0] is entry and self._ready(cost):
+            heapq.heappop(self._waiters)
+            self._wake()                     # 다음 대기자가 자기 차례인지 다시 확인
+            return self._grant(cost, t0)
+        if now >= deadline:
+            self._stats["timed_out"] += 1
+            raise Overloaded(self._retry_after(cost), "queue wait timed out")
+        wait = deadline - now
+        if self._active < self.max_concurrent and self._tokens < cost:
+            wait = min(wait, (cost - self._tokens) / self.rate + 0.001)   # 토큰 보충 시각에 깨어남
+        return wait
+
+    def _dequeue(self, queued):
+        entry, _ = queued
+        if entry in self._waiters:
+            self._waiters.remove(entry); heapq.heapify(self._waiters)
+            self._wake()
+
+    def _wake(self):
+        self._cond.notify_all()
+        futures, self._futures = self._futures, {}
+        for fut, loop in futures.items():
+            try: loop.call_soon_threadsafe(_resolve, fut)
+            except RuntimeError: pass        # 이미 닫힌 루프
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def _ready(self, cost):
+        return self._active < self.max_concurrent and self._tokens >= cost
+
+    def _grant(self, cost, t0):
+        self._active += 1
+        self._tokens -= cost
+        self._stats["admitted"] += 1
+        self._stats["tokens_reserved"] += cost
+        self._stats["wait_ms"] += (time.monotonic() - t0) * 1000
+        return Ticket(cost)
+
+    def _retry_after(self, cost):
+        # 토큰 부족분 보충 시간과 대기열이 빠지는 예상 시간 중 큰 값
+        deficit = max(0.0, cost - self._tokens) / self.rate
+        n = self._stats["admitted"]
+        avg = (self._stats["busy_ms"] / n / 1000) if n else 1.0
+        drain = avg * (len(self._waiters) + 1) / max(1, self.max_concurrent)
+        return max(deficit, drain, 1.0)
+
+
+def _resolve(fut):
+    if not fut.done(): fut.set_result(None)
+
+
+class Admission:
+    """API 키별 KeyLimiter 묶음. 클라이언트가 X-API-Key로 아무 키나 보낼 수 있으므로
+    최근에 쓴 max_keys개까지만 두고, 넘치면 가장 오래 안 쓴 유휴(진행·대기 없음) 리미터부터 버린다."""
+
+    def __init__(self, max_keys: int = 64, **limits):
+        self.limits = limits
+        self.max_keys = max_keys
+        self._keys = OrderedDict()     # api_key -> KeyLimiter (최근 사용 순)
+        self._lock = threading.Lock()
+
+    def limiter(self, api_key: str) -> KeyLimiter:
+        """단발 조작(throttle 등)용. 입장~반납처럼 이어지는 사용은 pinned()로 — 그 사이 내보내지지 않게."""
+        with self._lock: return self._get(api_key, pin=False)
+
+    @contextmanager
+    def pinned(self, api_key: str):
+        """블록 동안 api_key의 리미터를 맵에 붙잡아 둔다 (다른 키 삽입이 유휴로 보고 내보내지 않게)."""
+        with self._lock: lim = self._get(api_key, pin=True)
+        try:
+            yield lim
+        finally:
+            with self._lock: lim._pins -= 1
+
+    def _get(self, api_key, pin):
+        # _lock 보유 상태에서 호출. 새 리미터는 내보내기 전에 고정해 방금 만든 것이 바로 빠지지 않게
+        lim = self._keys.get(api_key)
+        if lim is None:
+            lim = self._keys[api_key] = KeyLimiter(**self.limits)
+            lim._pins += 1
+            self._evict()
+            lim._pins -= 1
+        else:
+            self._keys.move_to_end(api_key)
+        if pin: lim._pins += 1
+        return lim
+
+    def _evict(self):
+        # 바쁜 리미터는 남긴다 (진행 중 슬롯 반납/대기자가 같은 객체를 써야 하므로) → 넘침은 진행 중인 키 수까지만
+        over = len(self._keys) - self.max_keys
+        for k in [k for k, lim in self._keys.items() if lim.idle()][:max(0, over)]:
+            del self._keys[k]
+
+    @contextmanager
+    def slot(self, api_key: str, priority: int, cost: int, timeout: float = None):
+        with self.pinned(api_key) as lim:
+            ticket = lim.acquire(priority, cost, timeout)
+            t0 = time.monotonic()
+            try:
+                yield ticket
+            finally:
+                lim.release(ticket, (time.monotonic() - t0) * 1000)
+
+    def saturated(self, api_key: str):
+        if not api_key: return None
+        with self.pinned(api_key) as lim: return lim.saturated()
+
+    def stats(self) -> dict:
+        with self._lock: items = list(self._keys.items())
+        # 키 원문은 노출하지 않는다. 끝 4자가 같은 키끼리 덮어쓰지 않게 짧은 해시를 붙인다
+        return {f"key…{k[-4:]}#{hashlib.sha256(k.encode()).hexdigest()[:6]}" if k else "none": lim.stats()
+                for k, lim in items}
@@ -0,0 +1,322 @@
+# analytics_store.py
+# -*- coding: utf-8 -*-
+# 종료 세션 분석 저장소 (Parquet, 날짜 파티션: <root>/date=YYYY-MM-DD/part-*.parquet).
+#  - 기록: record_session()/record_feedback()은 메모리 버퍼에만 넣고, flush_rows건 또는 flush_interval초마다
+#          날짜별 파일 하나씩 일괄 기록(zstd). 점수는 보통 flush 전에 도착해 버퍼의 행에 바로 채워진다.
+#          이미 기록된 세션의 늦은 점수는 파일을 고치지 않고 보정 행 두 개(weight -1: 점수 없음 / +1: 점수)를 덧붙인다
+#  - 조회: 파일마다 필요한 열만 배치 단위로 읽어 (mode, scenario, score, rounds)별 가중 합계 큐브를 만들고 캐시한다.
+#          파일은 쓰고 나면 바뀌지 않으므로 큐브도 그대로 유효 → 질의는 작은 큐브들 + 버퍼분을 합쳐 분포/평균/추세 계산
+#          (전체 행을 메모리에 올리지 않는다)
+#  - compact(date): 한 파티션의 작은 파일들을 하나로 합친다
+#
+#   python analytics_store.py summary [--root analytics] [--from 2025-01-01] [--to 2025-12-31]
+#   python analytics_store.py compact [--root analytics] [--before 2025-06-01]
+import argparse, atexit, json, logging, os, threading, time, uuid
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+log = logging.getLogger("onair")
+
+SCHEMA = pa.schema([
+    ("session_id", pa.string()), ("ts", pa.timestamp("ms")), ("mode", pa.string()), ("scenario", pa.string()),
+    ("topic", pa.string()), ("rounds", pa.int16()), ("max_rounds", pa.int16()), ("replies", pa.int16()),
+    ("fallbacks", pa.int16()), ("duration_s", pa.float32()), ("score", pa.int8()), ("weight", pa.int8()),
+    ("transcript", pa.string()),
+])
+CUBE_KEYS = ["mode", "scenario", "score", "rounds"]
+CUBE_SUMS = ["n", "fallbacks", "replies", "duration_s", "timed"]
+_READ_COLUMNS = ["mode", "scenario", "score", "rounds", "weight", "fallbacks", "replies", "duration_s"]
+
+
+def _date(ts_ms: int) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(ts_ms / 1000))
+
+
+def _cube(tbl: pa.Table) -> pa.Table:
+    """행 테이블 → CUBE_KEYS별 가중 합계 (weight가 보정 행의 ±1을 반영)."""
+    w = pc.cast(tbl["weight"], pa.int64())
+    dur = pc.cast(tbl["duration_s"], pa.float64())
+    t = pa.table({**{k: tbl[k] for k in CUBE_KEYS},
+                  "n": w,
+                  "fallbacks": pc.multiply(w, pc.cast(tbl["fallbacks"], pa.int64())),
+                  "replies": pc.multiply(w, pc.cast(tbl["replies"], pa.int64())),
+                  "duration_s": pc.multiply(pc.cast(w, pa.float64()), pc.fill_null(dur, 0.0)),
+                  "timed": pc.if_else(pc.is_valid(dur), w, 0)})
+    return _merge([t])
+
+
+def _merge(cubes) -> pa.Table:
+    t = pa.concat_tables(cubes)
+    out = t.group_by(CUBE_KEYS).aggregate([(c, "sum") for c in CUBE_SUMS])
+    return out.rename_columns([c[:-4] if c.endswith("_sum") else c for c in out.column_names])
+
+
+_ROLLUP_SUMS = ["n", "scored", "score_w", "rounds_w", "fallbacks", "replies", "duration_s", "timed"]
+
+
+def _rollups(df: pd.DataFrame, by=None) -> list:
+    """큐브 → 그룹별 세션 수/평균 점수/평균 라운드/폴백 비율/평균 소요. 그룹 하나당 Python 루프 없이 groupby 한 번."""
+    scored = df["score"].notna()
+    df = df.assign(scored=df["n"].where(scored, 0), score_w=(df["score"].fillna(0) * df["n"]),
+                   rounds_w=df["rounds"] * df["n"])
+    g = df.groupby(by, dropna=False, sort=True)[_ROLLUP_SUMS].sum().reset_index() if by \
+        else df[_ROLLUP_SUMS].sum().to_frame().T
+    out = []
+    for r in g.to_dict("records"):
+        n, n_scored, replies, timed = int(r["n"]), int(r["scored"]), int(r["replies"]), int(r["timed"])
+        out.append({**{k: (None if pd.isna(r[k]) else r[k]) for k in (by or [])},
+                    "sessions": n,
+                    "scored": n_scored,
+                    "avg_score": round(float(r["score_w"]) / n_scored, 3) if n_scored else None,
+                    "avg_rounds": round(float(r["rounds_w"]) / n, 3) if n else None,
+                    "fallback_rate": round(int(r["fallbacks"]) / replies, 4) if replies else None,
+                    "avg_duration_s": round(float(r["duration_s"]) / timed, 1) if timed else None})
+    return out
+
+
+def _dist(df: pd.DataFrame, col: str, by=None) -> dict:
+    s = df[df[col].notna()].groupby([*(by or []), col], dropna=False)["n"].sum()
+    s = s[s != 0]
+    if not by: return {int(k): int(v) for k, v in s.items()}
+    out = {}
+    for k, v in s.items(): out.setdefault(tuple(None if pd.isna(x) else x for x in k[:-1]), {})[int(k[-1])] = int(v)
+    return out
+
+
+class AnalyticsStore:
+    def __init__(self, root: str, flush_rows: int = 1000, flush_interval: float = 30.0, recent_max: int = 5000):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.recent_max = recent_max
+        os.makedirs(root, exist_ok=True)
+        self._pending = OrderedDict()     # session_id -> 행 (아직 파일에 안 쓴 것)
+        self._corrections = []            # 늦은 점수 보정 행
+        self._recent = OrderedDict()      # 최근 기록한 세션의 차원 값 (늦은 점수 보정용)
+        self._inflight = {}               # flush가 쓰는 중인 세션 -> 그 사이 도착한 점수
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._files_lock = threading.Lock()    # 파일 목록 조회 vs compact 교체
+        self._file_cubes = {}                  # 경로 -> 큐브 (파일은 불변)
+        self._cubes_lock = threading.Lock()    # _file_cubes (동시 summary 요청 / compact)
+        self._stats = {"sessions": 0, "scores": 0, "late_scores": 0, "late_dropped": 0,
+                       "flushes": 0, "files_written": 0, "rows_written": 0, "cube_builds": 0}
+        self._stop = threading.Event()
+        self._wake = threading.Event()          # flush_rows에 닿으면 기록 스레드 대신 _flusher가 쓰도록 깨움
+        threading.Thread(target=self._flusher, name="analytics-flush", daemon=True).start()
+        atexit.register(self.flush)
+
+    # ───── 기록 ─────
+    def record_session(self, session_id: str, ts: float, mode: str, scenario: str = None, topic: str = None,
+                       rounds: int = 0, max_rounds: int = None, replies: int = 0, fallbacks: int = 0,
+                       duration_s: float = None, score: int = None, transcript=None):
+        row = {"session_id": session_id, "ts": int(ts * 1000), "mode": mode, "scenario": scenario, "topic": topic,
+               "rounds": int(rounds), "max_rounds": None if max_rounds is None else int(max_rounds),
+               "replies": int(replies), "fallbacks": int(fallbacks),     # 형이 어긋난 행 하나가 배치 전체를 막지 않게
+               "duration_s": None if duration_s is None else float(duration_s), "score": int(score) if score else None,
+               "weight": 1,
+               "transcript": transcript if transcript is None or isinstance(transcript, str)
+               else json.dumps(transcript, ensure_ascii=False)}
+        with self._lock:
+            self._pending[session_id] = row
+            self._stats["sessions"] += 1
+            full = len(self._pending) + len(self._corrections) >= self.flush_rows
+        if full: self._wake.set()           # 세션 종료 턴(세션 잠금 보유 중)에서 Parquet 쓰기를 하지 않게
+
+    def record_feedback(self, session_id: str, score: int):
+        with self._lock:
+            self._stats["scores"] += 1
+            row = self._pending.get(session_id)
+            if row is not None:
+                row["score"] = score
+                return
+            if session_id in self._inflight:
+                self._inflight[session_id] = score
+                return
+            prev = self._recent.get(session_id)
+            if prev is None:
+                self._stats["late_dropped"] += 1
+                return
+            if prev["score"] == score: return
+            self._stats["late_scores"] += 1
+            self._corrections.append(dict(prev, weight=-1))
+            self._recent[session_id] = prev = dict(prev, score=score)
+            self._corrections.append(dict(prev, weight=1))
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                sessions, corrections = list(self._pending.values()), self._corrections
+                self._pending, self._corrections = OrderedDict(), []
+                self._inflight = {r["session_id"]: None for r in sessions}
+            if not sessions and not corrections: return 0
+            by_date = {}
+            for r in sessions + corrections: by_date.setdefault(_date(r["ts"]), []).append(r)
+            written = set()
+            try:
+                for date, rs in by_date.items():
+                    self._write(date, pa.Table.from_pylist(rs, SCHEMA))
+                    written.add(date)
+            except Exception:
+                log.exception("[analytics] flush failed; will retry")
+            with self._lock:
+                for r in sessions:
+                    sid, late = r["session_id"], self._inflight.get(r["session_id"])   # 쓰는 도중 도착한 점수
+                    if _date(r["ts"]) not in written:
+                        if late is not None: r["score"] = late
+                        self._pending.setdefault(sid, r)       # 다음 flush 때 다시 시도
+                        continue
+                    prev = self._recent[sid] = dict(r, transcript=None)
+                    if late is not None and late != r["score"]:
+                        self._stats["late_scores"] += 1
+                        self._recent[sid] = dict(prev, score=late)
+                        self._corrections += [dict(prev, weight=-1), dict(prev, score=late, weight=1)]
+                self._inflight = {}
+                self._corrections[:0] = [r for r in corrections if _date(r["ts"]) not in written]
+                while len(self._recent) > self.recent_max: self._recent.popitem(last=False)
+                n = sum(len(rs) for d, rs in by_date.items() if d in written)
+                self._stats["flushes"] += 1
+                self._stats["rows_written"] += n
+            return n
+
+    def _write(self, date: str, tbl: pa.Table, name: str = None):
+        d = os.path.join(self.root, f"date={date}")
+        os.makedirs(d, exist_ok=True)
+        name = name or f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}.parquet"
+        tmp = os.path.join(d, f".{name}.tmp")          # 점(.)으로 시작 → 목록/다른 리더에서 제외
+        pq.write_table(tbl, tmp, compression="zstd")
+        with self._files_lock: os.replace(tmp, os.path.join(d, name))
+        with self._lock: self._stats["files_written"] += 1
+        return os.path.join(d, name)
+
+    def _flusher(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set(): break
+            try: self.flush()
+            except Exception: log.exception("[analytics] background flush failed")
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+
+    # ───── 조회 ─────
+    def _files(self, start: str = None, end: str = None):
+        """(date, 경로) 목록. 파티션 디렉터리 이름으로 기간을 거른다."""
+        out = []
+        with self._files_lock:
+            for e in os.scandir(self.root):
+                if not (e.is_dir() and e.name.startswith("date=")): continue
+                date = e.name[5:]
+                if (start and date < start) or (end and date > end): continue
+                out += [(date, f.path) for f in os.scandir(e.path) if f.name.endswith(".parquet") and f.name[0] != "."]
+        return out
+
+    def _file_cube(self, path: str) -> pa.Table:
+        with self._cubes_lock: cube = self._file_cubes.get(path)
+        if cube is None:
+            # 만드는 동안은 잠금 밖 (같은 파일을 두 요청이 동시에 만들 수는 있지만 결과는 같다)
+            f = pq.ParquetFile(path)
+            parts = [_cube(pa.Table.from_batches([b])) for b in f.iter_batches(batch_size=65536, columns=_READ_COLUMNS)]
+            cube = _merge(parts) if parts else _cube(SCHEMA.empty_table())
+            with self._cubes_lock: self._file_cubes[path] = cube
+            with self._lock: self._stats["cube_builds"] += 1
+        return cube
+
+    def cube(self, start: str = None, end: str = None) -> pd.DataFrame:
+        """기간 내 (date, mode, scenario, score, rounds)별 n/fallbacks/replies/duration_s/timed 합계."""
+        while True:
+            files = self._files(start, end)
+            try:
+                parts = [(d, self._file_cube(p)) for d, p in files]
+                break
+            except FileNotFoundError:      # compact가 파일을 교체하는 중 → 목록 다시
+                continue
+        live = {p for _, p in files}
+        with self._cubes_lock: cached = list(self._file_cubes)
+        gone = [p for p in cached if p not in live and not os.path.exists(p)]
+        with self._cubes_lock:
+            for p in gone: self._file_cubes.pop(p, None)
+        with self._lock: rows = list(self._pending.values()) + self._corrections
+        by_date = {}
+        for r in rows:
+            d = _date(r["ts"])
+            if (not start or d >= start) and (not end or d <= end): by_date.setdefault(d, []).append(r)
+        parts += [(d, _cube(pa.Table.from_pylist(rs, SCHEMA))) for d, rs in by_date.items()]
+        frames = []
+        for d, c in parts:
+            if c.num_rows: frames.append(c.append_column("date", pa.array([d] * c.num_rows, pa.string())))
+        if not frames: return pd.DataFrame(columns=["date", *CUBE_KEYS, *CUBE_SUMS])
+        df = pa.concat_tables(frames).to_pandas()
+        df = df.groupby(["date", *CUBE_KEYS], dropna=False, as_index=False)[CUBE_SUMS].sum()
+        return df[df["n"] != 0]
+
+    def summary(self, start: str = None, end: str = None, mode: str = None, scenario: str = None) -> dict:
+        df = self.cube(start, end)
+        if mode: df = df[df["mode"] == mode]
+        if scenario: df = df[df["scenario"] == scenario]
+        keys = ["mode", "scenario"]
+        dists = _dist(df, "score", keys)
+        by_scenario = [dict(r, score_dist=dists.get((r["mode"], r["scenario"]), {})) for r in _rollups(df, keys)]
+        by_scenario.sort(key=lambda s: -s["sessions"])
+        return {
+            "range": {"from": start, "to": end}, "filters": {"mode": mode, "scenario": scenario},
+            "totals": _rollups(df)[0],
+            "score_dist": _dist(df, "score"),
+            "rounds_dist": _dist(df, "rounds"),
+            "by_scenario": by_scenario,
+            "trend": _rollups(df, ["date"]),
+        }
+
+    # ───── 관리 ─────
+    def compact(self, date: str) -> int:
+        """한 파티션의 파일들을 하나로 합친다. 합친 파일 수를 돌려준다."""
+        paths = [p for d, p in self._files(date, date)]
+        if len(paths) < 2: return 0
+        tbl = pa.concat_tables(pq.read_table(p, schema=SCHEMA) for p in paths)
+        d = os.path.join(self.root, f"date={date}")
+        name = f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}.parquet"
+        tmp = os.path.join(d, f".{name}.tmp")
+        pq.write_table(tbl, tmp, compression="zstd")
+        with self._files_lock:      # 새 파일 등장과 옛 파일 삭제를 목록 조회 사이에 끼지 않게
+            os.replace(tmp, os.path.join(d, name))
+            for p in paths: os.remove(p)
+        with self._cubes_lock:
+            for p in paths: self._file_cubes.pop(p, None)
+        return len(paths)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats, pending=len(self._pending) + len(self._corrections), recent=len(self._recent))
+        with self._cubes_lock: cached = len(self._file_cubes)
+        return dict(s, root=self.root, cached_cubes=cached, flush_rows=self.flush_rows,
+                    flush_interval=self.flush_interval)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("command", choices=["summary", "compact"])
+    ap.add_argument("--root", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "analytics"))
+    ap.add_argument("--from", dest="start")
+    ap.add_argument("--to", dest="end")
+    ap.add_argument("--before", help="compact: 이 날짜 이전 파티션만 (기본: 오늘 이전 전부)")
+    a = ap.parse_args()
+    store = AnalyticsStore(a.root, flush_interval=3600)
+    if a.command == "summary":
+        print(json.dumps(store.summary(a.start, a.end), ensure_ascii=False, indent=1))
+    else:
+        before = a.before or time.strftime("%Y-%m-%d")
+        dates = sorted({d for d, _ in store._files(end=before) if d < before})
+        for d in dates:
+            n = store.compact(d)
+            if n: print(f"{d}: {n} files -> 1")
+
+
+if __name__ == "__main__":
+    main()
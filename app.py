@@ -1,22 +1,69 @@
 # app.py
 # -*- coding: utf-8 -*-
-from flask import Flask, render_template, abort, request, redirect, url_for, jsonify, session
-import math, time, uuid, base64, os, re, json, logging
-from gtts import gTTS
-import requests
+from flask import Flask, render_template, abort, request, redirect, url_for, jsonify, session, Response, stream_with_context, g, send_file, current_app
+from flask import before_render_template, template_rendered
+import time, uuid, base64, os, re, json, logging, io, threading, itertools
 from copy import deepcopy
-import firebase_admin
-from firebase_admin import credentials, auth as firebase_auth
-
-# ───────────────────────── Flask 초기화 ─────────────────────────
-app = Flask(__name__, template_folder="templates", static_folder="static")
-app.url_map.strict_slashes = False
-app.secret_key = os.environ.get("FLASK_SECRET_KEY", "super-secret-onair-key")
+from prompt_cache import PromptCache
+from llm_deadline import HedgedCaller
+from admission import Admission, Overloaded, PRIORITY
+from tts_cache import TTSCache, normalize_text
+from call_pipeline import pipeline as sentence_pipeline
+from concurrent.futures import ThreadPoolExecutor
+from session_store import make_session_store, SessionBusy
+from log_store import LogStore
+from notice_store import NoticeStore
+from static_assets import install as install_static_assets
+from page_cache import PageCache
+from metrics import Registry
+from profiling import Profiler, TraceStore, span, current as current_trace
+from feedback_cache import FeedbackCache
+from feedback_worker import FeedbackPrecomputer
+from slot_grammar import grammar_for
+from context_window import (PromptBook, SUMMARY_LABEL, content_json, ctx_new, ctx_init, ctx_append, ctx_select, ctx_turn_texts,
+                            ctx_apply_summary, fold_extractive, estimate_tokens, request_body)
+from collections import OrderedDict
+import gzip
+from lazy import Lazy, is_built
+# gtts / requests / firebase_admin / pandas·pyarrow(분석)는 각 하위 시스템이 처음 쓰일 때 임포트한다 (Lazy)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ───────────────────────── 라우트/훅 등록부 ─────────────────────────
+# 뷰와 훅은 임포트 때 여기 모아 두고 create_app()이 새 Flask 앱에 붙인다 (엔드포인트 이름 = 함수 이름 그대로)
+_ROUTES, _HOOKS = [], []
+
+def route(rule, **options):
+    def register(view):
+        _ROUTES.append((rule, options, view))
+        return view
+    return register
+
+def hook(kind):
+    # kind: before_request | after_request | context_processor
+    def register(fn):
+        _HOOKS.append((kind, fn))
+        return fn
+    return register
 
 # ───────────────────────── 로깅 ─────────────────────────
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s - %(message)s")
 log = logging.getLogger("onair")
 
+# ───────────────────────── 정적 파일 (지문 + 사전 압축) ─────────────────────────
+# `python static_assets.py`로 static_dist/를 만들어 두면 url_for('static')이 지문 이름을 내고 immutable 캐시 + .br/.gz로 서빙.
+# 빌드가 없으면(개발) 기존 static 그대로. create_app()이 앱마다 설치 (app.extensions["static_assets"])
+STATIC_DIST = os.environ.get("STATIC_DIST", os.path.join(BASE_DIR, "static_dist"))
+
+# ───────────────────────── 지표 (/metrics) ─────────────────────────
+# 요청 경로에서는 히스토그램 observe만 하고, 나머지 카운터/게이지는 스크레이프 때 각 stats()에서 읽는다
+METRICS = Registry()
+ROUTE_SECONDS = METRICS.histogram("onair_http_request_duration_seconds",
+                                  "HTTP 요청 처리 시간 (스트리밍 응답은 본문 전송 완료까지)", ("endpoint", "method", "status"))
+GEMINI_SECONDS = METRICS.histogram("onair_gemini_request_duration_seconds",
+                                   "Gemini REST 호출 시간 (스트림은 응답 헤더까지)", ("method", "status"))
+TTS_SECONDS = METRICS.histogram("onair_tts_synthesis_seconds", "gTTS 합성 시간 (캐시 미적중분)", ("kind", "ok"))
+
 # ───────────────────────── 전역 상태 ─────────────────────────
 STATE = {
     "keys": {
@@ -25,17 +72,69 @@ STATE = {
     },
     "provider": None,
     "model": None,
-    "sessions": {},
-    "logs": [],
+    # 세션 저장소: SESSION_BACKEND=sqlite 이면 워커 프로세스 간 공유 (WAL). 첫 사용 때 워커별로 연다
+    "sessions": Lazy(lambda: make_session_store(
+        os.environ.get("SESSION_BACKEND", "memory"),
+        path=os.environ.get("SESSION_DB", "sessions.db"),
+        ttl=float(os.environ.get("SESSION_TTL", 1800)),
+        max_sessions=int(os.environ.get("SESSION_MAX", 10000)),
+    ), "sessions"),
+    # 종료 세션 기록: 링 버퍼(LOG_CAPACITY) + 밀려난 항목은 LOG_SPILL_PATH(JSONL)에 보관
+    "logs": LogStore(int(os.environ.get("LOG_CAPACITY", 5000)), os.environ.get("LOG_SPILL_PATH") or None),
 }
 
+# 종료 세션 + 피드백 점수 분석 저장소 (날짜 파티션 Parquet, ANALYTICS_FLUSH_ROWS건/ANALYTICS_FLUSH_SEC초마다 일괄 기록)
+# pandas/pyarrow 임포트가 무거워 첫 세션 종료/대시보드 조회 때 만든다
+def _analytics_store():
+    from analytics_store import AnalyticsStore
+    return AnalyticsStore(
+        os.environ.get("ANALYTICS_DIR", os.path.join(BASE_DIR, "analytics")),
+        flush_rows=int(os.environ.get("ANALYTICS_FLUSH_ROWS", 1000)),
+        flush_interval=float(os.environ.get("ANALYTICS_FLUSH_SEC", 30)),
+    )
+
+ANALYTICS = Lazy(_analytics_store, "analytics") if os.environ.get("ANALYTICS", "1") != "0" else None
+
 DEFAULT_MAX_ROUNDS = 8
 MAX_CONTEXT_TURNS = 8
 
 # ───────────────────────── LLM 설정 (Gemini만) ─────────────────────────
 GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
-GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
-GEMINI_TIMEOUT = 30
+GEMINI_BASE_URL = os.environ.get("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+GEMINI_TIMEOUT = float(os.environ.get("GEMINI_TIMEOUT", 30))                  # read timeout
+GEMINI_CONNECT_TIMEOUT = float(os.environ.get("GEMINI_CONNECT_TIMEOUT", 3.05))
+GEMINI_POOL_SIZE = int(os.environ.get("GEMINI_POOL_SIZE", 10))                 # 워커당 keep-alive 연결 수
+
+# API 키별 입장 제어: 동시 호출 수 + 분당 토큰 버킷 + 우선순위 대기열 (GEMINI_ADMISSION=0 이면 끔)
+ADMISSION = Admission(
+    max_concurrent=int(os.environ.get("GEMINI_MAX_CONCURRENCY", 8)),
+    tokens_per_min=int(os.environ.get("GEMINI_TPM", 1_000_000)),
+    max_queue=int(os.environ.get("GEMINI_QUEUE", 32)),
+    max_wait=float(os.environ.get("GEMINI_QUEUE_WAIT", 10)),
+    max_keys=int(os.environ.get("GEMINI_ADMISSION_KEYS", 64)),     # X-API-Key별 리미터 보관 수 (오래 안 쓴 유휴 키부터 버림)
+) if os.environ.get("GEMINI_ADMISSION", "1") != "0" else None
+REPLY_TOKEN_ALLOWANCE = 256     # 입장 시 예약할 출력 토큰 추정치 (응답 usageMetadata로 정산)
+
+# 모든 Gemini 호출이 공유하는 keep-alive 클라이언트 (429/503은 backoff 재시도). 연결 풀은 워커마다 첫 호출 때 만든다
+def _gemini_client():
+    from gemini_client import GeminiClient
+    client = GeminiClient(GEMINI_MODEL, base_url=GEMINI_BASE_URL, pool_size=GEMINI_POOL_SIZE,
+                          connect_timeout=GEMINI_CONNECT_TIMEOUT, read_timeout=GEMINI_TIMEOUT,
+                          retries=int(os.environ.get("GEMINI_RETRIES", 2)), admission=ADMISSION)
+    client.observer = lambda method, sec, status: GEMINI_SECONDS.observe(sec, method, status)
+    return client
+
+GEMINI = Lazy(_gemini_client, "gemini")
+
+# 고정 system instruction을 Gemini cachedContents로 올려 두고 핸들만 전송 (PROMPT_CACHE=0 이면 항상 인라인).
+# Gemini는 최소 토큰 수(2.5 Flash 기준 1024) 미만의 캐시 생성을 거절하므로 추정치가 그 미만이면 시도하지 않는다.
+PROMPT_CACHE = PromptCache(
+    GEMINI, ttl=int(os.environ.get("PROMPT_CACHE_TTL", 3600)),
+    refresh_margin=int(os.environ.get("PROMPT_CACHE_REFRESH", 300)),
+    min_tokens=int(os.environ.get("PROMPT_CACHE_MIN_TOKENS", 1024)),
+    max_entries=int(os.environ.get("PROMPT_CACHE_MAX_ENTRIES", 256)),
+) if os.environ.get("PROMPT_CACHE", "1") != "0" else None
+CACHE_MISS_STATUSES = (400, 403, 404)    # 핸들 만료/삭제/권한 → 무효화 후 인라인으로 한 번 재시도
 
 # 부팅 시 Gemini 키가 있으면 provider 고정
 if STATE["keys"].get("gemini"):
@@ -51,8 +150,12 @@ POSTS = [
     {"id": 2, "pinned": False, "category": "점검", "title": "서버 점검 안내 ( 2025. 07. 17 )", "author": "관리자", "created_at": "25.06.11", "views": 1101},
     {"id": 1, "pinned": False, "category": "공지", "title": "ON:AIR를 시작하는 법, 함께 대화해볼래요?", "author": "ON:AIR", "created_at": "25.06.11", "views": 1101},
 ]
+# 공지 저장소: 비어 있으면 POSTS로 채운다. 조회수는 NOTICE_VIEW_FLUSH건/NOTICE_VIEW_FLUSH_SEC초마다 일괄 반영
+NOTICES = Lazy(lambda: NoticeStore(os.environ.get("NOTICE_DB", "notices.db"), seed=POSTS,
+                                   flush_every=int(os.environ.get("NOTICE_VIEW_FLUSH", 200)),
+                                   flush_interval=float(os.environ.get("NOTICE_VIEW_FLUSH_SEC", 5.0))), "notices")
 
-@app.context_processor
+@hook("context_processor")
 def inject_nav():
     nav_tabs = [
         {"label": "강의실", "endpoint": "roadmap"},
@@ -67,40 +170,61 @@ def inject_nav():
         except: return False
     return dict(nav_tabs=nav_tabs, is_active=is_active)
 
+# ───────────────────────── 페이지 렌더 캐시 ─────────────────────────
+# 데이터 없는 템플릿 라우트는 (엔드포인트, 인자, 로그인 여부)별 렌더 결과를 재사용하고 ETag/304로 응답.
+# 템플릿 파일이 바뀌면 PAGE_CACHE_CHECK초 안에 무효화. PAGE_CACHE=0 이면 끔
+def _clear_jinja_cache():
+    if current_app.jinja_env.cache is not None: current_app.jinja_env.cache.clear()
+
+PAGE_CACHE = PageCache(
+    [os.path.join(BASE_DIR, "templates")],
+    max_entries=int(os.environ.get("PAGE_CACHE_MAX", 256)),
+    check_interval=float(os.environ.get("PAGE_CACHE_CHECK", 1.0)),
+    on_change=_clear_jinja_cache,
+) if os.environ.get("PAGE_CACHE", "1") != "0" else None
+cached_page = PAGE_CACHE.cached if PAGE_CACHE else (lambda view: view)
+
 # ───────────────────────── 기본 페이지 라우트 ─────────────────────────
-@app.route("/")
+@route("/")
+@cached_page
 def main(): return render_template("main.html")
 
-@app.route("/login")
+@route("/login")
+@cached_page
 def login(): return render_template("login.html")
 
-@app.route("/roadmap")
+@route("/roadmap")
+@cached_page
 def roadmap(): return render_template("roadmap.html")
 
-@app.route("/guide")
+@route("/guide")
+@cached_page
 def guide(): return render_template("guide.html")
 
-@app.route("/reviews")
+@route("/reviews")
+@cached_page
 def reviews(): return render_template("reviews.html")
 
-@app.route("/subscribe")
+@route("/subscribe")
 def subscribe(): return "구독 기능 준비 중"
 
-@app.route("/membership")
+@route("/membership")
+@cached_page
 def membership(): return render_template("membership.html")
 
-@app.route("/community")
+@route("/community")
+@cached_page
 def community():
     return render_template("community.html")
 
-@app.route("/notice")
+@route("/notice")
 def notice():
-    page = request.args.get("page", 1, type=int)
-    posts_all = sorted(POSTS, key=lambda p: (not p.get("pinned", False), -p["id"]))
-    total_pages = max(1, math.ceil(len(posts_all)/PER_PAGE))
-    if page > total_pages: page = total_pages
-    start, end = (page-1)*PER_PAGE, (page-1)*PER_PAGE+PER_PAGE
-    return render_template("notice.html", posts=posts_all[start:end], page=page, total_pages=total_pages)
+    # 키셋 페이지네이션: ?after=<next_cursor> 다음 페이지, ?before=<prev_cursor> 이전 페이지
+    category = request.args.get("category") or None
+    posts, prev_cursor, next_cursor = NOTICES.page(PER_PAGE, after=request.args.get("after"),
+                                                   before=request.args.get("before"), category=category)
+    return render_template("notice.html", posts=posts, category=category,
+                           prev_cursor=prev_cursor, next_cursor=next_cursor)
 
 # ───────────────────────── 유틸 ─────────────────────────
 def clean_text(text:str)->str:
@@ -118,9 +242,7 @@ def _test_gemini_key(key:str):
         payload={"contents":[{"role":"user","parts":[{"text":"pong?"}]}],
                  "system_instruction":{"parts":[{"text":"healthcheck"}]},
                  "generationConfig":{"maxOutputTokens":250}}
-        r=requests.post(GEMINI_URL,params={"key":key},
-                        headers={"Content-Type":"application/json"},
-                        data=json.dumps(payload),timeout=GEMINI_TIMEOUT)
+        r=GEMINI.generate(payload,key)
         if r.status_code!=200:
             msg=r.json().get("error",{}).get("message",f"HTTP {r.status_code}")
             return False,msg
@@ -128,7 +250,7 @@ def _test_gemini_key(key:str):
     except Exception as e: return False,f"EXC {e}"
 
 # ───────────────────────── 키 등록 API (Gemini only) ─────────────────────────
-@app.route("/api/key", methods=["POST"])
+@route("/api/key", methods=["POST"])
 def api_set_key():
     data = request.json or {}
     raw = (data.get("api_key") or "").strip()
@@ -145,7 +267,7 @@ def api_set_key():
     return jsonify({"ok": False, "reason": info}), 400
 
 # 상태 패널용
-@app.route("/api/status")
+@route("/api/status")
 def api_status():
     ok = bool(STATE["keys"].get("gemini"))
     return jsonify({
@@ -156,70 +278,264 @@ def api_status():
     })
 
 # ───────────────────────── LLM 호출 (Gemini only) ─────────────────────────
-def call_gemini(messages, scenario=None, mode="chat"):
-    key = STATE["keys"].get("gemini")
-    if not key: return None
+# 고객센터형은 신원확인 1회 유도
+SERVICE_SCENARIOS = {"inquiry", "exchange", "order", "shipping", "reschedule", "shipping_delay", "consult"}
+CHAT_GENERATION_CONFIG = {"temperature": 0.7, "topP": 0.9, "candidateCount": 1, "maxOutputTokens": 4096}
+# 컨텍스트 토큰 예산(오프닝 + 요약 + 최근 턴, system 프롬프트 제외). 예산 밖 턴은 요약으로 접는다
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", 1200))
+SUMMARY_MIN_TURNS = int(os.environ.get("SUMMARY_MIN_TURNS", 4))      # 요약 안 된 예산 밖 턴이 이만큼 쌓이면 갱신
+SUMMARY_MAX_CHARS = 600
+SUMMARY_GENERATION_CONFIG = {"temperature": 0.2, "candidateCount": 1, "maxOutputTokens": 256}
+
+def system_lines(scenario=None, mode="chat", role="staff"):
+    # role은 PromptBook 키 호환용. 문구는 역할과 무관하게 기존과 같다 (페르소나 변경은 별도 작업)
+    sys_lines = [
+        "너는 ON:AIR 콜포비아 극복 훈련에서 상담원 역할을 맡는다.",
+        "반복하지 말고 간결히 1~3문장으로 답하며, 필요한 경우 질문 1개를 덧붙여라.",            
+    ]
+    if scenario: sys_lines.append(f"[상황: {scenario}]")
+    if scenario in SERVICE_SCENARIOS:
+        sys_lines.append("상황에 알맞게 고객의 정보를 한 번은 확인해야 한다. (예: 주문번호, 예약자 이름 등)")
+    if scenario and scenario in SCENARIO_HINTS:
+        sys_lines.append(f"[시나리오 가이드] {SCENARIO_HINTS[scenario]}")
+    sys_lines.append("전화 상황: 음성 대화체로 간결히." if mode == "call" else "채팅 상황: 예의 바르고 간결히.")
+    return sys_lines
+
+# (scenario, mode, role)별 system_instruction/generationConfig JSON 조각 (부팅 시 컴파일, 미등록 시나리오는 최초 사용 시)
+PROMPTS = PromptBook(system_lines, CHAT_GENERATION_CONFIG)
+
+def add_message(sim, role, text):
+    """메시지 기록과 Gemini 컨텍스트 창을 함께 갱신한다."""
+    sim["messages"].append({"role": role, "text": text})
+    if "ctx" in sim: ctx_append(sim, role, text)
+    else: ctx_init(sim)
+
+# ───── 롤링 요약 (백그라운드) ─────
+# 요약은 요청 경로 밖에서 만들고, 결과는 다음 턴에 세션 잠금 안에서 sim["ctx"]로 옮긴다 (세션 저장소 종류와 무관).
+SUMMARY_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.environ.get("SUMMARY_WORKERS", 1)), thread_name_prefix="summary")
+SUMMARIES = OrderedDict()     # session_id -> (upto, text)
+_summary_pending = set()
+_summary_lock = threading.Lock()
+SUMMARY_STATS = {"scheduled": 0, "llm": 0, "extractive": 0, "applied": 0}
+
+def _clip_summary(text):
+    return text if len(text) <= SUMMARY_MAX_CHARS else "…" + text[-SUMMARY_MAX_CHARS:]
+
+def _summarize(sid, prev, turns, upto, key):
+    text = ""
     try:
-        sys_lines = [
-            "너는 ON:AIR 콜포비아 극복 훈련에서 상담원 역할을 맡는다.",
-            "반복하지 말고 간결히 1~3문장으로 답하며, 필요한 경우 질문 1개를 덧붙여라.",            
-        ]
-        # 고객센터형은 신원확인 1회 유도
-        SERVICE_SCENARIOS = {"inquiry", "exchange", "order", "shipping", "reschedule", "shipping_delay", "consult"}
-        if scenario: sys_lines.append(f"[상황: {scenario}]")
-        if scenario in SERVICE_SCENARIOS:
-            sys_lines.append("상황에 알맞게 고객의 정보를 한 번은 확인해야 한다. (예: 주문번호, 예약자 이름 등)")
-        if scenario and scenario in SCENARIO_HINTS:
-            sys_lines.append(f"[시나리오 가이드] {SCENARIO_HINTS[scenario]}")
-        sys_lines.append("전화 상황: 음성 대화체로 간결히." if mode == "call" else "채팅 상황: 예의 바르고 간결히.")
-        sys_text = "\n".join(sys_lines)
-
-        trimmed = trim_messages(messages, keep_opening=True)
-        contents = [{"role": "model" if m["role"] == "ai" else "user", "parts": [{"text": m["text"]}]} for m in trimmed]
-
+        convo = "\n".join(f"{'상담원' if r == 'ai' else '사용자'}: {t}" for r, t in turns)
         payload = {
-            "contents": contents,
-            "system_instruction": {"parts": [{"text": sys_text}]},
-            "generationConfig": {"temperature": 0.7, "topP": 0.9, "candidateCount": 1, "maxOutputTokens": 4096}
+            "contents": [{"role": "user", "parts": [{"text": (f"[기존 요약]\n{prev}\n\n" if prev else "") + f"[이어진 대화]\n{convo}"}]}],
+            "system_instruction": {"parts": [{"text": "기존 요약과 이어진 대화를 합쳐 3문장 이내 한국어로 요약하라. "
+                                                      "이름·번호·날짜·요청 사항 같은 확인된 정보는 빠짐없이 남겨라."}]},
+            "generationConfig": SUMMARY_GENERATION_CONFIG,
         }
-        r = requests.post(GEMINI_URL, params={"key": key}, headers={"Content-Type": "application/json"},
-                          data=json.dumps(payload, ensure_ascii=False), timeout=GEMINI_TIMEOUT)
-        if r.status_code != 200:
-            log.warning(f"[Gemini] HTTP {r.status_code}: {r.text[:200]}")
+        r = GEMINI.generate(payload, key, priority=PRIORITY["summary"],
+                            cost=estimate_tokens(convo) + SUMMARY_GENERATION_CONFIG["maxOutputTokens"])
+        if r.status_code == 200:
+            data = r.json()
+            GEMINI.record_usage(data.get("usageMetadata"))
+            text = clean_text(_candidate_text(data))
+    except Exception:
+        log.exception("[Summary] Exception")
+    with _summary_lock:
+        SUMMARY_STATS["llm" if text else "extractive"] += 1
+        if not text: text = " / ".join(filter(None, [prev, fold_extractive(turns)]))
+        cur = SUMMARIES.get(sid)
+        if cur is None or cur[0] < upto:
+            SUMMARIES[sid] = (upto, _clip_summary(text))
+            SUMMARIES.move_to_end(sid)
+            while len(SUMMARIES) > 10000: SUMMARIES.popitem(last=False)
+        _summary_pending.discard(sid)
+
+def _schedule_summary(sim, start, end):
+    sid, key = sim.get("session_id"), STATE["keys"].get("gemini")
+    if not sid or not key: return
+    with _summary_lock:
+        if sid in _summary_pending: return
+        _summary_pending.add(sid)
+        SUMMARY_STATS["scheduled"] += 1
+    prev = (sim["ctx"]["summary"] or {}).get("text", "")
+    SUMMARY_EXECUTOR.submit(_summarize, sid, prev, ctx_turn_texts(sim, start, end), end, key)
+
+def _prompt_key(sim):
+    return ("chat", sim.get("scenario"), sim.get("mode", "chat"), sim.get("ai_role", "staff"))
+
+def prompt_handle(sim, key):
+    """세션 프롬프트의 cachedContents 이름 (없으면 None → 인라인)."""
+    if PROMPT_CACHE is None or not key: return None
+    _, sc, mode, role = pk = _prompt_key(sim)
+    return PROMPT_CACHE.handle(pk, PROMPTS.text(sc, mode, role), key, PROMPTS.tokens(sc, mode, role))
+
+def gemini_body(sim, cache_name=None) -> str:
+    """토큰 예산으로 고른 컨텍스트 + 롤링 요약 + 미리 컴파일된 프롬프트 조각으로 요청 본문(JSON 문자열)을 만든다.
+    cache_name이 있으면 system_instruction 대신 캐시 핸들을 보내고, 요약은 맨 앞 user 메시지로 붙인다."""
+    sid = sim.get("session_id")
+    with _summary_lock: done = SUMMARIES.pop(sid, None) if sid else None
+    if done and ctx_apply_summary(sim, done[1], done[0]):
+        with _summary_lock: SUMMARY_STATS["applied"] += 1
+    contents, (start, end), est = ctx_select(sim, CONTEXT_TOKEN_BUDGET)
+    summary = (sim["ctx"]["summary"] or {}).get("text")
+    if end > start:
+        # 아직 요약에 안 들어간 예산 밖 턴: 이번 요청엔 값싼 발췌 요약을 붙이고, 충분히 쌓였으면 LLM 요약 갱신 예약
+        folded = fold_extractive(ctx_turn_texts(sim, start, end))
+        summary = _clip_summary(" / ".join(filter(None, [summary, folded])))
+        est += estimate_tokens(folded)
+        if end - start >= SUMMARY_MIN_TURNS: _schedule_summary(sim, start, end)
+    sc, mode, role = sim.get("scenario"), sim.get("mode", "chat"), sim.get("ai_role", "staff")
+    sim["ctx_tokens"] = est + PROMPTS.tokens(sc, mode, role)
+    if cache_name:
+        if summary: contents = [content_json("user", SUMMARY_LABEL + summary)] + contents
+        return request_body(contents, PROMPTS.cached_fragment(cache_name))
+    return request_body(contents, PROMPTS.fragment(sc, mode, role, summary))
+
+def record_usage(sim, usage):
+    """Gemini usageMetadata의 실제 프롬프트 토큰 수를 전역 통계와 세션(최근 20건)에 기록."""
+    u = GEMINI.record_usage(usage)
+    if u["prompt"]:
+        hist = sim.setdefault("usage", [])
+        hist.append({"prompt": u["prompt"], "output": u["output"], "cached": u["cached"],
+                     "estimated": sim.get("ctx_tokens", 0)})
+        del hist[:-20]
+    return u
+
+def build_gemini_payload(messages, scenario=None, mode="chat", role="staff"):
+    # 세션 없이 메시지 목록만 있을 때 (일회성 호출용)
+    trimmed = trim_messages(messages, keep_opening=True)
+    return {
+        "contents": [{"role": "model" if m["role"] == "ai" else "user", "parts": [{"text": m["text"]}]} for m in trimmed],
+        "system_instruction": {"parts": [{"text": PROMPTS.text(scenario, mode, role)}]},
+        "generationConfig": CHAT_GENERATION_CONFIG,
+    }
+
+def _candidate_text(data: dict) -> str:
+    cands = data.get("candidates") or []
+    parts = (cands[0].get("content") or {}).get("parts") if cands else None
+    return "".join(p.get("text", "") for p in parts or [])
+
+# ───── 지연 SLO: 모드별 (hedge 시점, 마감) 초. 전화는 침묵이 길면 안 되므로 더 빡빡하게 ─────
+LLM_SLO = {
+    "call": (float(os.environ.get("LLM_HEDGE_CALL", 1.2)), float(os.environ.get("LLM_DEADLINE_CALL", 3.0))),
+    "chat": (float(os.environ.get("LLM_HEDGE_CHAT", 3.0)), float(os.environ.get("LLM_DEADLINE_CHAT", 8.0))),
+}
+LATE_GRACE = float(os.environ.get("LLM_LATE_GRACE", 5.0))   # 마감 뒤 늦은 응답을 기다려 기록하는 시간 (그 뒤 연결 끊음)
+LLM_HEDGER = HedgedCaller(LLM_SLO, max_workers=int(os.environ.get("LLM_HEDGE_WORKERS", 32)))
+
+def _llm_timeout(mode):
+    return (GEMINI_CONNECT_TIMEOUT, min(GEMINI_TIMEOUT, LLM_HEDGER.limits(mode)[1] + LATE_GRACE))
+
+def _log_late(sim, kind):
+    sid, mode = sim.get("session_id"), sim.get("mode", "chat")
+    def on_late(result, ms):
+        if kind == "stream":
+            result[1].close()   # 늦게 열린 스트림은 첫 청크만 받고 닫는다
+            log.info(f"[Gemini] late stream discarded ({mode}, {ms:.0f}ms, session={sid})")
+            return
+        data = result.json()
+        GEMINI.record_usage(data.get("usageMetadata"))   # 버려도 과금은 되므로 토큰은 집계
+        log.info(f"[Gemini] late reply discarded ({mode}, {ms:.0f}ms, session={sid}): {_candidate_text(data)[:80]!r}")
+    return on_late
+
+def _admission_args(sim, mode):
+    # 턴 요청의 입장 조건: 모드 우선순위, 예상 토큰, 대기 한도 = SLO 마감까지 남은 시간
+    until = time.monotonic() + LLM_HEDGER.limits(mode)[1]
+    cost = sim.get("ctx_tokens", 0) + REPLY_TOKEN_ALLOWANCE
+    return lambda: {"priority": PRIORITY.get(mode, PRIORITY["chat"]), "cost": cost,
+                    "queue_timeout": max(0.0, until - time.monotonic())}
+
+def call_gemini(sim):
+    """SLO 안에 받은 Gemini 답(텍스트) 또는 None. 느리면 hedge 요청, 마감을 넘기면 None."""
+    key = STATE["keys"].get("gemini")
+    if not key: return None
+    mode = sim.get("mode", "chat")
+    try:
+        with span("prompt_cache.handle"): name = prompt_handle(sim, key)
+        with span("context.build"):
+            body = gemini_body(sim, name)
+            inline = gemini_body(sim) if name else body
+        timeout, adm = _llm_timeout(mode), _admission_args(sim, mode)
+
+        def attempt():
+            r = GEMINI.generate(body, key, timeout=timeout, **adm())
+            if name and r.status_code in CACHE_MISS_STATUSES:
+                PROMPT_CACHE.invalidate(_prompt_key(sim), key)
+                r = GEMINI.generate(inline, key, timeout=timeout, **adm())
+            return r
+
+        with span("gemini.wait"):
+            r, outcome = LLM_HEDGER.call(mode, attempt, accept=lambda r: r.status_code == 200,
+                                         on_late=_log_late(sim, "generate"))
+        if r is None:
+            log.warning(f"[Gemini] no reply within SLO ({mode}: {outcome})")
             return None
-        data = r.json()
-        cands = data.get("candidates") or []
-        parts = (cands[0].get("content") or {}).get("parts") if cands else None
-        text = (parts[0].get("text") if parts else "") or ""
+        with span("gemini.parse"):
+            data = r.json()
+            u = record_usage(sim, data.get("usageMetadata"))
+            if name and u["cached"]: PROMPT_CACHE.record(u["cached"])
+            text = _candidate_text(data)
         STATE["provider"] = "gemini"; STATE["model"] = GEMINI_MODEL
         return clean_text(text)
     except Exception:
         log.exception("[Gemini] Exception")
         return None
 
-def call_llm(messages, scenario=None, mode="chat"):
-    ans = call_gemini(messages, scenario, mode)
+def stream_gemini(sim):
+    """Gemini 응답 텍스트 조각을 도착 순서대로 yield. 키가 없거나 실패하면 예외.
+    첫 청크는 SLO(hedge/마감) 안에서 받아야 하고, 이후 청크 사이 간격도 마감을 넘으면 read timeout으로 끊긴다."""
+    key = STATE["keys"].get("gemini")
+    if not key: raise RuntimeError("Gemini API key not set")
+    mode = sim.get("mode", "chat")
+    name = prompt_handle(sim, key)
+    body = gemini_body(sim, name)
+    inline = gemini_body(sim) if name else body
+    timeout, adm = (GEMINI_CONNECT_TIMEOUT, LLM_HEDGER.limits(mode)[1]), _admission_args(sim, mode)
+
+    from requests import HTTPError     # GEMINI를 만들 때 이미 임포트됨
+
+    def attempt():
+        chunks = GEMINI.stream(body, key, timeout=timeout, **adm())
+        try:
+            return next(chunks, None), chunks      # HTTP 오류/입장 거절은 첫 청크를 읽을 때 올라온다
+        except HTTPError as e:
+            if not name or e.response is None or e.response.status_code not in CACHE_MISS_STATUSES: raise
+            PROMPT_CACHE.invalidate(_prompt_key(sim), key)
+            chunks = GEMINI.stream(inline, key, timeout=timeout, **adm())
+            return next(chunks, None), chunks
+
+    opened, outcome = LLM_HEDGER.call(mode, attempt, accept=lambda r: r[0] is not None,
+                                      on_late=_log_late(sim, "stream"))
+    if opened is None: raise TimeoutError(f"no stream within SLO ({mode}: {outcome})")
+    first, chunks = opened
+    usage = None
+    for chunk in itertools.chain([first], chunks):
+        usage = chunk.get("usageMetadata") or usage     # 마지막 청크에 누적값이 온다
+        piece = _candidate_text(chunk)
+        if piece: yield piece
+    u = record_usage(sim, usage)
+    if name and u["cached"]: PROMPT_CACHE.record(u["cached"])
+    STATE["provider"] = "gemini"; STATE["model"] = GEMINI_MODEL
+
+def _last_user_text(sim):
+    return next((m["text"] for m in reversed(sim["messages"]) if m["role"] == "user"), "")
+
+def note_reply(sim, fallback: bool, mode: str = None):
+    """AI 답 하나 집계: 모드별 SLO 통계 + 세션별 답/폴백 수(분석 저장소용)."""
+    LLM_HEDGER.reply(mode or sim.get("mode", "chat"), fallback=fallback)
+    sim["replies"] = sim.get("replies", 0) + 1
+    if fallback: sim["fallbacks"] = sim.get("fallbacks", 0) + 1
+
+def call_llm(sim):
+    ans = call_gemini(sim)
+    note_reply(sim, not ans)
     if ans: return ans
-    # 실패 시 규칙엔진 폴백
-    last_user = next((m["text"] for m in reversed(messages) if m["role"] == "user"), "")
-    return rule_based_next_for_messages(messages, last_user)
+    # 실패/마감 초과 시 규칙엔진 폴백 (세션 슬롯 상태를 이어서 사용)
+    with span("rule_engine"): return rule_based_next(sim, _last_user_text(sim))
 
 # ───────────────────────── 규칙엔진 (Slot 기반) ─────────────────────────
-def extract_slots(text: str):
-    if not text: return {}
-    t = text.strip(); slots = {}
-    m = re.search(r"(\d{6,})", t)
-    if m: slots["order_number"] = m.group(1)
-    if "미개봉" in t: slots["unopened"] = True
-    elif "개봉" in t: slots["unopened"] = False
-    if any(k in t for k in ["한 사이즈 작", "작게", "다운"]): slots["size_dir"] = "down"
-    if any(k in t for k in ["한 사이즈 크", "크게", "업"]): slots["size_dir"] = "up"
-    if any(k in t for k in ["오염","파손","불량","색상","사이즈","교환","반품","작다","크다"]): slots["issue"] = t[:80]
-    m2 = re.search(r"[\"“]?([가-힣A-Za-z0-9\-\_\s]{2,20})[\"”]?", t)
-    if m2:
-        cand = m2.group(1).strip()
-        if len(cand) >= 2 and not cand.isdigit(): slots["product"] = cand
-    return slots
+def extract_slots(text: str, scenario: str = "exchange"):
+    # 시나리오별 컴파일된 슬롯 문법(키워드 Aho-Corasick 1회 스캔 + 사전 컴파일 정규식)
+    return grammar_for(scenario).extract(text)
 
 ASK_TEMPLATES = {
     "product": ["제품명(모델명)을 알려주시면 바로 확인해 드릴게요.", "사용하신 상품명을 한 줄로 알려주실 수 있을까요?"],
@@ -227,6 +543,10 @@ ASK_TEMPLATES = {
     "issue": ["교환/문의 사유를 한 문장으로만 적어주세요.", "어떤 문제가 있었는지 간단히 설명해 주실 수 있을까요?"],
     "size_dir": ["사이즈를 한 단계 작게/크게 중 어느 쪽으로 원하시나요?", "한 사이즈 다운/업 중 어떤 걸 원하시나요?"],
     "unopened": ["상품은 미개봉 상태인가요?", "포장은 개봉하지 않으셨나요?"],
+    "name": ["확인을 위해 성함을 알려주시겠어요?", "예약자(수령인) 성함이 어떻게 되시나요?"],
+    "date": ["원하시는 날짜를 알려주세요. (예: 3월 5일, 다음 주)", "어느 날짜로 잡아드릴까요?"],
+    "time": ["몇 시가 편하신가요? (예: 오후 3시)", "원하시는 시간대를 알려주세요."],
+    "place": ["어디에서 만나는 게 좋을까요?", "장소는 어디로 할까요?"],
     "confirm": ["말씀 주신 내용으로 접수해도 괜찮을까요?", "위 내용대로 진행해도 될까요?"]
 }
 
@@ -235,27 +555,22 @@ def _rotate(key, turn):
     return arr[turn % len(arr)] if arr else ""
 
 def rule_based_next(sim, last_user_text: str):
-    scenario = sim.get("scenario", "exchange")
+    grammar = grammar_for(sim.get("scenario", "exchange"))
     slots = sim.setdefault("slots", {})
-    slots.update(extract_slots(last_user_text))
+    slots.update(grammar.extract(last_user_text))
     sim["slots"] = slots
     turn = sim.setdefault("turn", 0)
 
-    needed = ["product", "order_number", "issue", "size_dir", "unopened"]
-    missing = next((k for k in needed if k not in slots), None)
+    missing = next((k for k in grammar.needed if k not in slots), None)
     if missing:
         prompt = _rotate(missing, turn)
         sim["turn"] = turn + 1
-        return f"교환 요청 계속 도와드릴게요. {prompt}"
+        return f"{grammar.prefix} {prompt}"
 
     summary = " / ".join([f"{k}: {v}" for k, v in slots.items()])
     sim["turn"] = turn + 1
     return f"확인 내용: {summary}. {_rotate('confirm', turn)}"
 
-def rule_based_next_for_messages(messages, last_user_text):
-    sim = {"scenario": "exchange", "slots": {}, "turn": 0}
-    return rule_based_next(sim, last_user_text)
-
 # ───────────────────────── 오프닝 템플릿 ─────────────────────────
 OPENINGS = {
     "consult": {"staff": "안녕하세요, 동양병원 상담센터입니다. 예약 도와드릴까요?", "customer": "안녕하세요, 상담 예약하려고 전화드렸습니다."},
@@ -303,6 +618,30 @@ OPENINGS = {
 }
 DEFAULT_OPENING = {"staff": "안녕하세요, 무엇을 도와드릴까요?", "customer": "안녕하세요. 상담 가능하실까요?"}
 
+# ───────────────────────── TTS 캐시 ─────────────────────────
+def opening_lines():
+    lines = [line for o in [*OPENINGS.values(), DEFAULT_OPENING] for line in (o["staff"], o["customer"])]
+    return list(dict.fromkeys(lines))
+
+def prewarm_tts(cache):
+    # 통화 첫 턴이 합성을 기다리지 않도록 모든 오프닝 멘트를 미리 합성해 둔다
+    n = cache.prewarm(opening_lines(), "ko", synthesize_mp3, log)
+    log.info(f"[TTS prewarm] {n} opening lines cached")
+
+def _tts_cache():
+    # 워커에서 처음 쓰일 때 디스크 캐시를 훑고, TTS_PREWARM=1이면 오프닝 멘트 예열을 시작 (디스크 계층에 남아 재시작 후엔 적중)
+    cache = TTSCache(
+        mem_budget=int(os.environ.get("TTS_CACHE_MEM_BYTES", 32 << 20)),
+        disk_dir=os.environ.get("TTS_CACHE_DIR", os.path.join(BASE_DIR, ".tts_cache")) or None,
+        disk_budget=int(os.environ.get("TTS_CACHE_DISK_BYTES", 256 << 20)),
+    )
+    cache.observe = lambda kind, sec, ok: TTS_SECONDS.observe(sec, kind, "true" if ok else "false")
+    if os.environ.get("TTS_PREWARM", "1") == "1":
+        threading.Thread(target=prewarm_tts, args=(cache,), name="tts-prewarm", daemon=True).start()
+    return cache
+
+TTS_CACHE = Lazy(_tts_cache, "tts")
+
 SCENARIO_HINTS = {
     # 콜/채팅 공용
     "shipping": (
@@ -340,36 +679,95 @@ SCENARIO_HINTS = {
     ),
 }
 
+PROMPTS.compile((sc, mode, role) for sc in [None, *OPENINGS, *SCENARIO_HINTS]
+                for mode in ("call", "chat") for role in ("staff", "customer"))
+
 # ───────────────────────── 시뮬레이션 공통 ─────────────────────────
-def simulate_send(sim, text):
-    # 사용자의 한 턴 입력
-    sim["messages"].append({"role": "user", "text": text})
+def _trimmed(sim):
+    with span("trim_messages"): return trim_messages(sim["messages"], True)
+
+def begin_turn(sim, text):
+    """사용자 턴을 기록하고 라운드 한도에 도달하면 세션을 종료한다. 종료되면 True."""
+    add_message(sim, "user", text)
     sim["rounds"] += 1
 
-    # (1) 유저 턴 직후 종료 판정
     if sim["rounds"] >= sim.get("max_rounds", DEFAULT_MAX_ROUNDS):
         sim["ended"] = True
-        STATE["logs"].insert(0, {
-            "id": int(time.time() * 1000),
+        now, messages = time.time(), _trimmed(sim)
+        STATE["logs"].append({
+            "id": int(now * 1000),
             "session_id": sim.get("session_id"),
             "topic": sim["topic"],
-            "messages": trim_messages(sim["messages"], True),
+            "scenario": sim.get("scenario"),
+            "messages": messages,
             "rounds": sim["rounds"],
             "mode": sim.get("mode")
         })
-        return None
+        if ANALYTICS:
+            ANALYTICS.record_session(
+                sim.get("session_id"), now, sim.get("mode"), sim.get("scenario"), sim.get("topic"),
+                rounds=sim["rounds"], max_rounds=sim.get("max_rounds"), replies=sim.get("replies", 0),
+                fallbacks=sim.get("fallbacks", 0),
+                duration_s=now - sim["started"] if sim.get("started") else None, transcript=messages)
+        precompute_feedback(sim.get("session_id"), list(sim["messages"]))
+        return True
+    return False
+
+def finish_turn(sim, reply):
+    add_message(sim, "ai", reply)
+    return reply
 
-    # (2) AI 응답 생성
-    reply = call_llm(sim["messages"], sim.get("scenario"), sim.get("mode"))
-    if not reply:
-        reply = rule_based_next(sim, text)
+def simulate_send(sim, text):
+    # (1) 유저 턴 직후 종료 판정
+    with span("turn.begin"):
+        if begin_turn(sim, text):
+            return None
+
+    # (2) AI 응답 생성 (실패/마감 초과 시 call_llm이 규칙엔진으로 폴백)
+    with span("llm"):
+        reply = call_llm(sim)
 
     # (3) AI 응답 추가
-    sim["messages"].append({"role": "ai", "text": reply})
-    return reply
+    with span("turn.finish"):
+        return finish_turn(sim, reply)
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def simulate_stream(sim, text):
+    """simulate_send의 스트리밍 버전. SSE 문자열을 yield한다.
+    delta: 부분 텍스트 / fallback: 스트림 실패 시 규칙엔진 응답(앞선 delta를 대체) / done: 최종 결과"""
+    if begin_turn(sim, text):
+        yield _sse("done", {"rounds": sim["rounds"], "ended": True})
+        return
+
+    pieces, fell_back = [], False
+    try:
+        for piece in stream_gemini(sim):
+            pieces.append(piece)
+            yield _sse("delta", {"text": piece})
+        reply = clean_text("".join(pieces))
+        if not reply: raise RuntimeError("empty stream")
+    except Exception as e:
+        log.warning(f"[Gemini stream] fallback after {len(pieces)} chunks: {e}")
+        reply, fell_back = rule_based_next(sim, _last_user_text(sim)), True
+        yield _sse("fallback", {"text": reply})
+    note_reply(sim, fell_back)
+
+    finish_turn(sim, reply)
+    yield _sse("done", {"reply": reply, "rounds": sim["rounds"], "ended": sim["ended"]})
+
+def busy_response(retry_after):
+    return jsonify({"error": "busy", "retry_after": retry_after}), 503, {"Retry-After": str(retry_after)}
+
+def admission_full():
+    """Gemini 대기열이 가득 찼으면 즉시 돌려줄 503 응답 (턴을 시작하기 전에 확인해 세션에 흔적을 남기지 않는다)."""
+    key = STATE["keys"].get("gemini")
+    retry = ADMISSION.saturated(key) if ADMISSION and key else None
+    return busy_response(retry) if retry else None
 
 # ───────────────────────── 전화/채팅 API ─────────────────────────
-@app.route("/api/call/start", methods=["POST"])
+@route("/api/call/start", methods=["POST"])
 def call_start():
     data = request.json or {}
     topic = data.get("topic", "전화 훈련")
@@ -378,7 +776,7 @@ def call_start():
     ai_role = "staff" if user_role == "customer" else "customer"
     opening = OPENINGS.get(scenario, DEFAULT_OPENING).get(ai_role, DEFAULT_OPENING["staff"])
     sid = uuid.uuid4().hex
-    STATE["sessions"][sid] = {
+    STATE["sessions"].put(sid, {
         "session_id": sid,
         "topic": topic,
         "scenario": scenario,
@@ -388,25 +786,33 @@ def call_start():
         "messages": [{"role": "ai", "text": opening}],
         "rounds": 0,
         "ended": False,
+        "started": time.time(),
         "max_rounds": data.get("rounds", DEFAULT_MAX_ROUNDS),
         "slots": {},
-        "turn": 0
-    }
+        "turn": 0,
+        "ctx": ctx_new(opening),
+    })
     return jsonify({"session_id": sid, "opening": opening, "ai_role": ai_role})
 
-@app.route("/api/call/send", methods=["POST"])
+@route("/api/call/send", methods=["POST"])
 def call_send():
     data = request.json or {}
     sid, text = data.get("session_id"), (data.get("text") or "").strip()
-    sim = STATE["sessions"].get(sid)
-    if not sim: return jsonify({"error": "session not found"}), 404
-    if sim["ended"]: return jsonify({"error": "session ended"}), 400
-    reply = simulate_send(sim, text)
-    if sim["ended"] and reply is None:
-        return jsonify({"rounds": sim["rounds"], "ended": True}), 200
-    return jsonify({"reply": reply, "rounds": sim["rounds"], "ended": sim["ended"]})
-
-@app.route("/api/chat/start", methods=["POST"])
+    busy = admission_full()
+    if busy: return busy
+    try:
+        with STATE["sessions"].session(sid) as sim:
+            if not sim: return jsonify({"error": "session not found"}), 404
+            if sim["ended"]: return jsonify({"error": "session ended"}), 400
+            reply = simulate_send(sim, text)
+            with span("serialize"):
+                if sim["ended"] and reply is None:
+                    return jsonify({"rounds": sim["rounds"], "ended": True}), 200
+                return jsonify({"reply": reply, "rounds": sim["rounds"], "ended": sim["ended"]})
+    except SessionBusy:
+        return jsonify({"error": "session busy"}), 409
+
+@route("/api/chat/start", methods=["POST"])
 def chat_start():
     data = request.json or {}
     topic = data.get("topic", "채팅 훈련")
@@ -415,7 +821,7 @@ def chat_start():
     ai_role = "staff" if user_role == "customer" else "customer"
     opening = OPENINGS.get(scenario, DEFAULT_OPENING).get(ai_role, DEFAULT_OPENING["staff"])
     sid = uuid.uuid4().hex
-    STATE["sessions"][sid] = {
+    STATE["sessions"].put(sid, {
         "session_id": sid,
         "topic": topic,
         "scenario": scenario,
@@ -425,66 +831,196 @@ def chat_start():
         "messages": [{"role": "ai", "text": opening}],
         "rounds": 0,
         "ended": False,
+        "started": time.time(),
         "max_rounds": data.get("rounds", DEFAULT_MAX_ROUNDS),
         "slots": {},
-        "turn": 0
-    }
+        "turn": 0,
+        "ctx": ctx_new(opening),
+    })
     return jsonify({"session_id": sid, "opening": opening, "ai_role": ai_role})
 
-@app.route("/api/chat/send", methods=["POST"])
+@route("/api/chat/send", methods=["POST"])
 def chat_send():
+    data = request.json or {}
+    sid, text = data.get("session_id"), (data.get("text") or "").strip()
+    busy = admission_full()
+    if busy: return busy
+    try:
+        with STATE["sessions"].session(sid) as sim:
+            if not sim: return jsonify({"error": "session not found"}), 404
+            if sim["ended"]: return jsonify({"error": "session ended"}), 400
+            reply = simulate_send(sim, text)
+            with span("serialize"):
+                if sim["ended"] and reply is None:
+                    return jsonify({"rounds": sim["rounds"], "ended": True}), 200
+                return jsonify({"reply": reply, "rounds": sim["rounds"], "ended": sim["ended"]})
+    except SessionBusy:
+        return jsonify({"error": "session busy"}), 409
+
+TTS_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.environ.get("TTS_WORKERS", 4)), thread_name_prefix="tts")
+
+def _speak_b64(sentence: str):
+    _, mp3 = TTS_CACHE.get_or_create(sentence, "ko", synthesize_mp3)
+    return base64.b64encode(mp3).decode()
+
+def simulate_call_turn(sim, text):
+    """전화 턴 파이프라인: 답변을 문장 단위로 나눠 문장마다 {텍스트, 오디오}를 순서대로 SSE로 보낸다.
+    첫 문장의 텍스트+음성이 준비되는 즉시 재생을 시작할 수 있다."""
+    if begin_turn(sim, text):
+        yield _sse("done", {"rounds": sim["rounds"], "ended": True})
+        return
+
+    sentences, fell_back = [], False
+    try:
+        pieces = stream_gemini(sim)
+        for i, sentence, audio in sentence_pipeline(pieces, _speak_b64, TTS_EXECUTOR):
+            sentences.append(sentence)
+            yield _sse("segment", {"index": i, "text": sentence, "audio": audio})
+        reply = clean_text(" ".join(sentences))
+        if not reply: raise RuntimeError("empty stream")
+    except Exception as e:
+        log.warning(f"[CallTurn] fallback after {len(sentences)} sentences: {e}")
+        reply, fell_back = rule_based_next(sim, _last_user_text(sim)), True
+        try: audio = _speak_b64(reply)
+        except Exception: audio = None
+        yield _sse("fallback", {"text": reply, "audio": audio})
+    note_reply(sim, fell_back, "call")
+
+    finish_turn(sim, reply)
+    yield _sse("done", {"reply": reply, "rounds": sim["rounds"], "ended": sim["ended"]})
+
+def _stream_response(mode, turn=simulate_stream):
     data = request.json or {}
     sid, text = data.get("session_id"), (data.get("text") or "").strip()
     sim = STATE["sessions"].get(sid)
-    if not sim: return jsonify({"error": "session not found"}), 404
+    if not sim or sim.get("mode") != mode: return jsonify({"error": "session not found"}), 404
     if sim["ended"]: return jsonify({"error": "session ended"}), 400
-    reply = simulate_send(sim, text)
-    if sim["ended"] and reply is None:
-        return jsonify({"rounds": sim["rounds"], "ended": True}), 200
-    return jsonify({"reply": reply, "rounds": sim["rounds"], "ended": sim["ended"]})
+    busy = admission_full()
+    if busy: return busy
 
-# ───────────────────────── 로그 & TTS ─────────────────────────
-@app.route("/api/logs", methods=["GET"])
-def logs_api(): return jsonify(STATE["logs"])
+    def locked():
+        # 스트림이 끝날 때까지 세션 잠금을 유지해 같은 세션의 동시 전송이 섞이지 않게 한다
+        try:
+            with STATE["sessions"].session(sid) as sim:
+                if not sim or sim["ended"]:
+                    yield _sse("error", {"error": "session ended"}); return
+                yield from turn(sim, text)
+        except SessionBusy:
+            yield _sse("error", {"error": "session busy"})
+
+    return Response(stream_with_context(locked()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@route("/api/call/stream", methods=["POST"])
+def call_stream(): return _stream_response("call")
+
+@route("/api/call/turn", methods=["POST"])
+def call_turn(): return _stream_response("call", simulate_call_turn)
 
-@app.route("/api/tts", methods=["POST"])
+@route("/api/chat/stream", methods=["POST"])
+def chat_stream(): return _stream_response("chat")
+
+# ───────────────────────── 로그 & TTS ─────────────────────────
+def compressed_json(body: str, status: int = 200):
+    """미리 직렬화된 JSON 문자열 응답. 클라이언트가 허용하고 1KB 이상이면 gzip."""
+    data = body.encode("utf-8")
+    rv = Response(mimetype="application/json", status=status)
+    if len(data) >= 1024 and "gzip" in request.accept_encodings:
+        data = gzip.compress(data, compresslevel=5)
+        rv.headers["Content-Encoding"] = "gzip"
+    rv.headers["Vary"] = "Accept-Encoding"
+    rv.set_data(data)
+    return rv
+
+@route("/api/logs", methods=["GET"])
+def logs_api():
+    # 최신순 커서 페이지네이션: ?limit=50&cursor=<next_cursor>&session_id=&mode=&topic=
+    limit = max(1, min(request.args.get("limit", 50, type=int), 500))
+    items, next_cursor = STATE["logs"].query(
+        cursor=request.args.get("cursor", type=int), limit=limit, raw=True,
+        session_id=request.args.get("session_id"), mode=request.args.get("mode"), topic=request.args.get("topic"))
+    return compressed_json(f'{{"items":[{",".join(items)}],"next_cursor":{json.dumps(next_cursor)}}}')
+
+@route("/api/analytics/summary", methods=["GET"])
+def analytics_summary_api():
+    # /feedback-dashboard 데이터: ?from=YYYY-MM-DD&to=YYYY-MM-DD&mode=&scenario= (날짜 파티션 밖은 읽지 않음)
+    if not ANALYTICS: return jsonify({"error": "analytics disabled"}), 404
+    with span("analytics.summary"):
+        out = ANALYTICS.summary(request.args.get("from") or None, request.args.get("to") or None,
+                                mode=request.args.get("mode") or None, scenario=request.args.get("scenario") or None)
+    return compressed_json(json.dumps(out, ensure_ascii=False))
+
+def synthesize_mp3(text: str, lang: str = "ko") -> bytes:
+    from gtts import gTTS
+    buf = io.BytesIO()
+    gTTS(text=text, lang=lang).write_to_fp(buf)
+    return buf.getvalue()
+
+def synthesize_stream(text: str, lang: str = "ko"):
+    # gTTS는 문장 조각(≤100자)마다 mp3 바이트를 돌려준다 → 첫 조각부터 바로 전송
+    from gtts import gTTS
+    return gTTS(text=text, lang=lang).stream()
+
+def audio_response(text: str, lang: str = "ko"):
+    """audio/mpeg 바이너리 응답. 캐시 적중 시 Content-Length/ETag/Range(206) 지원,
+    미적중 시 합성 청크를 바로 스트리밍하면서 캐시에 채운다. ETag는 콘텐츠 키 그대로."""
+    key = TTS_CACHE.key(text, lang)
+    if key in request.if_none_match:
+        rv = Response(status=304); rv.set_etag(key); return rv
+    data = TTS_CACHE.get(key)
+    if data is None and request.range:
+        _, data = TTS_CACHE.get_or_create(text, lang, synthesize_mp3)
+    if data is None:
+        rv = Response(stream_with_context(TTS_CACHE.stream_through(key, synthesize_stream(normalize_text(text), lang))),
+                      mimetype="audio/mpeg", headers={"Accept-Ranges": "bytes"})
+    else:
+        rv = Response(data, mimetype="audio/mpeg")
+    rv.set_etag(key)
+    rv.cache_control.public = True
+    rv.cache_control.max_age = 86400
+    if data is not None:
+        rv.make_conditional(request, accept_ranges=True, complete_length=len(data))
+    return rv
+
+@route("/api/tts", methods=["POST"])
 def tts_api():
     text = (request.json or {}).get("text", "")
     if not text: return jsonify({"error": "text required"}), 400
-    tts = gTTS(text=clean_text(text), lang="ko")
-    fname = f"voice_{int(time.time()*1000)}.mp3"
-    tts.save(fname)
-    with open(fname, "rb") as f: b64 = base64.b64encode(f.read()).decode()
-    try: os.remove(fname)
-    except: pass
-    return jsonify({"mp3_base64": b64})
+    # format=mp3 또는 Accept: audio/mpeg → 바이너리, 그 외(구 클라이언트)는 base64 JSON
+    if request.args.get("format") == "mp3" or \
+            request.accept_mimetypes.best_match(["application/json", "audio/mpeg"]) == "audio/mpeg":
+        return audio_response(text)
+    with span("tts.cache_or_synth"): _, mp3 = TTS_CACHE.get_or_create(text, "ko", synthesize_mp3)
+    with span("tts.base64"): b64 = base64.b64encode(mp3).decode()
+    with span("serialize"): return jsonify({"mp3_base64": b64})
+
+@route("/api/tts/audio", methods=["GET"])
+def tts_audio():
+    # <audio src="/api/tts/audio?text=..."> 용 (브라우저의 Range 요청을 그대로 처리)
+    text = request.args.get("text", "")
+    if not text.strip(): return jsonify({"error": "text required"}), 400
+    return audio_response(text, request.args.get("lang", "ko"))
+
+@route("/api/tts/stats")
+def tts_stats(): return jsonify(TTS_CACHE.stats())
 
 # ───────────────────────── UI 라우트 ─────────────────────────
-@app.route("/call")
+@route("/call")
+@cached_page
 def call_page(): return render_template("call.html", scenario=request.args.get("scenario"))
 
-@app.route("/chat")
+@route("/chat")
+@cached_page
 def chat_page(): return render_template("chat.html", scenario=request.args.get("scenario"))
 
-@app.context_processor
+@hook("context_processor")
 def utility_processor():
     def is_active(endpoint_name): return request.endpoint == endpoint_name
     return dict(is_active=is_active)
 
 # ───────────────────────── 피드백 페이지 및 API ─────────────────────────
-def generate_feedback_with_gemini(messages: list, override_key: str = None) -> dict:
-    key = override_key or STATE["keys"].get("gemini")
-    if not key:
-        return {"feedback": "Gemini API 키가 설정되지 않았습니다.", "score": 0}
-
-    conversation_log = ""
-    if messages and messages[0].get("role") == "ai":
-        conversation_log += f"상담원: {messages[0]['text']}\n"
-    for msg in messages[1:]:
-        role = "상담원" if msg["role"] == "ai" else "사용자"
-        conversation_log += f"{role}: {msg['text']}\n"
-
-    system_prompt = """
+# 피드백 평가 루브릭 (고정 → cachedContents 대상)
+FEEDBACK_RUBRIC = """
     당신은 'ON:AIR' 콜포비아/채팅 연습 서비스의 대화 분석 AI입니다.
     주어진 '상담원'(AI)과 '사용자'(훈련자) 간의 대화 내용을 분석하여,
     사용자의 대화 수행 능력을 평가하고 조언을 제공해야 합니다.
@@ -499,29 +1035,77 @@ def generate_feedback_with_gemini(messages: list, override_key: str = None) -> d
       "score": 1에서 5 사이의 정수 (별점 5점 만점).
     }
     """
+FEEDBACK_RUBRIC_TOKENS = estimate_tokens(FEEDBACK_RUBRIC)
+
+def generate_feedback_with_gemini(messages: list, override_key: str = None) -> dict:
+    key = override_key or STATE["keys"].get("gemini")
+    if not key:
+        return {"feedback": "Gemini API 키가 설정되지 않았습니다.", "score": 0}
+
+    conversation_log = ""
+    if messages and messages[0].get("role") == "ai":
+        conversation_log += f"상담원: {messages[0]['text']}\n"
+    for msg in messages[1:]:
+        role = "상담원" if msg["role"] == "ai" else "사용자"
+        conversation_log += f"{role}: {msg['text']}\n"
+
     user_prompt = f"다음은 사용자와 상담원 AI 간의 대화록입니다. 이 대화를 분석하여 JSON 형식으로 피드백을 제공해 주세요:\n\n{conversation_log}"
 
     try:
+        name = PROMPT_CACHE.handle(("feedback",), FEEDBACK_RUBRIC, key, FEEDBACK_RUBRIC_TOKENS) if PROMPT_CACHE else None
         payload = {
             "contents": [{"role": "user", "parts": [{"text": user_prompt}]}],
-            "system_instruction": {"parts": [{"text": system_prompt}]},
             "generationConfig": {"temperature": 0.5, "topP": 0.9, "maxOutputTokens": 4096, "response_mime_type": "application/json"}
         }
-        r = requests.post(GEMINI_URL, params={"key": key}, headers={"Content-Type": "application/json"},
-                          data=json.dumps(payload, ensure_ascii=False), timeout=GEMINI_TIMEOUT)
+        if name: payload["cachedContent"] = name
+        else: payload["system_instruction"] = {"parts": [{"text": FEEDBACK_RUBRIC}]}
+        adm = {"priority": PRIORITY["feedback"], "cost": FEEDBACK_RUBRIC_TOKENS + estimate_tokens(user_prompt) + REPLY_TOKEN_ALLOWANCE}
+        r = GEMINI.generate(payload, key, **adm)
+        if name and r.status_code in CACHE_MISS_STATUSES:
+            PROMPT_CACHE.invalidate(("feedback",), key); name = None
+            payload.pop("cachedContent"); payload["system_instruction"] = {"parts": [{"text": FEEDBACK_RUBRIC}]}
+            r = GEMINI.generate(payload, key, **adm)
         data = r.json()
         if r.status_code != 200:
             err = data.get("error", {}).get("message", f"HTTP {r.status_code}")
             return {"feedback": f"오류 발생: {err}", "score": 0}
 
+        u = GEMINI.record_usage(data.get("usageMetadata"))
+        if name: PROMPT_CACHE.record(u["cached"])
         text = (data.get("candidates")[0].get("content")["parts"][0]["text"]) if data.get("candidates") else ""
         feedback_data = json.loads(text)
         return {"feedback": feedback_data.get("feedback", ""), "score": feedback_data.get("score", 0)}
+    except Overloaded:
+        raise   # 입장 거절은 평가 실패가 아니므로 라우트에서 503 + Retry-After로 응답
     except Exception as e:
         log.exception("[FeedbackGen] Exception")
         return {"feedback": f"예외 발생: {e}", "score": 0}
 
-@app.route("/feedback/<string:session_id>")
+# 세션 + 대화록 해시 단위 피드백 캐시 (새로고침/더블클릭 시 Gemini 재평가 방지)
+FEEDBACK_CACHE = FeedbackCache(max_entries=int(os.environ.get("FEEDBACK_CACHE_MAX", 2000)),
+                               ttl=float(os.environ.get("FEEDBACK_CACHE_TTL", 24 * 3600)))
+
+def feedback_ok(fb: dict) -> bool:
+    # 정상 평가는 1~5점. 0점은 키 누락/HTTP 오류/예외 응답이므로 캐시하지 않는다
+    return bool(fb) and (fb.get("score") or 0) > 0
+
+def feedback_for(session_id: str, messages: list, override_key: str = None) -> dict:
+    def compute():
+        fb = generate_feedback_with_gemini(messages, override_key)
+        if ANALYTICS and feedback_ok(fb): ANALYTICS.record_feedback(session_id, fb["score"])
+        return fb
+    key = FEEDBACK_CACHE.key(session_id, messages)
+    return FEEDBACK_CACHE.get_or_compute(key, compute, cacheable=feedback_ok)
+
+# 세션 종료 즉시 피드백을 미리 계산해 두는 백그라운드 풀
+FEEDBACK_WORKER = Lazy(lambda: FeedbackPrecomputer(workers=int(os.environ.get("FEEDBACK_WORKERS", 2)),
+                                                   max_queue=int(os.environ.get("FEEDBACK_QUEUE", 100))), "feedback_worker")
+
+def precompute_feedback(session_id: str, messages: list):
+    if not session_id or not STATE["keys"].get("gemini"): return
+    FEEDBACK_WORKER.submit(FEEDBACK_CACHE.key(session_id, messages), lambda: feedback_for(session_id, messages))
+
+@route("/feedback/<string:session_id>")
 def feedback_page(session_id: str):
     sim = STATE["sessions"].get(session_id)
     if not sim:
@@ -538,42 +1122,226 @@ def feedback_page(session_id: str):
         main_url=url_for("roadmap")
     )
 
-@app.route("/api/feedback_data/<string:session_id>")
+@route("/api/feedback_data/<string:session_id>")
 def get_feedback_data(session_id: str):
     override_key = request.headers.get('X-API-Key')
     sim = STATE["sessions"].get(session_id)
     if not sim: return jsonify({"error": "세션을 찾을 수 없습니다."}), 404
     messages = sim.get("messages", [])
     if not messages: return jsonify({"error": "대화 내용이 없습니다."}), 404
-    feedback = generate_feedback_with_gemini(messages, override_key)
+    key = FEEDBACK_CACHE.key(session_id, messages)
+    feedback = FEEDBACK_CACHE.peek(key)
+    if feedback is None and FEEDBACK_WORKER.pending(key):
+        # 백그라운드 계산 중: ?wait=초 만큼 완료 알림을 기다리고, 그래도 없으면 202(pending)
+        wait = max(0.0, min(request.args.get("wait", 0, type=float), 25.0))
+        if FEEDBACK_WORKER.wait(key, wait): feedback = FEEDBACK_CACHE.peek(key)
+        else:
+            return jsonify({"ok": False, "pending": True}), 202, {"Retry-After": "1"}
+    if feedback is None:
+        try: feedback = feedback_for(session_id, messages, override_key)
+        except Overloaded as e: return busy_response(e.retry_after)
     return jsonify({"ok": True, "feedback": feedback["feedback"], "score": feedback["score"]})
 
 # ───────────────────────── 상태 확인 ─────────────────────────
-@app.route("/healthz")
+def _built_stats(obj):
+    # Lazy 하위 시스템은 이미 만들어졌을 때만 stats() → 상태 조회/스크레이프가 클라이언트·스레드·DB를 깨우지 않게
+    # (아직이면 None, 메트릭은 0으로 보고)
+    return obj.stats() if obj and is_built(obj) else None
+
+@route("/healthz")
 def healthz():
     return jsonify({
         "ok": True,
         "provider": STATE.get("provider"),
         "model": STATE.get("model"),
-        "gemini_set": bool(STATE["keys"].get("gemini"))
+        "gemini_set": bool(STATE["keys"].get("gemini")),
+        "sessions": _built_stats(STATE["sessions"]),
+        "logs": STATE["logs"].stats(),
+        "feedback_cache": FEEDBACK_CACHE.stats(),
+        "feedback_worker": _built_stats(FEEDBACK_WORKER),
+        "llm_slo": LLM_HEDGER.stats(),
+        "admission": ADMISSION.stats() if ADMISSION else None,
+        "notices": _built_stats(NOTICES),
+        "static": current_app.extensions["static_assets"].stats() if "static_assets" in current_app.extensions else None,
+        "page_cache": PAGE_CACHE.stats() if PAGE_CACHE else None,
+        "analytics": _built_stats(ANALYTICS),
     })
 
-# ───────────────────────── Firebase 로그인 세션 동기화 ─────────────────────────
-if not firebase_admin._apps:
-    cred_path = os.path.join(os.path.dirname(__file__), "firebase-admin-key.json")
-    if os.path.exists(cred_path):
-        cred = credentials.Certificate(cred_path)
-        firebase_admin.initialize_app(cred)
-    else:
-        log.warning("⚠️ firebase-key.json not found → Firebase auth disabled")
+@route("/api/gemini/stats")
+def gemini_stats():
+    # 워커별 풀 크기 튜닝용: in_flight/max_in_flight가 pool_size에 닿으면 GEMINI_POOL_SIZE 상향
+    with _summary_lock: summaries = dict(SUMMARY_STATS, pending=len(_summary_pending), ready=len(SUMMARIES))
+    return jsonify(dict(GEMINI.stats(), summaries=summaries, slo=LLM_HEDGER.stats(),
+                        prompt_cache=PROMPT_CACHE.stats() if PROMPT_CACHE else None))
+
+@hook("before_request")
+def _route_timer():
+    g.t0 = time.perf_counter()
+
+@hook("after_request")
+def _route_metrics(rv):
+    t0 = g.pop("t0", None)
+    if t0 is not None:
+        # 스트리밍(SSE/오디오) 응답도 본문을 다 보낸 뒤(close) 기록되도록 call_on_close 사용
+        labels = (request.endpoint or "unmatched", request.method, str(rv.status_code))
+        rv.call_on_close(lambda: ROUTE_SECONDS.observe(time.perf_counter() - t0, *labels))
+    return rv
+
+@METRICS.collector
+def _app_metrics():
+    sessions, logs = _built_stats(STATE["sessions"]) or {}, STATE["logs"].stats()
+    yield "onair_sessions_active", "gauge", "저장소에 남아 있는 시뮬레이션 세션 수", [({}, sessions.get("sessions", 0))]
+    yield "onair_log_buffer_entries", "gauge", "종료 세션 기록 링 버퍼 항목 수", [({}, logs["size"])]
+    yield "onair_log_buffer_capacity", "gauge", "종료 세션 기록 링 버퍼 크기", [({}, logs["capacity"])]
+    yield "onair_logs_appended_total", "counter", "기록된 종료 세션 수", [({}, logs["appended"])]
+
+    gs = _built_stats(GEMINI) or {}
+    yield "onair_gemini_requests_total", "counter", "Gemini REST 호출 수", [({}, gs.get("requests", 0))]
+    yield "onair_gemini_errors_total", "counter", "예외로 끝난 Gemini 호출 수", [({}, gs.get("errors", 0))]
+    yield "onair_gemini_retries_total", "counter", "429/503 자동 재시도 수", [({}, gs.get("retried", 0))]
+    yield "onair_gemini_in_flight", "gauge", "진행 중인 Gemini 호출 수", [({}, gs.get("in_flight", 0))]
+    u = gs.get("usage", {})
+    yield "onair_gemini_tokens_total", "counter", "usageMetadata 토큰 누계", [
+        ({"type": "prompt"}, u.get("prompt_tokens", 0)), ({"type": "output"}, u.get("output_tokens", 0)),
+        ({"type": "cached"}, u.get("cached_tokens", 0))]
+
+    slo = LLM_HEDGER.stats()
+    yield "onair_llm_calls_total", "counter", "모드별 LLM 호출 결과 (llm | deadline | error)", [
+        ({"mode": m, "outcome": o}, s[o]) for m, s in slo.items() for o in ("llm", "deadline", "error")]
+    yield "onair_llm_hedged_total", "counter", "hedge 요청을 보낸 호출 수", [({"mode": m}, s["hedged"]) for m, s in slo.items()]
+    yield "onair_llm_late_total", "counter", "마감 뒤 도착해 버린 응답 수", [({"mode": m}, s["late"]) for m, s in slo.items()]
+    yield "onair_llm_expired_total", "counter", "hedge 풀이 밀려 보내지 않고 버린 시도 수", [
+        ({"mode": m}, s["expired"]) for m, s in slo.items()]
+    yield "onair_replies_total", "counter", "사용자에게 나간 답 (source=llm | fallback: 규칙엔진)", [
+        ({"mode": m, "source": src}, n) for m, s in slo.items()
+        for src, n in (("llm", s["replies"] - s["fallback"]), ("fallback", s["fallback"]))]
+
+    ts = _built_stats(TTS_CACHE) or {}
+    yield "onair_tts_cache_requests_total", "counter", "TTS 캐시 조회 결과", [
+        ({"result": k}, ts.get(k, 0)) for k in ("mem_hits", "disk_hits", "misses")]
+    yield "onair_tts_errors_total", "counter", "gTTS 합성 실패 수", [({}, ts.get("synth_errors", 0))]
+    yield "onair_tts_cache_bytes", "gauge", "TTS 캐시 사용량", [({"tier": "mem"}, ts.get("mem_bytes", 0)),
+                                                            ({"tier": "disk"}, ts.get("disk_bytes", 0))]
+
+    fw = _built_stats(FEEDBACK_WORKER) or {}
+    yield "onair_feedback_jobs_total", "counter", "피드백 사전 계산 작업", [
+        ({"result": k}, fw.get(k, 0)) for k in ("completed", "failed", "rejected")]
+    yield "onair_feedback_queue_depth", "gauge", "피드백 사전 계산 대기열 길이", [({}, fw.get("queue_depth", 0))]
+
+    ns = _built_stats(NOTICES) or {}
+    yield "onair_notice_views_total", "counter", "공지 상세 조회 수", [({}, ns.get("views", 0))]
+    yield "onair_notice_view_flushes_total", "counter", "조회수 일괄 반영 횟수", [({}, ns.get("flushes", 0))]
+    yield "onair_notice_pending_views", "gauge", "아직 DB에 반영 안 된 조회수", [({}, ns.get("pending_views", 0))]
+
+    if PAGE_CACHE:
+        pg = PAGE_CACHE.stats()
+        yield "onair_page_cache_requests_total", "counter", "페이지 렌더 캐시 조회 결과", [
+            ({"result": k}, pg[k]) for k in ("hits", "misses", "uncached")]
+        yield "onair_page_cache_not_modified_total", "counter", "ETag 일치로 304를 보낸 수", [({}, pg["not_modified"])]
+        yield "onair_page_cache_invalidations_total", "counter", "템플릿 변경으로 비운 횟수", [({}, pg["invalidations"])]
+
+    an = _built_stats(ANALYTICS)
+    if an:
+        yield "onair_analytics_sessions_total", "counter", "분석 저장소에 기록된 종료 세션 수", [({}, an["sessions"])]
+        yield "onair_analytics_scores_total", "counter", "피드백 점수 기록 (result=inline | late | dropped)", [
+            ({"result": "inline"}, an["scores"] - an["late_scores"] - an["late_dropped"]),
+            ({"result": "late"}, an["late_scores"]), ({"result": "dropped"}, an["late_dropped"])]
+        yield "onair_analytics_rows_written_total", "counter", "Parquet 파일로 쓴 행 수", [({}, an["rows_written"])]
+        yield "onair_analytics_pending_rows", "gauge", "아직 파일에 안 쓴 행 수", [({}, an["pending"])]
+
+    if PROMPT_CACHE:
+        pc = PROMPT_CACHE.stats()
+        yield "onair_prompt_cache_tokens_saved_total", "counter", "cachedContents로 아낀 입력 토큰", [({}, pc["tokens_saved"])]
+    if ADMISSION:
+        adm = ADMISSION.stats()
+        yield "onair_admission_active", "gauge", "키별 진행 중 슬롯", [({"key": k}, s["active"]) for k, s in adm.items()]
+        yield "onair_admission_waiting", "gauge", "키별 대기열 길이", [({"key": k}, s["waiting"]) for k, s in adm.items()]
+        yield "onair_admission_rejected_total", "counter", "키별 거절(503) 수", [
+            ({"key": k, "reason": r}, s[r]) for k, s in adm.items() for r in ("rejected", "timed_out")]
+
+@route("/metrics")
+def metrics():
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+# ───────────────────────── 요청 프로파일링 (옵트인) ─────────────────────────
+# PROFILE_ENABLED=1 일 때만 훅/엔드포인트를 등록한다 (꺼져 있으면 span()은 no-op).
+# 트리거: 헤더 X-Profile: 1|sample|cprofile (X-Profile-Token == PROFILE_TOKEN 필요) 또는 PROFILE_SAMPLE_RATE 확률.
+# PROFILE_TOKEN이 없으면 헤더 트리거와 /debug/profiles는 항상 403 (샘플링 결과는 PROFILE_DIR 파일로만).
+# 결과: 응답 헤더 X-Profile-Id, /debug/profiles(색인), /debug/profiles/<id>(구간/상위 함수), /debug/profiles/<id>.folded|.prof
+PROFILER = Profiler(
+    TraceStore(os.environ.get("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".profiles")),
+               max_traces=int(os.environ.get("PROFILE_MAX_TRACES", 200))),
+    sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", 0)),
+    mode=os.environ.get("PROFILE_MODE", "sample"),
+    interval=float(os.environ.get("PROFILE_INTERVAL_MS", 2)) / 1000,
+    token=os.environ.get("PROFILE_TOKEN") or None,
+) if os.environ.get("PROFILE_ENABLED", "0") == "1" else None
+
+if PROFILER and not PROFILER.token:
+    log.warning("[profile] PROFILE_TOKEN unset: X-Profile header and /debug/profiles are disabled")
+
+def _profile_start():
+    if request.path.startswith(("/debug/profiles", "/static/", "/metrics")): return
+    t = PROFILER.start(request.headers, method=request.method, path=request.path, endpoint=request.endpoint)
+    if t: g.profile = t
+
+def _profile_finish(rv):
+    t = g.pop("profile", None)
+    if t:
+        rv.headers["X-Profile-Id"] = t.id
+        rv.call_on_close(lambda: PROFILER.finish(t, status=rv.status_code))
+    return rv
+
+def _template_span_start(sender, template, context, **extra):
+    t = current_trace()
+    if t: g.template_span = t.span("render:" + (template.name or "?")).__enter__()
+
+def _template_span_end(sender, template, context, **extra):
+    sp = g.pop("template_span", None)
+    if sp: sp.__exit__(None, None, None)
+
+def profiles_index():
+    if not PROFILER.allowed(request.headers): abort(403)
+    return jsonify({"items": PROFILER.store.index(request.args.get("limit", 50, type=int))})
+
+def profile_detail(trace_id, ext="json"):
+    if not PROFILER.allowed(request.headers): abort(403)
+    path = PROFILER.store.file(trace_id, ext)
+    if not path: abort(404)
+    return send_file(path, mimetype="application/json" if ext == "json" else "application/octet-stream",
+                     as_attachment=ext != "json", download_name=f"{trace_id}.{ext}")
+
+def install_profiler(app):
+    app.before_request_funcs.setdefault(None, []).insert(0, _profile_start)    # 다른 before_request보다 먼저
+    app.after_request(_profile_finish)
+    before_render_template.connect(_template_span_start, app)
+    template_rendered.connect(_template_span_end, app)
+    app.add_url_rule("/debug/profiles", "profiles_index", profiles_index)
+    app.add_url_rule("/debug/profiles/<trace_id>", "profile_detail", profile_detail)
+    app.add_url_rule("/debug/profiles/<trace_id>.<any(folded, prof):ext>", "profile_file", profile_detail)
 
-@app.route("/api/login", methods=["POST"])
+# ───────────────────────── Firebase 로그인 세션 동기화 ─────────────────────────
+def _firebase_auth():
+    # 첫 로그인 요청 때 firebase_admin 임포트 + 초기화 (키 파일이 없으면 verify_id_token이 예외 → 400)
+    import firebase_admin
+    from firebase_admin import auth, credentials
+    if not firebase_admin._apps:
+        cred_path = os.path.join(BASE_DIR, "firebase-admin-key.json")
+        if os.path.exists(cred_path):
+            firebase_admin.initialize_app(credentials.Certificate(cred_path))
+        else:
+            log.warning("⚠️ firebase-key.json not found → Firebase auth disabled")
+    return auth
+
+FIREBASE_AUTH = Lazy(_firebase_auth, "firebase")
+
+@route("/api/login", methods=["POST"])
 def api_login():
     try:
         data = request.get_json()
         id_token = data.get("idToken")
         if not id_token: return jsonify({"success": False, "error": "missing idToken"}), 400
-        decoded = firebase_admin.auth.verify_id_token(id_token)
+        decoded = FIREBASE_AUTH.verify_id_token(id_token)
         uid = decoded["uid"]
         session["user"] = {"uid": uid, "email": decoded.get("email"), "name": decoded.get("name")}
         log.info(f"[LOGIN] Firebase user {uid} authenticated.")
@@ -582,96 +1350,146 @@ def api_login():
         log.warning(f"[LOGIN ERROR] {e}")
         return jsonify({"success": False, "error": str(e)}), 400
 
-@app.route("/api/logout", methods=["POST"])
+@route("/api/logout", methods=["POST"])
 def api_logout():
     session.clear()
     return jsonify({"success": True})
 
-@app.context_processor
+@hook("context_processor")
 def inject_user():
     return dict(user=session.get("user"))
 
-@app.route("/logout")
+@route("/logout")
 def logout_page():
     session.clear()
     return redirect(url_for("main"))
 
 # ───────────────────────── 서비스/FAQ/구독 관련 페이지 ─────────────────────────
-@app.route("/about")
+@route("/about")
+@cached_page
 def about():
     return render_template("about.html")
 
-@app.route("/faq-index")
+@route("/faq-index")
+@cached_page
 def faq_index():
     return render_template("faq-index.html")
 
-@app.route("/faq-learning")
+@route("/faq-learning")
+@cached_page
 def faq_learning():
     return render_template("faq-learning.html")
 
-@app.route("/faq-progress")
+@route("/faq-progress")
+@cached_page
 def faq_progress():
     return render_template("faq-progress.html")
 
-@app.route("/faq-subscription")
+@route("/faq-subscription")
+@cached_page
 def faq_subscription():
     return render_template("faq-subscription.html")
 
-@app.route("/faq-video")
+@route("/faq-video")
+@cached_page
 def faq_video():
     return render_template("faq-video.html")
 
-@app.route("/inquiry")
+@route("/inquiry")
+@cached_page
 def inquiry():
     return render_template("inquiry.html")
 
-@app.route("/qna")
+@route("/qna")
+@cached_page
 def qna():
     return render_template("qna.html")
 
-@app.route("/terms")
+@route("/terms")
+@cached_page
 def terms():
     return render_template("terms.html")
 
-@app.route("/feed")
+@route("/feed")
+@cached_page
 def feed_page():
     return render_template("feed.html")
 
 # ───────────────────────── 기타 페이지 라우트 ─────────────────────────
-@app.route("/community-new")
+@route("/community-new")
+@cached_page
 def community_new():
     return render_template("community_new.html")
 
-@app.route("/notice-detail")
+@route("/notice-detail")
 def notice_detail():
-    return render_template("notice_detail.html")
-
-@app.route("/feedback-dashboard")
+    post = NOTICES.get(request.args.get("post_id", 0, type=int))
+    if post is None: abort(404)
+    NOTICES.view(post["id"])
+    post["views"] += 1
+    category = request.args.get("category") or None      # 분류 필터 목록에서 왔으면 이전/다음 글도 그 분류 안에서
+    newer, older = NOTICES.neighbors(post, category)
+    return render_template("notice_detail.html", post=post, newer=newer, older=older, category=category)
+
+@route("/feedback-dashboard")
+@cached_page
 def feedback_dashboard():
     return render_template("feedback_dashboard.html")
 
-@app.route("/feedback-report")
+@route("/feedback-report")
+@cached_page
 def feedback_report():
     return render_template("feedback_report.html")
 
-@app.route("/mypage")
+@route("/mypage")
+@cached_page
 def mypage():
     return render_template("mypage.html")
 
-@app.route("/success")
+@route("/success")
+@cached_page
 def success():
     return render_template("success.html")
 
-@app.route("/tip")
+@route("/tip")
+@cached_page
 def tip():
     return render_template("tip.html")
 
 
 # 고객센터 페이지 (FAQ 메인)
-@app.route("/service")
+@route("/service")
+@cached_page
 def service_page():
     return render_template("faq-index.html")
 
+# ───────────────────────── 앱 팩토리 ─────────────────────────
+def warm(app):
+    """prefork 마스터(gunicorn --preload)에서 한 번: 무거운 모듈 임포트 + 템플릿 컴파일.
+    소켓/스레드/DB 연결은 만들지 않으므로 fork 후 워커들이 이 메모리를 copy-on-write로 공유한다."""
+    import gtts, requests, firebase_admin.auth, gemini_client
+    if ANALYTICS: import analytics_store
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        try: app.jinja_env.get_template(name)
+        except Exception as e: log.warning(f"[warm] template {name}: {e}")   # 깨진 템플릿은 렌더 때 기존처럼 500
+
+def create_app(config: dict = None):
+    """Flask 앱 생성. Gemini/TTS/Firebase/세션·공지·분석 저장소는 여기서 만들지 않고 첫 사용 때 만든다 (Lazy).
+    config는 app.config에 덮어쓴다 (예: {"SECRET_KEY": ..., "TESTING": True}). APP_WARM=1 이면 warm(app)"""
+    app = Flask(__name__, template_folder="templates", static_folder="static")
+    app.url_map.strict_slashes = False
+    app.secret_key = os.environ.get("FLASK_SECRET_KEY", "super-secret-onair-key")
+    if config: app.config.update(config)
+    for kind, fn in _HOOKS: getattr(app, kind)(fn)
+    for rule, options, view in _ROUTES: app.add_url_rule(rule, view_func=view, **options)
+    assets = install_static_assets(app, STATIC_DIST)
+    if assets: app.extensions["static_assets"] = assets
+    if PROFILER: install_profiler(app)
+    if os.environ.get("APP_WARM", "0") == "1": warm(app)
+    return app
+
+app = create_app()
+
 # ───────────────────────── 실행부 ─────────────────────────
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,279 @@
+# async_server.py
+# -*- coding: utf-8 -*-
+# 시뮬레이션/TTS API용 asyncio(tornado) 서빙 경로.
+#  - /api/chat/send, /api/call/send : Gemini 호출은 AsyncHTTPClient로 논블로킹 (hedge/마감/입장 제어/프롬프트 캐시 동일),
+#                                      입장 대기는 루프의 future로, 세션 잠금·저장과 턴 시작(기록/분석 저장)만 잠깐 스레드에서
+#  - /api/tts                        : 캐시 조회(디스크 읽기 포함)와 미적중 합성(gTTS, 동기 라이브러리)을 제한된 스레드 풀에서
+#  - /api/feedback_data/<id>         : 캐시/백그라운드 결과 대기는 루프에서, 직접 계산만 스레드 풀에서
+#  - 그 외 모든 경로(페이지, SSE 스트림, /api/tts/audio ...) : Flask 앱을 스레드 풀에서 실행하고 청크 단위로 흘려보냄
+# 대기 중인 요청이 스레드를 잡지 않으므로 워커 하나가 스레드 수보다 훨씬 많은 세션을 동시에 처리한다.
+#
+#   python async_server.py --port 5000
+import argparse, asyncio, base64, contextlib, contextvars, json, logging, os, time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+import tornado.ioloop, tornado.web
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+from tornado.wsgi import WSGIContainer
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+import app as onair
+from admission import Overloaded
+from session_store import SessionBusy
+
+log = logging.getLogger("onair.async")
+
+WSGI_THREADS = int(os.environ.get("ASYNC_WSGI_THREADS", 32))      # Flask 경로 실행용
+BLOCKING_THREADS = int(os.environ.get("ASYNC_BLOCKING_THREADS", 32))  # 세션 잠금/턴 시작/TTS 캐시·gTTS/피드백 계산용
+WSGI_POOL = ThreadPoolExecutor(max_workers=WSGI_THREADS, thread_name_prefix="async-wsgi")
+BLOCKING_POOL = ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix="async-blocking")
+
+
+def _run(fn, *args, pool=BLOCKING_POOL):
+    return asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+
+# ───────────────────────── 세션 ─────────────────────────
+class AsyncSession:
+    """store.session(sid)의 진입(잠금 대기·로드)과 종료(저장·해제)를 스레드 풀에서 실행한다.
+    잠금은 threading.Lock/DB 임대라 다른 스레드에서 풀어도 된다."""
+
+    def __init__(self, sid):
+        self._cm = onair.STATE["sessions"].session(sid)
+
+    async def __aenter__(self):
+        return await _run(self._cm.__enter__)
+
+    async def __aexit__(self, *exc):
+        return await _run(self._cm.__exit__, *exc)
+
+
+# ───────────────────────── Gemini (논블로킹) ─────────────────────────
+async def _fetch(body: str, key: str, timeout, priority: int, cost: int, queue_timeout: float):
+    """(status, data). 입장 제어가 켜져 있으면 슬롯을 얻은 뒤 전송하고 usageMetadata로 정산한다.
+    리미터는 입장~반납 동안 pinned로 붙잡아 둔다 (그 사이 다른 키 삽입에 내보내지면 키별 상한이 둘로 갈림)."""
+    with onair.ADMISSION.pinned(key) if onair.ADMISSION else contextlib.nullcontext() as lim:
+        ticket = await lim.acquire_async(priority, cost, queue_timeout) if lim else None
+        t0 = time.monotonic()
+        try:
+            with onair.GEMINI.tracked() as call:
+                resp = await AsyncHTTPClient().fetch(HTTPRequest(
+                    onair.GEMINI.url("generateContent") + "?key=" + quote(key), method="POST", body=body.encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                    connect_timeout=timeout[0], request_timeout=timeout[0] + timeout[1]), raise_error=False)
+                call["status"] = resp.code
+            data = json.loads(resp.body) if resp.code == 200 and resp.body else None
+            if lim:
+                if resp.code == 429: lim.throttle()
+                elif data and data.get("usageMetadata"):
+                    ticket.settle(int(data["usageMetadata"].get("totalTokenCount") or 0))
+            return resp.code, data
+        finally:
+            if lim: lim.release(ticket, (time.monotonic() - t0) * 1000)
+
+
+async def call_gemini_async(sim):
+    """app.call_gemini의 비동기 버전: 같은 본문/프롬프트 캐시/SLO/입장 제어를 쓰고 HTTP만 논블로킹."""
+    key = onair.STATE["keys"].get("gemini")
+    if not key: return None
+    mode = sim.get("mode", "chat")
+    sid = sim.get("session_id")
+    name = onair.prompt_handle(sim, key)
+    body = onair.gemini_body(sim, name)
+    inline = onair.gemini_body(sim) if name else body
+    timeout, adm = onair._llm_timeout(mode), onair._admission_args(sim, mode)
+
+    async def attempt():
+        code, data = await _fetch(body, key, timeout, **adm())
+        if name and code in onair.CACHE_MISS_STATUSES:
+            onair.PROMPT_CACHE.invalidate(onair._prompt_key(sim), key)
+            code, data = await _fetch(inline, key, timeout, **adm())
+        return code, data
+
+    def on_late(result, ms):
+        onair.GEMINI.record_usage(result[1].get("usageMetadata"))
+        log.info(f"[Gemini] late reply discarded ({mode}, {ms:.0f}ms, session={sid})")
+
+    try:
+        res, outcome = await onair.LLM_HEDGER.acall(mode, attempt, accept=lambda r: r[0] == 200, on_late=on_late)
+    except Exception:
+        log.exception("[Gemini async] Exception")
+        return None
+    if res is None:
+        log.warning(f"[Gemini] no reply within SLO ({mode}: {outcome})")
+        return None
+    u = onair.record_usage(sim, res[1].get("usageMetadata"))
+    if name and u["cached"]: onair.PROMPT_CACHE.record(u["cached"])
+    onair.STATE["provider"] = "gemini"; onair.STATE["model"] = onair.GEMINI_MODEL
+    return onair.clean_text(onair._candidate_text(res[1]))
+
+
+async def simulate_send_async(sim, text):
+    if await _run(onair.begin_turn, sim, text):
+        return None
+    reply = await call_gemini_async(sim)
+    onair.note_reply(sim, not reply)
+    if not reply:
+        reply = onair.rule_based_next(sim, onair._last_user_text(sim))
+    return onair.finish_turn(sim, reply)
+
+
+# ───────────────────────── 핸들러 ─────────────────────────
+class JsonHandler(tornado.web.RequestHandler):
+    endpoint = None     # /metrics 라벨 (Flask 엔드포인트 이름과 같게)
+
+    def on_finish(self):
+        onair.ROUTE_SECONDS.observe(self.request.request_time(), self.endpoint, self.request.method, str(self.get_status()))
+
+    def json_body(self) -> dict:
+        try: return json.loads(self.request.body or b"{}") or {}
+        except ValueError: return {}
+
+    def reply(self, obj, status=200, headers=None):
+        self.set_status(status)
+        for k, v in (headers or {}).items(): self.set_header(k, v)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(obj, ensure_ascii=False))
+
+    def busy(self, retry_after):
+        self.reply({"error": "busy", "retry_after": retry_after}, 503, {"Retry-After": str(retry_after)})
+
+
+class SendHandler(JsonHandler):
+    """/api/chat/send, /api/call/send"""
+
+    @property
+    def endpoint(self):
+        return "call_send" if self.request.path.startswith("/api/call/") else "chat_send"
+
+    async def post(self):
+        data = self.json_body()
+        sid, text = data.get("session_id"), (data.get("text") or "").strip()
+        key = onair.STATE["keys"].get("gemini")
+        retry = onair.ADMISSION.saturated(key) if onair.ADMISSION and key else None
+        if retry: return self.busy(retry)
+        try:
+            async with AsyncSession(sid) as sim:
+                if not sim: return self.reply({"error": "session not found"}, 404)
+                if sim["ended"]: return self.reply({"error": "session ended"}, 400)
+                reply = await simulate_send_async(sim, text)
+                if sim["ended"] and reply is None:
+                    return self.reply({"rounds": sim["rounds"], "ended": True})
+                self.reply({"reply": reply, "rounds": sim["rounds"], "ended": sim["ended"]})
+        except SessionBusy:
+            self.reply({"error": "session busy"}, 409)
+
+
+class TTSHandler(JsonHandler):
+    """POST /api/tts (JSON base64 또는 audio/mpeg). Range 재생용 GET /api/tts/audio는 Flask 경로."""
+    endpoint = "tts_api"
+
+    async def post(self):
+        text = self.json_body().get("text", "")
+        if not text: return self.reply({"error": "text required"}, 400)
+        cache = onair.TTS_CACHE
+        _, mp3 = await _run(cache.get_or_create, text, "ko", onair.synthesize_mp3)
+        accept = parse_accept_header(self.request.headers.get("Accept"), MIMEAccept)
+        if self.get_argument("format", None) != "mp3" and accept.best_match(["application/json", "audio/mpeg"]) != "audio/mpeg":
+            return self.reply({"mp3_base64": base64.b64encode(mp3).decode()})
+        etag = f'"{cache.key(text, "ko")}"'
+        self.set_header("ETag", etag)
+        self.set_header("Cache-Control", "public, max-age=86400")
+        if etag in (self.request.headers.get("If-None-Match") or ""):
+            self.set_status(304); return self.finish()
+        self.set_header("Content-Type", "audio/mpeg")
+        self.finish(mp3)
+
+
+class FeedbackDataHandler(JsonHandler):
+    """GET /api/feedback_data/<session_id> — Flask 버전과 같은 응답 규약 (200 / 202 pending / 503 busy)."""
+    endpoint = "get_feedback_data"
+
+    async def get(self, session_id):
+        sim = await _run(onair.STATE["sessions"].get, session_id)
+        if not sim: return self.reply({"error": "세션을 찾을 수 없습니다."}, 404)
+        messages = sim.get("messages", [])
+        if not messages: return self.reply({"error": "대화 내용이 없습니다."}, 404)
+        key = onair.FEEDBACK_CACHE.key(session_id, messages)
+        feedback = onair.FEEDBACK_CACHE.peek(key)
+        if feedback is None and onair.FEEDBACK_WORKER.pending(key):
+            # 백그라운드 계산 완료를 스레드 없이 폴링으로 기다린다
+            until = time.monotonic() + max(0.0, min(float(self.get_argument("wait", 0) or 0), 25.0))
+            while onair.FEEDBACK_WORKER.pending(key) and time.monotonic() < until:
+                await asyncio.sleep(0.1)
+            if onair.FEEDBACK_WORKER.pending(key):
+                return self.reply({"ok": False, "pending": True}, 202, {"Retry-After": "1"})
+            feedback = onair.FEEDBACK_CACHE.peek(key)
+        if feedback is None:
+            try:
+                feedback = await _run(onair.feedback_for, session_id, messages, self.request.headers.get("X-API-Key"))
+            except Overloaded as e:
+                return self.busy(e.retry_after)
+        self.reply({"ok": True, "feedback": feedback["feedback"], "score": feedback["score"]})
+
+
+class FlaskBridge(tornado.web.RequestHandler):
+    """나머지 경로: Flask 앱을 스레드 풀에서 실행하고 본문을 청크가 나오는 대로 전송한다.
+    (tornado의 WSGIContainer는 응답 전체를 모은 뒤 보내므로 SSE가 끊겨 보인다)"""
+    SUPPORTED_METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+    _environ = WSGIContainer(onair.app).environ
+
+    async def _bridge(self, *args):
+        started = {}
+        ctx = contextvars.Context()   # stream_with_context 제너레이터는 매 next()마다 같은 컨텍스트여야 한다
+
+        def start_response(status, headers, exc_info=None):
+            started["status"], started["headers"] = status, headers
+            return lambda chunk: None
+
+        body = await _run(ctx.run, onair.app, self._environ(self.request), start_response, pool=WSGI_POOL)
+        code, reason = started["status"].split(" ", 1)
+        self.set_status(int(code), reason)
+        self.clear_header("Content-Type")
+        for k, v in started["headers"]:
+            self.add_header(k, v)
+        it = iter(body)
+        try:
+            while True:
+                chunk = await _run(ctx.run, next, it, None, pool=WSGI_POOL)
+                if chunk is None: break
+                if chunk and self.request.method != "HEAD":
+                    self.write(chunk)
+                    await self.flush()
+        finally:
+            if hasattr(body, "close"): await _run(ctx.run, body.close, pool=WSGI_POOL)
+        self.finish()
+
+    get = head = post = put = patch = delete = options = _bridge
+
+    def compute_etag(self):
+        return None   # ETag는 Flask가 붙인 값을 그대로
+
+
+def make_app():
+    return tornado.web.Application([
+        (r"/api/(?:chat|call)/send", SendHandler),
+        (r"/api/tts", TTSHandler),
+        (r"/api/feedback_data/([^/]+)", FeedbackDataHandler),
+        (r"/.*", FlaskBridge),
+    ])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=5000)
+    ap.add_argument("--max-clients", type=int, default=int(os.environ.get("ASYNC_MAX_CLIENTS", 1000)),
+                    help="동시 Gemini 연결 수 (AsyncHTTPClient)")
+    ap.add_argument("--backlog", type=int, default=int(os.environ.get("ASYNC_BACKLOG", 1024)),
+                    help="listen backlog (기본 128이면 동시 접속이 몰릴 때 SYN 재전송으로 1~3초씩 지연)")
+    a = ap.parse_args()
+    AsyncHTTPClient.configure(None, max_clients=a.max_clients)
+    make_app().listen(a.port, a.host, backlog=a.backlog, xheaders=True)
+    log.info(f"async server on {a.host}:{a.port}")
+    tornado.ioloop.IOLoop.current().start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# batch_feedback.py
+# -*- coding: utf-8 -*-
+# 내보낸 세션 기록(JSONL)을 일괄 재채점하는 CLI. 채점 기준(FEEDBACK_RUBRIC)을 바꾼 뒤 과거 세션을 다시 평가할 때 쓴다.
+#  - 입력: 한 줄에 세션 하나 (LOG_SPILL_PATH 파일, /api/logs의 items, 분석 저장소 행 등)
+#          messages 목록 또는 transcript(JSON 문자열)를 읽는다. 파일을 한 줄씩 흘려 읽으므로 크기와 무관
+#  - 채점: app.generate_feedback_with_gemini를 스레드 풀로 병렬 호출 (동시 --concurrency개, 대기 중인 줄도 그 2배까지만)
+#          입장 제어 거절(Overloaded)은 Retry-After만큼 쉬고 다시 시도
+#  - 출력: <out>/part-NNNNN.parquet (zstd) — 세션/대화록 해시/기준 해시/점수/피드백
+#  - 건너뛰기: (대화록 해시, 기준 해시)가 이미 출력에 있으면 호출하지 않는다 → 같은 기준으로 다시 돌려도 새 것만,
+#             기준을 바꾸면 전부 다시 채점
+#  - 재개: part 파일을 쓸 때마다 <out>/_checkpoint.json에 "여기까지의 줄은 모두 끝남" 바이트 위치를 기록
+#          중단 후 같은 명령을 다시 실행하면 그 위치부터 읽는다 (--restart: 처음부터, 실패한 세션만 다시 시도하는 용도)
+#
+#   python batch_feedback.py sessions.jsonl --out feedback_batch --concurrency 8
+#   python batch_feedback.py sessions.jsonl --out /tmp/fb --stub          # 로컬 Gemini 스텁으로 (benchmarks/gemini_stub.py)
+import argparse, hashlib, json, logging, os, sys, threading, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from feedback_cache import transcript_hash
+
+log = logging.getLogger("onair")
+
+SCHEMA = pa.schema([
+    ("session_id", pa.string()), ("transcript_hash", pa.string()), ("rubric", pa.string()), ("mode", pa.string()),
+    ("scenario", pa.string()), ("topic", pa.string()), ("rounds", pa.int16()), ("score", pa.int8()),
+    ("feedback", pa.string()), ("model", pa.string()), ("scored_at", pa.timestamp("ms")), ("latency_ms", pa.float32()),
+])
+CHECKPOINT = "_checkpoint.json"     # _로 시작 → pq.read_table(out) 같은 데이터셋 리더가 무시
+MAX_OVERLOAD_RETRIES = 8
+
+
+def rubric_id(rubric: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\n{rubric}".encode("utf-8")).hexdigest()[:12]
+
+
+def read_sessions(f, offset: int = 0):
+    """(줄 끝 바이트 위치, 세션 dict 또는 None) 생성기. 깨진 줄/대화록 없는 줄은 None."""
+    if offset: f.seek(offset)
+    pos = offset
+    for raw in iter(f.readline, b""):
+        pos += len(raw)
+        try:
+            e = json.loads(raw)
+            messages = e.get("messages")
+            if messages is None and isinstance(e.get("transcript"), str): messages = json.loads(e["transcript"])
+        except (ValueError, AttributeError):
+            yield pos, None; continue
+        yield pos, (dict(e, messages=messages) if messages else None)
+
+
+class BatchScorer:
+    def __init__(self, out: str, score, rubric: str, model: str, concurrency: int = 4, flush_rows: int = 500):
+        self.out = out
+        self.score = score                  # messages -> {"feedback", "score"}
+        self.rubric = rubric
+        self.model = model
+        self.concurrency = concurrency
+        self.flush_rows = flush_rows
+        os.makedirs(out, exist_ok=True)
+        self._rows = []                     # 아직 part 파일에 안 쓴 결과
+        self._lock = threading.Lock()
+        self._stats = {"lines": 0, "scored": 0, "skipped": 0, "duplicates": 0, "failed": 0, "invalid": 0,
+                       "overload_retries": 0, "parts": 0}
+        self.done = self._scored_hashes()
+
+    # ───── 출력/체크포인트 ─────
+    def _parts(self):
+        return sorted(e.path for e in os.scandir(self.out) if e.name.startswith("part-") and e.name.endswith(".parquet"))
+
+    def _scored_hashes(self) -> set:
+        # 이전 실행 결과에서 이 기준으로 채점된 대화록 해시 (필요한 두 열만 읽는다)
+        done = set()
+        for p in self._parts():
+            t = pq.read_table(p, columns=["transcript_hash", "rubric"])
+            done.update(h for h, r in zip(t["transcript_hash"].to_pylist(), t["rubric"].to_pylist()) if r == self.rubric)
+        return done
+
+    def load_checkpoint(self, path: str) -> int:
+        try:
+            with open(os.path.join(self.out, CHECKPOINT), encoding="utf-8") as f: cp = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if cp.get("input") != os.path.abspath(path) or cp.get("rubric") != self.rubric:
+            return 0        # 다른 입력이거나 기준이 바뀜 → 처음부터 (이미 채점된 것은 해시로 건너뜀)
+        return int(cp.get("offset", 0))
+
+    def flush(self, path: str = None, offset: int = None):
+        with self._lock: rows, self._rows = self._rows, []
+        if rows:
+            name = f"part-{len(self._parts()) + 1:05d}-{int(time.time() * 1000)}.parquet"
+            tmp = os.path.join(self.out, f".{name}.tmp")
+            pq.write_table(pa.Table.from_pylist(rows, SCHEMA), tmp, compression="zstd")
+            os.replace(tmp, os.path.join(self.out, name))
+            self._stats["parts"] += 1
+        if path and path != "-" and offset is not None:
+            tmp = os.path.join(self.out, f".{CHECKPOINT}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"input": os.path.abspath(path), "offset": offset, "rubric": self.rubric,
+                           "model": self.model, "updated": time.time(), "stats": self._stats}, f)
+            os.replace(tmp, os.path.join(self.out, CHECKPOINT))
+
+    # ───── 채점 ─────
+    def _score_one(self, s: dict, h: str):
+        from admission import Overloaded
+        t0 = time.perf_counter()
+        for attempt in range(MAX_OVERLOAD_RETRIES):
+            try:
+                fb = self.score(s["messages"])
+                break
+            except Overloaded as e:
+                with self._lock: self._stats["overload_retries"] += 1
+                time.sleep(e.retry_after)
+        else:
+            fb = {"score": 0}
+        ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            if not (isinstance(fb.get("score"), int) and fb["score"] > 0):
+                self._stats["failed"] += 1      # 기록하지 않음 → --restart로 다시 돌리면 이것만 재시도
+                return
+            self._stats["scored"] += 1
+            self.done.add(h)
+            self._rows.append({"session_id": s.get("session_id"), "transcript_hash": h, "rubric": self.rubric,
+                               "mode": s.get("mode"), "scenario": s.get("scenario"), "topic": s.get("topic"),
+                               "rounds": s.get("rounds"), "score": fb["score"], "feedback": fb.get("feedback"),
+                               "model": self.model, "scored_at": int(time.time() * 1000), "latency_ms": ms})
+
+    def run(self, path: str, restart: bool = False, limit: int = None, progress: float = 5.0) -> dict:
+        offset = 0 if restart or path == "-" else self.load_checkpoint(path)
+        if offset: log.info("[batch] resume %s from byte %d", path, offset)
+        f = sys.stdin.buffer if path == "-" else open(path, "rb")
+        window = self.concurrency * 2       # 제출했지만 안 끝난 줄 상한 (입력을 앞질러 읽지 않게)
+        pending = {}                        # future -> (줄 번호, 줄 끝 위치)
+        ends = {}                           # 끝났지만 앞 줄이 아직이라 체크포인트에 못 넣은 줄
+        n, head, committed = 0, 0, offset   # 읽은 줄 수, 아직 안 끝난 가장 앞 줄, 체크포인트 위치
+        t_start = t_report = time.time()
+
+        def finish(i, end):
+            nonlocal head, committed
+            ends[i] = end
+            while head in ends: committed = ends.pop(head); head += 1
+
+        def reap(block):
+            nonlocal t_report
+            if pending:
+                done, _ = wait(list(pending), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    fut.result()
+                    finish(*pending.pop(fut))
+            if len(self._rows) >= self.flush_rows: self.flush(path, committed)
+            if progress and time.time() - t_report >= progress:
+                t_report, s = time.time(), self._stats
+                log.info("[batch] %d lines, %d scored, %d skipped, %d failed (%.1f/s)", s["lines"], s["scored"],
+                         s["skipped"] + s["duplicates"], s["failed"], s["scored"] / max(1e-9, t_report - t_start))
+
+        seen = set()      # 이번 실행에서 제출한 해시 (입력 안의 중복)
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch-feedback") as pool:
+                for end, s in read_sessions(f, offset):
+                    if limit is not None and n >= limit: break
+                    i, n = n, n + 1
+                    self._stats["lines"] += 1
+                    if s is None:
+                        self._stats["invalid"] += 1; finish(i, end); continue
+                    h = transcript_hash(s["messages"])
+                    if h in self.done or h in seen:
+                        self._stats["skipped" if h in self.done else "duplicates"] += 1; finish(i, end); continue
+                    seen.add(h)
+                    pending[pool.submit(self._score_one, s, h)] = (i, end)
+                    reap(len(pending) >= window)
+                while pending: reap(True)
+        finally:
+            # 중단(Ctrl-C)되어도 끝난 결과와 연속으로 끝난 구간까지의 위치는 남긴다
+            self.flush(path, committed)
+            if f is not sys.stdin.buffer: f.close()
+        return dict(self._stats, seconds=round(time.time() - t_start, 1))
+
+    def stats(self) -> dict:
+        with self._lock: return dict(self._stats, out=self.out, rubric=self.rubric, concurrency=self.concurrency)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("input", help="세션 JSONL 파일 (- 이면 표준 입력, 체크포인트 없음)")
+    ap.add_argument("--out", default="feedback_batch", help="결과 Parquet + _checkpoint.json 디렉터리")
+    ap.add_argument("--concurrency", type=int, default=4, help="동시 Gemini 호출 수")
+    ap.add_argument("--flush-rows", type=int, default=500, help="이만큼 모이면 part 파일 하나 + 체크포인트")
+    ap.add_argument("--limit", type=int, help="앞에서부터 이 줄 수만 처리")
+    ap.add_argument("--restart", action="store_true", help="체크포인트 무시하고 처음부터 (채점된 해시는 여전히 건너뜀)")
+    ap.add_argument("--key", help="Gemini API 키 (기본: GEMINI_API_KEY)")
+    ap.add_argument("--stub", action="store_true", help="로컬 Gemini 스텁을 띄워 거기에 붙는다")
+    ap.add_argument("--stub-latency", type=float, default=0.2)
+    a = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    stub = None
+    if a.stub:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+        import gemini_stub
+        stub, url, _ = gemini_stub.start(0, latency=a.stub_latency)
+        os.environ.update(GEMINI_BASE_URL=url, GEMINI_API_KEY=a.key or "stub-key")
+    elif a.key:
+        os.environ["GEMINI_API_KEY"] = a.key
+    # 일괄 채점에는 실시간 세션 부속(TTS 예열, 분석 기록)이 필요 없다
+    os.environ.setdefault("TTS_PREWARM", "0")
+    os.environ.setdefault("ANALYTICS", "0")
+    os.environ.setdefault("GEMINI_POOL_SIZE", str(max(a.concurrency, 10)))
+    import app as onair
+
+    scorer = BatchScorer(a.out, onair.generate_feedback_with_gemini, rubric_id(onair.FEEDBACK_RUBRIC, onair.GEMINI_MODEL),
+                         onair.GEMINI_MODEL, concurrency=a.concurrency, flush_rows=a.flush_rows)
+    log.info("[batch] rubric %s, %d transcripts already scored in %s", scorer.rubric, len(scorer.done), a.out)
+    try:
+        print(json.dumps(scorer.run(a.input, restart=a.restart, limit=a.limit), ensure_ascii=False))
+    except KeyboardInterrupt:
+        print(json.dumps(dict(scorer.stats(), interrupted=True), ensure_ascii=False))
+        sys.exit(130)
+    finally:
+        if stub: stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/bench_admission.py
+# -*- coding: utf-8 -*-
+# Gemini 입장 제어 부하 테스트 (로컬 스텁 대상).
+# 스텁은 동시 max_concurrent건을 넘으면 429 + Retry-After를 돌려준다(키별 쿼터 흉내).
+# 같은 채팅 턴 버스트를 입장 제어 끔/켬으로 돌려 지연 분포(p50/p95/p99), LLM 응답 비율,
+# 규칙엔진 폴백, 즉시 503 수, 스텁이 돌려준 429 수를 비교한다.
+#
+#   python benchmarks/bench_admission.py --clients 24 --turns 4 --upstream-limit 4 --latency 0.4
+import argparse, os, sys, threading, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import gemini_stub
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))] if xs else 0.0
+
+
+def burst(onair, clients, turns):
+    results, lock = [], threading.Lock()
+
+    def user(i):
+        c = onair.app.test_client()
+        sid = c.post("/api/chat/start", json={"scenario": "exchange"}).get_json()["session_id"]
+        for t in range(turns):
+            t0 = time.perf_counter()
+            r = c.post("/api/chat/send", json={"session_id": sid, "text": f"주문번호 2025{i:04d}{t} 교환할게요"})
+            ms = (time.perf_counter() - t0) * 1000
+            body = r.get_json() or {}
+            kind = "503" if r.status_code == 503 else ("llm" if body.get("reply") == gemini_stub.REPLY else "fallback")
+            with lock: results.append((ms, kind))
+            if r.status_code == 503: time.sleep(float(r.headers.get("Retry-After", 1)))
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(clients)]
+    t0 = time.perf_counter()
+    for th in threads: th.start()
+    for th in threads: th.join()
+    return results, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=24)
+    ap.add_argument("--turns", type=int, default=4)
+    ap.add_argument("--upstream-limit", type=int, default=4, help="스텁 동시 처리 한도 (넘으면 429)")
+    ap.add_argument("--latency", type=float, default=0.4)
+    ap.add_argument("--queue", type=int, default=64)
+    a = ap.parse_args()
+
+    server, url, state = gemini_stub.start(0, latency=a.latency, max_concurrent=a.upstream_limit)
+    os.environ.update(GEMINI_BASE_URL=url, GEMINI_API_KEY="stub-key", TTS_PREWARM="0", PROMPT_CACHE="0",
+                      GEMINI_MAX_CONCURRENCY=str(a.upstream_limit), GEMINI_QUEUE=str(a.queue),
+                      LLM_HEDGE_CHAT="8", LLM_DEADLINE_CHAT="8", GEMINI_POOL_SIZE=str(a.clients * 2))
+    import logging; logging.disable(logging.WARNING)
+    import app as onair
+    admission = onair.ADMISSION
+
+    print(f"{'admission':10s} {'turns':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} "
+          f"{'llm':>5s} {'fallback':>8s} {'503':>5s} {'upstream 429':>12s} {'sec':>6s}")
+    for label, adm in (("off", None), ("on", admission)):
+        onair.ADMISSION = onair.GEMINI.admission = adm
+        before = state.snapshot()["throttled"]
+        results, sec = burst(onair, a.clients, a.turns)
+        lat = [ms for ms, kind in results if kind != "503"]
+        count = lambda k: sum(1 for _, kind in results if kind == k)
+        print(f"{label:10s} {len(results):6d} {pct(lat, .5):8.0f} {pct(lat, .95):8.0f} {pct(lat, .99):8.0f} "
+              f"{count('llm'):5d} {count('fallback'):8d} {count('503'):5d} "
+              f"{state.snapshot()['throttled'] - before:12d} {sec:6.1f}")
+    print(f"\nadmission stats: {admission.stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/bench_analytics.py
+# -*- coding: utf-8 -*-
+# 세션 분석 저장소 벤치마크 (기본 200만 세션 / 30일).
+#  - 기록: record_session + record_feedback 처리량 (버퍼 + 일괄 Parquet 기록)
+#  - 조회: summary() 첫 호출(파일별 큐브 생성) / 이후 호출(큐브 캐시) / 기간·시나리오 필터
+#    vs 기존 방식에 해당하는 전체 로드(pandas.read_parquet 후 groupby)
+#  - 최대 RSS(ru_maxrss)는 단계마다 누적값이므로 전체 로드는 맨 마지막에 잰다
+#
+#   python benchmarks/bench_analytics.py --sessions 2000000 --days 30
+import argparse, os, resource, sys, tempfile, time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analytics_store import SCHEMA, AnalyticsStore
+
+SCENARIOS = ["hospital", "restaurant", "bank", "delivery", "school", "interview", "shopping", "hotel"]
+DAY = 86400
+
+
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _table(rnd, n, day0, i0):
+    ts = (day0 * DAY + rnd.integers(0, DAY, n)) * 1000
+    rounds = rnd.integers(1, 11, n)
+    replies = rounds
+    scored = rnd.random(n) < 0.8
+    return pa.table({
+        "session_id": pa.array([f"s{i}" for i in range(i0, i0 + n)]),
+        "ts": pa.array(ts, pa.timestamp("ms")),
+        "mode": pa.array(np.where(rnd.random(n) < 0.6, "call", "chat")),
+        "scenario": pa.array(np.array(SCENARIOS)[rnd.integers(0, len(SCENARIOS), n)]),
+        "topic": pa.array(["topic"] * n),
+        "rounds": pa.array(rounds, pa.int16()), "max_rounds": pa.array(np.full(n, 10), pa.int16()),
+        "replies": pa.array(replies, pa.int16()),
+        "fallbacks": pa.array(rnd.binomial(replies, 0.05), pa.int16()),
+        "duration_s": pa.array(rounds * rnd.uniform(8, 20, n), pa.float32()),
+        "score": pa.array(np.where(scored, rnd.integers(1, 6, n), 0), pa.int8(), mask=~scored),
+        "weight": pa.array(np.ones(n), pa.int8()),
+        "transcript": pa.array(['[{"role":"user","text":"안녕하세요, 예약하려고요"},{"role":"ai","text":"네, 말씀하세요"}]'] * n),
+    }, schema=SCHEMA)
+
+
+def seed(store, sessions, days, files_per_day):
+    rnd = np.random.default_rng(1)
+    per_file = sessions // (days * files_per_day)
+    day0, i = int(time.time()) // DAY - days + 1, 0
+    for d in range(days):
+        date = time.strftime("%Y-%m-%d", time.gmtime((day0 + d) * DAY))
+        for _ in range(files_per_day):
+            store._write(date, _table(rnd, per_file, day0 + d, i))
+            i += per_file
+    return i, time.strftime("%Y-%m-%d", time.gmtime((day0 + days - 7) * DAY))
+
+
+def bench_ingest(root, n):
+    store = AnalyticsStore(root, flush_rows=1000, flush_interval=3600)
+    t0 = time.perf_counter()
+    for i in range(n):
+        store.record_session(f"live{i}", time.time(), "call", SCENARIOS[i % len(SCENARIOS)], "topic",
+                             rounds=5, max_rounds=10, replies=5, fallbacks=int(i % 7 == 0), duration_s=60.0,
+                             transcript=[{"role": "user", "text": "안녕하세요"}])
+        store.record_feedback(f"live{i}", i % 5 + 1)
+    store.flush()
+    wall = time.perf_counter() - t0
+    print(f"{'ingest (record + score, flush 1000)':<40}: {n / wall:9.0f} sessions/s  ({store.stats()['files_written']} files)")
+    store.close()
+
+
+def _timeit(fn, reps=1):
+    t0 = time.perf_counter()
+    for _ in range(reps): out = fn()
+    return (time.perf_counter() - t0) / reps * 1000, out
+
+
+def bench_query(root, week_start):
+    store = AnalyticsStore(root, flush_interval=3600)
+    ms, s = _timeit(store.summary)
+    print(f"{'summary cold (build file cubes)':<40}: {ms:9.1f} ms  ({s['totals']['sessions']} sessions, RSS {_rss_mb():.0f} MB)")
+    ms, _ = _timeit(store.summary, 5)
+    print(f"{'summary warm':<40}: {ms:9.1f} ms")
+    ms, _ = _timeit(lambda: store.summary(week_start), 5)
+    print(f"{'summary last 7 days':<40}: {ms:9.1f} ms")
+    ms, _ = _timeit(lambda: store.summary(mode="call", scenario="hospital"), 5)
+    print(f"{'summary mode+scenario filter':<40}: {ms:9.1f} ms  (RSS {_rss_mb():.0f} MB)")
+    store.close()
+    return s
+
+
+def bench_full_load(root):
+    def naive():
+        df = pd.read_parquet(root)          # 모든 열/행을 메모리로
+        df = df[df["weight"] > 0]
+        return {"sessions": len(df), "avg_score": df["score"].mean(),
+                "by_scenario": df.groupby(["mode", "scenario"])["score"].mean().to_dict(),
+                "rounds": df["rounds"].value_counts().to_dict(),
+                "fallback_rate": df["fallbacks"].sum() / df["replies"].sum(),
+                "trend": df.groupby(df["ts"].dt.date)["score"].mean().to_dict()}
+    ms, s = _timeit(naive)
+    print(f"{'full load (read_parquet + groupby)':<40}: {ms:9.1f} ms  ({s['sessions']} sessions, RSS {_rss_mb():.0f} MB)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=2_000_000)
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--files-per-day", type=int, default=4)
+    ap.add_argument("--ingest", type=int, default=50_000)
+    ap.add_argument("--no-full-load", action="store_true", help="전체 로드 비교 생략 (메모리가 작을 때)")
+    a = ap.parse_args()
+
+    root = tempfile.mkdtemp()
+    seeder = AnalyticsStore(root, flush_interval=3600)
+    t0 = time.perf_counter()
+    n, week_start = seed(seeder, a.sessions, a.days, a.files_per_day)
+    size = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(root) for f in fs)
+    print(f"seed {n} sessions / {a.days} days: {time.perf_counter() - t0:.1f}s  ({size / 1e6:.1f} MB parquet)")
+    bench_ingest(tempfile.mkdtemp(), a.ingest)
+    bench_query(root, week_start)
+    if not a.no_full_load: bench_full_load(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/bench_async_serving.py
+# -*- coding: utf-8 -*-
+# 워커 하나당 동시 세션 처리량 비교: 기존 app.run(threaded) vs async_server.py (로컬 Gemini 스텁 대상).
+# 두 서버를 각각 하위 프로세스로 띄우고, 동시 세션 N개가 채팅 턴을 보내는 동안
+# 처리량(turn/s), 지연(p50/p95), 오류 수, 서버 프로세스의 최대 스레드 수/RSS(/proc)를 잰다.
+#
+#   python benchmarks/bench_async_serving.py --sessions 50 200 --turns 3 --latency 1.0
+import argparse, asyncio, json, os, subprocess, sys, threading, time
+import requests
+from tornado.httpclient import AsyncHTTPClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import gemini_stub
+
+SERVERS = {
+    "flask": lambda port: [sys.executable, "-c",
+                           f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True, debug=False)"],
+    "async": lambda port: [sys.executable, "async_server.py", "--host", "127.0.0.1", "--port", str(port)],
+}
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))] if xs else 0.0
+
+
+def proc_usage(pid):
+    """(스레드 수, RSS MB)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            kv = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(kv["Threads"]), int(kv["VmRSS"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        return 0, 0.0
+
+
+def wait_ready(base, timeout=20):
+    until = time.time() + timeout
+    while time.time() < until:
+        try:
+            if requests.get(base + "/healthz", timeout=1).status_code == 200: return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base} did not start")
+
+
+async def drive(base, sessions, turns):
+    # 부하 클라이언트도 asyncio (httpx 비동기 풀은 동시 연결 수백 개에서 클라이언트 쪽이 먼저 막혀 tornado 클라이언트 사용)
+    AsyncHTTPClient.configure(None, max_clients=sessions * 2)
+    client, results = AsyncHTTPClient(), []    # (ms, ok)
+
+    async def post(path, obj):
+        r = await client.fetch(base + path, method="POST", body=json.dumps(obj, ensure_ascii=False),
+                               headers={"Content-Type": "application/json"}, request_timeout=60, raise_error=False)
+        return r.code, (json.loads(r.body) if r.code == 200 and r.body else {})
+
+    async def user(i):
+        _, body = await post("/api/chat/start", {"scenario": "exchange", "rounds": turns + 5})
+        sid = body["session_id"]
+        for t in range(turns):
+            t0 = time.perf_counter()
+            code, body = await post("/api/chat/send", {"session_id": sid, "text": f"주문번호 2025{i:04d}{t} 교환할게요"})
+            results.append(((time.perf_counter() - t0) * 1000, code == 200 and body.get("reply") == gemini_stub.REPLY))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(sessions)))
+    return results, time.perf_counter() - t0
+
+
+def run(label, port, env, sessions, turns):
+    proc = subprocess.Popen(SERVERS[label](port), cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    peak, stop = [0, 0.0], threading.Event()
+
+    def sample():
+        while not stop.wait(0.1):
+            th, rss = proc_usage(proc.pid)
+            peak[0], peak[1] = max(peak[0], th), max(peak[1], rss)
+
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_ready(base)
+        threading.Thread(target=sample, daemon=True).start()
+        results, sec = asyncio.run(drive(base, sessions, turns))
+    finally:
+        stop.set()
+        proc.terminate(); proc.wait(10)
+    lat = [ms for ms, _ in results]
+    llm = sum(ok for _, ok in results)
+    print(f"{label:6s} {sessions:9d} {len(results) / sec:8.1f} {pct(lat, .5):8.0f} {pct(lat, .95):8.0f} "
+          f"{llm:5d} {len(results) - llm:6d} {peak[0]:8d} {peak[1]:8.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, nargs="+", default=[50, 200])
+    ap.add_argument("--turns", type=int, default=3)
+    ap.add_argument("--latency", type=float, default=1.0, help="스텁 응답 지연(초)")
+    ap.add_argument("--port", type=int, default=5090)
+    ap.add_argument("--servers", nargs="+", default=list(SERVERS), choices=list(SERVERS))
+    a = ap.parse_args()
+
+    server, url, _ = gemini_stub.start(0, latency=a.latency)
+    # 입장 제어/프롬프트 캐시/짧은 SLO는 꺼서 서빙 방식 차이만 본다
+    env = dict(os.environ, GEMINI_BASE_URL=url, GEMINI_API_KEY="stub-key", TTS_PREWARM="0", PROMPT_CACHE="0",
+               GEMINI_ADMISSION="0", LLM_HEDGE_CHAT="30", LLM_DEADLINE_CHAT="30", GEMINI_POOL_SIZE="512",
+               LLM_HEDGE_WORKERS="512")
+    print(f"stub latency {a.latency:.2f}s, {a.turns} turns/session")
+    print(f"{'server':6s} {'sessions':>9s} {'turn/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} "
+          f"{'llm':>5s} {'errors':>6s} {'threads':>8s} {'RSS MB':>8s}")
+    for n in a.sessions:
+        for label in a.servers:
+            run(label, a.port, env, n, a.turns)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
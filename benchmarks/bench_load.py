@@ -0,0 +1,251 @@
+# benchmarks/bench_load.py
+# -*- coding: utf-8 -*-
+# 종단 간 부하 테스트. 로컬 Gemini 스텁(gemini_stub) + gTTS 대역(tts_stub)을 붙인 앱을 프로세스 안의
+# 스레드 HTTP 서버로 띄우고, 여러 턴짜리 세션을 동시에 돌려 엔드포인트별로 집계한다.
+#  - 드라이버: chat(send) / chat-stream / call(send + /api/tts) / call-stream / call-turn(문장별 TTS 파이프라인)
+#    세션마다 start → 턴 N번 → 종료 턴 → /api/feedback_data 순서
+#  - 집계: 엔드포인트별 요청 수, 처리량(req/s), p50/p95/p99, 스트림 첫 이벤트 p50, LLM/폴백/오류 수,
+#          드라이버 단계별 RSS 증가량과 단계 후 남은 세션/로그 수
+#  - --replay: STATE["logs"]에 기록된 실제 대화(LOG_SPILL_PATH JSONL, /api/logs 응답 파일, 또는 실행 중인
+#              서버의 /api/logs URL)의 사용자 발화를 같은 순서로 다시 보낸다
+#
+#   python benchmarks/bench_load.py --sessions 20 --turns 4 --latency 0.3 --tts-latency 0.2
+#   python benchmarks/bench_load.py --drivers call-turn --fail-rate 0.1 --tts-fail-rate 0.05
+#   python benchmarks/bench_load.py --replay logs.jsonl --replay-via stream --sessions 8
+#   python benchmarks/bench_load.py --replay http://127.0.0.1:5000/api/logs
+import argparse, gc, json, os, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import gemini_stub, tts_stub
+
+SCRIPTS = {
+    "exchange": ["사이즈가 안 맞아서 교환하고 싶어요", "주문번호는 20250412 입니다", "상품명은 린넨 셔츠예요",
+                 "M 사이즈로 바꿔 주세요", "택배 회수는 언제 오나요?", "집 앞에 두시면 돼요"],
+    "shipping": ["택배가 아직 안 왔어요", "주문번호 20250318 이에요", "송장번호도 알려주실 수 있나요?",
+                 "언제쯤 도착할까요?", "부재 시 경비실에 맡겨 주세요", "문자로도 알려주세요"],
+    "consult": ["다음 주에 진료 예약하고 싶어요", "내과로 부탁드려요", "화요일 오전이 좋아요",
+                "이름은 김민수입니다", "연락처는 010-1234-5678 이에요", "준비물이 있을까요?"],
+}
+ENDING = "네, 감사합니다. 수고하세요."
+DRIVERS = ("chat", "chat-stream", "call", "call-stream", "call-turn")
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))] if xs else 0.0
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"): return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ───────────────────────── 집계 ─────────────────────────
+class Recorder:
+    def __init__(self):
+        self.rows = []     # (endpoint, ms, ttfb_ms 또는 None, outcome)  outcome ∈ llm | fallback | ok | error
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, ms, ttfb=None, outcome="ok"):
+        with self._lock: self.rows.append((endpoint, ms, ttfb, outcome))
+
+    def report(self, sec):
+        by = {}
+        for ep, ms, ttfb, outcome in self.rows: by.setdefault(ep, []).append((ms, ttfb, outcome))
+        print(f"  {'endpoint':24s} {'n':>5s} {'req/s':>7s} {'p50':>7s} {'p95':>7s} {'p99':>7s} {'ttfb50':>7s} "
+              f"{'llm':>5s} {'fallbk':>6s} {'err':>4s}")
+        for ep, rows in sorted(by.items()):
+            lat = [r[0] for r in rows]
+            ttfb = [r[1] for r in rows if r[1] is not None]
+            n = lambda k: sum(1 for r in rows if r[2] == k)
+            print(f"  {ep:24s} {len(rows):5d} {len(rows) / sec:7.1f} {pct(lat, .5):7.0f} {pct(lat, .95):7.0f} "
+                  f"{pct(lat, .99):7.0f} {(f'{pct(ttfb, .5):7.0f}' if ttfb else '      -')} "
+                  f"{n('llm'):5d} {n('fallback'):6d} {n('error'):4d}")
+
+
+# ───────────────────────── 클라이언트 ─────────────────────────
+class Client:
+    def __init__(self, base, rec):
+        self.base, self.rec, self.http = base, rec, requests.Session()
+
+    def post(self, endpoint, obj, **kw):
+        t0 = time.perf_counter()
+        try:
+            r = self.http.post(self.base + endpoint, json=obj, timeout=60, **kw)
+            body = r.json() if r.headers.get("Content-Type", "").startswith("application/json") else {}
+        except (requests.RequestException, ValueError):
+            r, body = None, {}
+        ms = (time.perf_counter() - t0) * 1000
+        return r, body, ms
+
+    def start(self, mode, scenario, rounds, topic=None):
+        obj = {"scenario": scenario, "rounds": rounds}
+        if topic: obj["topic"] = topic
+        r, body, ms = self.post(f"/api/{mode}/start", obj)
+        ok = r is not None and r.status_code == 200
+        self.rec.add(f"{mode}/start", ms, outcome="ok" if ok else "error")
+        return body.get("session_id") if ok else None
+
+    def send(self, mode, sid, text):
+        r, body, ms = self.post(f"/api/{mode}/send", {"session_id": sid, "text": text})
+        if r is None or r.status_code != 200: outcome = "error"
+        elif body.get("ended") and "reply" not in body: outcome = "ok"     # 종료 턴
+        else: outcome = "llm" if body.get("reply") == gemini_stub.REPLY else "fallback"
+        self.rec.add(f"{mode}/send", ms, outcome=outcome)
+        return body.get("reply")
+
+    def stream(self, mode, sid, text, route="stream"):
+        """SSE 턴. 첫 이벤트까지(ttfb)와 done까지 시간을 잰다."""
+        t0, ttfb, events = time.perf_counter(), None, []
+        try:
+            with self.http.post(f"{self.base}/api/{mode}/{route}", json={"session_id": sid, "text": text},
+                                stream=True, timeout=60) as r:
+                if r.status_code != 200: raise requests.HTTPError(r.status_code)
+                for line in r.iter_lines(decode_unicode=True):
+                    if line and line.startswith("event: "):
+                        if ttfb is None: ttfb = (time.perf_counter() - t0) * 1000
+                        events.append(line[7:])
+        except requests.RequestException:
+            events.append("error")
+        ms = (time.perf_counter() - t0) * 1000
+        if "error" in events or "done" not in events: outcome = "error"
+        elif "fallback" in events: outcome = "fallback"
+        elif len(events) == 1: outcome = "ok"       # 종료 턴 (done만)
+        else: outcome = "llm"
+        self.rec.add(f"{mode}/{route}", ms, ttfb, outcome)
+
+    def tts(self, text):
+        r, body, ms = self.post("/api/tts", {"text": text})
+        self.rec.add("tts", ms, outcome="ok" if r is not None and r.status_code == 200 and body.get("mp3_base64") else "error")
+
+    def feedback(self, sid):
+        t0 = time.perf_counter()
+        try:
+            r = self.http.get(f"{self.base}/api/feedback_data/{sid}", params={"wait": 10}, timeout=60)
+            ok = r.status_code == 200
+        except requests.RequestException:
+            ok = False
+        self.rec.add("feedback_data", (time.perf_counter() - t0) * 1000, outcome="ok" if ok else "error")
+
+
+# ───────────────────────── 드라이버 ─────────────────────────
+def turn(c, driver, sid, text):
+    if driver in ("chat", "call"):
+        reply = c.send(driver, sid, text)
+        if driver == "call" and reply: c.tts(reply)     # 전화 화면: 답변을 받아 음성 재생
+    elif driver == "call-turn":
+        c.stream("call", sid, text, "turn")
+    else:
+        c.stream(driver.split("-")[0], sid, text)
+
+
+def scripted_session(base, rec, driver, i, turns):
+    c = Client(base, rec)
+    scenario = list(SCRIPTS)[i % len(SCRIPTS)]
+    script = SCRIPTS[scenario]
+    sid = c.start("call" if driver.startswith("call") else "chat", scenario, turns + 1)
+    if not sid: return
+    for t in range(turns):
+        turn(c, driver, sid, script[t % len(script)])
+    turn(c, driver, sid, ENDING)      # 라운드 한도 도달 → 세션 종료 + 피드백 사전 계산
+    c.feedback(sid)
+
+
+def replay_session(base, rec, via, entry):
+    texts = [m.get("text", "") for m in entry.get("messages", []) if m.get("role") == "user" and m.get("text")]
+    if not texts: return
+    mode = entry.get("mode") if entry.get("mode") in ("call", "chat") else "chat"
+    c = Client(base, rec)
+    sid = c.start(mode, entry.get("scenario") or "exchange", len(texts), entry.get("topic"))
+    if not sid: return
+    driver = mode if via == "send" else ("call-turn" if via == "turn" and mode == "call" else f"{mode}-stream")
+    for text in texts: turn(c, driver, sid, text)
+    c.feedback(sid)
+
+
+def load_transcripts(src, limit):
+    """LOG_SPILL_PATH 형식 JSONL, /api/logs 응답(JSON) 파일, 또는 /api/logs URL(커서를 따라 끝까지)."""
+    if src.startswith(("http://", "https://")):
+        out, cursor = [], None
+        while len(out) < limit:
+            page = requests.get(src, params={"limit": 500, **({"cursor": cursor} if cursor is not None else {})},
+                                timeout=30).json()
+            out += page.get("items", [])
+            cursor = page.get("next_cursor")
+            if cursor is None: break
+        return out[:limit]
+    with open(src, encoding="utf-8") as f:
+        raw = f.read().strip()
+    if raw.startswith("{") and '"items"' in raw[:200]:
+        try: return json.loads(raw)["items"][:limit]
+        except ValueError: pass
+    return [json.loads(line) for line in raw.splitlines() if line.strip()][:limit]
+
+
+def phase(onair, label, jobs, concurrency):
+    gc.collect()
+    rss0, rec = rss_mb(), Recorder()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        for f in [ex.submit(job, rec) for job in jobs]: f.result()
+    sec = time.perf_counter() - t0
+    gc.collect()
+    print(f"\n[{label}] {len(jobs)} sessions, {sec:.1f}s, RSS {rss0:.1f} → {rss_mb():.1f} MB "
+          f"(+{rss_mb() - rss0:.1f}), sessions kept {len(onair.STATE['sessions'])}, logs {len(onair.STATE['logs'])}")
+    rec.report(sec)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=20, help="동시 세션 수")
+    ap.add_argument("--rounds", type=int, default=1, help="드라이버당 세션 묶음 반복 수 (메모리 증가 관찰용)")
+    ap.add_argument("--turns", type=int, default=4)
+    ap.add_argument("--drivers", nargs="+", default=list(DRIVERS), choices=DRIVERS)
+    ap.add_argument("--latency", type=float, default=0.3, help="Gemini 스텁 지연(초)")
+    ap.add_argument("--jitter", type=float, default=0.1)
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="Gemini 스텁 503 비율")
+    ap.add_argument("--tts-latency", type=float, default=0.2, help="gTTS 대역 합성 지연(초)")
+    ap.add_argument("--tts-fail-rate", type=float, default=0.0)
+    ap.add_argument("--replay", help="기록된 대화: JSONL/JSON 파일 경로 또는 /api/logs URL")
+    ap.add_argument("--replay-via", choices=("send", "stream", "turn"), default="send")
+    ap.add_argument("--replay-limit", type=int, default=1000)
+    a = ap.parse_args()
+
+    stub, url, gstate = gemini_stub.start(0, latency=a.latency, jitter=a.jitter, fail_rate=a.fail_rate)
+    os.environ.update(GEMINI_BASE_URL=url, GEMINI_API_KEY="stub-key", TTS_PREWARM="0",
+                      TTS_CACHE_DIR=tempfile.mkdtemp(prefix="onair-tts-"), GEMINI_POOL_SIZE=str(a.sessions * 2))
+    import logging; logging.disable(logging.WARNING)
+    import app as onair
+    from werkzeug.serving import make_server
+    tts = tts_stub.install(onair, latency=a.tts_latency, jitter=a.tts_latency / 2, fail_rate=a.tts_fail_rate)
+    server = make_server("127.0.0.1", 0, onair.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    print(f"app {base}  gemini stub latency {a.latency}s (+{a.jitter}) fail {a.fail_rate:.0%}, "
+          f"tts stub latency {a.tts_latency}s fail {a.tts_fail_rate:.0%}")
+
+    if a.replay:
+        entries = load_transcripts(a.replay, a.replay_limit)
+        jobs = [lambda rec, e=e: replay_session(base, rec, a.replay_via, e) for e in entries] * a.rounds
+        phase(onair, f"replay via {a.replay_via}", jobs, a.sessions)
+    else:
+        for driver in a.drivers:
+            jobs = [lambda rec, i=i: scripted_session(base, rec, driver, i, a.turns)
+                    for i in range(a.sessions)] * a.rounds
+            phase(onair, driver, jobs, a.sessions)
+
+    print(f"\ngemini stub: {gstate.snapshot()}\ntts stub: {tts.stats()}\nslo: {onair.LLM_HEDGER.stats()}")
+    server.shutdown(); stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
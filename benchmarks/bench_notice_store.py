@@ -0,0 +1,129 @@
+# benchmarks/bench_notice_store.py
+# -*- coding: utf-8 -*-
+# 공지 저장소 벤치마크 (기본 10만 건).
+#  - 목록: 기존 방식(요청마다 전체 정렬 후 슬라이스) vs 인덱스 + 키셋 커서 (첫 페이지 / 깊은 페이지) vs OFFSET
+#  - 상세: get + 이전/다음 글
+#  - 조회수: 요청마다 UPDATE vs 메모리 버퍼 후 일괄 반영 (최신 글에 몰린 분포 / 균등 분포)
+#  - 라우트: Flask test client로 /notice, /notice-detail 왕복 시간
+#
+#   python benchmarks/bench_notice_store.py --posts 100000 --reps 500
+import argparse, os, random, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from notice_store import NoticeStore, encode_cursor
+
+CATEGORIES = ("공지", "홍보", "정책", "점검", "기타")
+PER_PAGE = 10
+
+
+def _posts(n):
+    rnd = random.Random(1)
+    return [{"id": i, "pinned": i % 5000 == 0, "category": CATEGORIES[i % len(CATEGORIES)],
+             "title": f"공지 제목 {i}", "author": "관리자", "created_at": "25.06.11",
+             "content": "본문 " * 40, "attach_count": rnd.randint(0, 2), "views": rnd.randint(0, 5000)}
+            for i in range(1, n + 1)]
+
+
+def _timeit(fn, reps):
+    t0 = time.perf_counter()
+    for _ in range(reps): fn()
+    return (time.perf_counter() - t0) / reps * 1000
+
+
+def _row(name, ms, base=None):
+    print(f"{name:<36}: {ms:9.3f} ms" + (f"  (x{base / ms:.0f})" if base else ""))
+
+
+def bench_list(store, posts, reps):
+    print("── 목록 ──")
+    mid = posts[len(posts) // 2]
+    deep = encode_cursor({"pinned": False, "id": mid["id"]})
+    offset = len(posts) // 2
+
+    def old_sort():
+        # 기존 /notice: 요청마다 정렬 후 페이지 슬라이스
+        sorted(posts, key=lambda p: (not p.get("pinned", False), -p["id"]))[offset:offset + PER_PAGE]
+
+    def sql_offset():
+        store._conn().execute("SELECT id, pinned, category, title, author, created_at, attach_count, views "
+                              "FROM notices ORDER BY sort_key DESC LIMIT ? OFFSET ?",
+                              (PER_PAGE, offset)).fetchall()
+
+    base = _timeit(old_sort, max(1, reps // 50))
+    _row("list: sorted() + slice (memory)", base)
+    _row("list: SQL OFFSET (middle page)", _timeit(sql_offset, max(1, reps // 10)), base)
+    _row("list: keyset first page", _timeit(lambda: store.page(PER_PAGE), reps), base)
+    _row("list: keyset middle page", _timeit(lambda: store.page(PER_PAGE, after=deep), reps), base)
+    _row("list: keyset middle page (before)", _timeit(lambda: store.page(PER_PAGE, before=deep), reps), base)
+    _row("list: keyset category first page", _timeit(lambda: store.page(PER_PAGE, category="점검"), reps), base)
+
+
+def bench_detail(store, n, reps):
+    print("── 상세 ──")
+    rnd = random.Random(2)
+
+    def detail():
+        p = store.get(rnd.randint(1, n))
+        store.neighbors(p)
+    _row("detail: get + neighbors", _timeit(detail, reps))
+
+
+def bench_views(path, n, views):
+    print("── 조회수 ──")
+    rnd = random.Random(3)
+    # 실제 조회는 최신/고정 글에 몰린다: 90%는 최신 100건, 나머지는 전체에서 균등
+    skewed = [n - rnd.randrange(100) if rnd.random() < 0.9 else rnd.randint(1, n) for _ in range(views)]
+    uniform = [rnd.randint(1, n) for _ in range(views)]
+    store = NoticeStore(path, flush_interval=3600)
+    c = store._conn()
+    for dist, ids in (("skewed", skewed), ("uniform", uniform)):
+        t0 = time.perf_counter()
+        for i in ids: c.execute("UPDATE notices SET views = views + 1 WHERE id = ?", (i,))
+        per_req = views / (time.perf_counter() - t0)
+        print(f"{f'views/{dist}: UPDATE per request':<36}: {per_req:9.0f} views/s")
+        for flush_every in (50, 200, 1000):
+            store.flush_every = flush_every
+            t0 = time.perf_counter()
+            for i in ids: store.view(i)
+            store.flush()
+            vps = views / (time.perf_counter() - t0)
+            print(f"{f'views/{dist}: buffered (flush {flush_every})':<36}: {vps:9.0f} views/s  (x{vps / per_req:.1f})")
+    store.close()
+
+
+def bench_routes(path, reps):
+    print("── 라우트 (Flask test client) ──")
+    os.environ["NOTICE_DB"] = path
+    os.environ.setdefault("TTS_PREWARM", "0")
+    import app as onair
+    c = onair.app.test_client()
+    first = c.get("/notice")
+    assert first.status_code == 200
+    _, _, nxt = onair.NOTICES.page(PER_PAGE)
+    _row("GET /notice", _timeit(lambda: c.get("/notice"), reps))
+    _row("GET /notice?after=<cursor>", _timeit(lambda: c.get(f"/notice?after={nxt}"), reps))
+    _row("GET /notice-detail", _timeit(lambda: c.get("/notice-detail?post_id=50000"), reps))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--posts", type=int, default=100_000)
+    ap.add_argument("--reps", type=int, default=500)
+    ap.add_argument("--views", type=int, default=20_000)
+    ap.add_argument("--no-routes", action="store_true", help="app 임포트 없이 저장소만 측정")
+    a = ap.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "notices.db")
+    posts = _posts(a.posts)
+    t0 = time.perf_counter()
+    store = NoticeStore(path, seed=posts)
+    print(f"seed {a.posts} posts: {time.perf_counter() - t0:.2f}s  ({os.path.getsize(path) / 1e6:.1f} MB)")
+    bench_list(store, posts, a.reps)
+    bench_detail(store, a.posts, a.reps)
+    store.close()
+    bench_views(path, a.posts, a.views)
+    if not a.no_routes: bench_routes(path, a.reps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/bench_page_cache.py
+# -*- coding: utf-8 -*-
+# 페이지 렌더 캐시 벤치마크: 데이터 없는 템플릿 라우트를 PAGE_CACHE=0(매번 렌더) / 1(캐시) / 1+If-None-Match(304)로
+# 돌려 초당 요청 수를 비교한다. 익명/로그인 세션 모두. 모드마다 별도 프로세스(환경 변수는 임포트 때 읽힘).
+#
+#   python benchmarks/bench_page_cache.py --requests 3000
+import argparse, json, os, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["/", "/roadmap", "/guide", "/reviews", "/membership", "/about", "/faq-index", "/faq-learning",
+         "/terms", "/tip", "/community", "/call?scenario=hospital"]
+
+
+def child(n, revalidate, login):
+    sys.path.insert(0, ROOT)
+    import logging; logging.disable(logging.WARNING)
+    import app as onair
+    c = onair.app.test_client()
+    if login:
+        with c.session_transaction() as s: s["user"] = {"uid": "bench", "email": "bench@example.com", "name": "bench"}
+    etags = {p: c.get(p).headers.get("ETag") for p in PAGES}      # 워밍업 (첫 렌더/템플릿 컴파일)
+    statuses = {}
+    t0 = time.perf_counter()
+    for i in range(n):
+        p = PAGES[i % len(PAGES)]
+        r = c.get(p, headers={"If-None-Match": etags[p]} if revalidate and etags[p] else None)
+        statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+    wall = time.perf_counter() - t0
+    print(json.dumps({"rps": n / wall, "us": wall / n * 1e6, "statuses": statuses}))
+
+
+def run(n, cache, revalidate, login, tmp):
+    env = dict(os.environ, PAGE_CACHE="1" if cache else "0", TTS_PREWARM="0", NOTICE_DB=os.path.join(tmp, "notices.db"))
+    out = subprocess.run([sys.executable, __file__, "--child", str(n)] + (["--revalidate"] if revalidate else [])
+                         + (["--login"] if login else []), env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--child", type=int)
+    ap.add_argument("--revalidate", action="store_true")
+    ap.add_argument("--login", action="store_true")
+    a = ap.parse_args()
+    if a.child: return child(a.child, a.revalidate, a.login)
+
+    tmp = tempfile.mkdtemp()
+    for login in (False, True):
+        base = None
+        for name, cache, reval in (("render (PAGE_CACHE=0)", False, False), ("cached", True, False),
+                                   ("cached + If-None-Match", True, True)):
+            r = run(a.requests, cache, reval, login, tmp)
+            base = base or r["rps"]
+            print(f"{'login' if login else 'anon':<5} {name:<24}: {r['rps']:8.0f} req/s  {r['us']:7.0f} us/req"
+                  f"  (x{r['rps'] / base:.1f})  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
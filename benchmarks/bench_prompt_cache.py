@@ -0,0 +1,73 @@
+# benchmarks/bench_prompt_cache.py
+# -*- coding: utf-8 -*-
+# Gemini cachedContents 재사용 효과 측정 (로컬 스텁 대상).
+# 같은 채팅 세션 부하를 프롬프트 캐시 끔/켬으로 두 번 돌려 업스트림에 인라인으로 보낸 입력 토큰과
+# 캐시로 대체된 토큰(cachedContentTokenCount)을 비교하고, 마지막에 스텁 쪽 캐시를 지워
+# 만료 핸들 → 무효화 → 인라인 재시도 경로도 확인한다.
+#
+#   python benchmarks/bench_prompt_cache.py --sessions 20 --turns 6
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import gemini_stub
+
+
+def run(client, sessions, turns, scenarios):
+    for i in range(sessions):
+        r = client.post("/api/chat/start", json={"scenario": scenarios[i % len(scenarios)]})
+        sid = r.get_json()["session_id"]
+        for t in range(turns):
+            client.post("/api/chat/send", json={"session_id": sid, "text": f"주문번호 2025061{i:03d} 교환 문의드려요 ({t})"})
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=20)
+    ap.add_argument("--turns", type=int, default=6)
+    ap.add_argument("--min-cache-tokens", type=int, default=0, help="스텁의 캐시 최소 토큰 (실제 Gemini 2.5 Flash는 1024)")
+    a = ap.parse_args()
+
+    server, url, state = gemini_stub.start(0, min_cache_tokens=a.min_cache_tokens)
+    os.environ.update(GEMINI_BASE_URL=url, GEMINI_API_KEY="stub-key", PROMPT_CACHE_MIN_TOKENS=str(a.min_cache_tokens),
+                      TTS_PREWARM="0")
+    import logging; logging.disable(logging.INFO)
+    import app as onair
+    client = onair.app.test_client()
+    scenarios = ["exchange", "inquiry", "shipping", "reschedule"]
+    cache = onair.PROMPT_CACHE
+
+    rows = []
+    for label, enabled in (("inline", False), ("cachedContents", True)):
+        onair.PROMPT_CACHE = cache if enabled else None
+        if enabled:   # 핸들 예열 (실서비스에선 첫 요청들이 인라인으로 나가는 동안 백그라운드에서 생성됨)
+            run(client, len(scenarios), 1, scenarios)
+            time.sleep(0.5)
+        before = state.snapshot()
+        t0 = time.perf_counter()
+        run(client, a.sessions, a.turns, scenarios)
+        sec = time.perf_counter() - t0
+        after = state.snapshot()
+        d = {k: after[k] - before[k] for k in ("generate", "prompt_tokens", "cached_tokens", "inline_tokens")}
+        rows.append((label, d, sec))
+
+    print(f"{'mode':16s} {'requests':>8s} {'prompt tok':>11s} {'inline tok':>11s} {'cached tok':>11s} {'inline/req':>10s}")
+    for label, d, sec in rows:
+        n = max(1, d["generate"])
+        print(f"{label:16s} {d['generate']:8d} {d['prompt_tokens']:11d} {d['inline_tokens']:11d} "
+              f"{d['cached_tokens']:11d} {d['inline_tokens'] / n:10.1f}")
+    saved = rows[0][1]["inline_tokens"] - rows[1][1]["inline_tokens"]
+    print(f"\ninline input tokens saved: {saved} "
+          f"({saved / max(1, rows[0][1]['inline_tokens']) * 100:.1f}%)  app stats: {cache.stats()}")
+
+    # 스텁이 캐시를 잊어버린 상황(만료/삭제): 404 → 무효화 → 인라인 재시도로 응답이 끊기지 않아야 한다
+    with state.lock: state.caches.clear()
+    r = client.post("/api/chat/start", json={"scenario": "exchange"})
+    sid = r.get_json()["session_id"]
+    reply = client.post("/api/chat/send", json={"session_id": sid, "text": "교환하고 싶어요"}).get_json()
+    print(f"after cache loss: reply={'ok' if reply.get('reply') else reply}  invalidated={cache.stats()['invalidated']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_session_store.py
+# -*- coding: utf-8 -*-
+# 세션 저장소 처리량 벤치마크: 워커(프로세스) 수를 늘려 가며 SQLite(WAL) 백엔드의
+# 턴 처리량(잠금 → 로드 → 메시지 추가 → 저장)을 측정한다. 메모리 백엔드는 단일 프로세스 기준선.
+#
+#   python benchmarks/bench_session_store.py --workers 1 2 4 8 --turns 2000
+import argparse, os, sys, tempfile, time, uuid
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from session_store import MemorySessionStore, SQLiteSessionStore
+
+WORK_MS = 0.0   # 턴당 LLM 대기 시간 흉내 (ms). 0이면 저장소 자체 비용만 측정
+
+
+def _new_sim(sid):
+    return {"session_id": sid, "mode": "chat", "messages": [{"role": "ai", "text": "안녕하세요, 무엇을 도와드릴까요?"}],
+            "rounds": 0, "ended": False, "max_rounds": 10 ** 9, "slots": {}, "turn": 0}
+
+
+def _turns(store, sids, n, work_ms):
+    for i in range(n):
+        sid = sids[i % len(sids)]
+        with store.session(sid) as sim:
+            sim["messages"].append({"role": "user", "text": f"메시지 {i} 입니다"})
+            if work_ms: time.sleep(work_ms / 1000)
+            sim["messages"].append({"role": "ai", "text": "네, 확인했습니다."})
+            del sim["messages"][1:-16]   # MAX_CONTEXT_TURNS 수준으로 길이 유지
+            sim["rounds"] += 1
+
+
+def _worker(args):
+    path, sids, n, work_ms = args
+    store = SQLiteSessionStore(path)
+    t0 = time.perf_counter()
+    _turns(store, sids, n, work_ms)
+    return time.perf_counter() - t0
+
+
+def bench_sqlite(workers, turns, sessions_per_worker, work_ms):
+    path = os.path.join(tempfile.mkdtemp(), "sessions.db")
+    store = SQLiteSessionStore(path)
+    jobs = []
+    for _ in range(workers):
+        sids = [uuid.uuid4().hex for _ in range(sessions_per_worker)]
+        for sid in sids: store.put(sid, _new_sim(sid))
+        jobs.append((path, sids, turns, work_ms))
+    t0 = time.perf_counter()
+    with Pool(workers) as pool: pool.map(_worker, jobs)
+    wall = time.perf_counter() - t0
+    return workers * turns / wall
+
+
+def bench_memory(turns, sessions, work_ms):
+    store = MemorySessionStore()
+    sids = [uuid.uuid4().hex for _ in range(sessions)]
+    for sid in sids: store.put(sid, _new_sim(sid))
+    t0 = time.perf_counter()
+    _turns(store, sids, turns, work_ms)
+    return turns / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--turns", type=int, default=2000, help="워커당 턴 수")
+    ap.add_argument("--sessions", type=int, default=50, help="워커당 세션 수")
+    ap.add_argument("--work-ms", type=float, default=WORK_MS)
+    a = ap.parse_args()
+
+    print(f"memory   x1 : {bench_memory(a.turns, a.sessions, a.work_ms):10.0f} turns/s")
+    base = None
+    for w in a.workers:
+        tps = bench_sqlite(w, a.turns, a.sessions, a.work_ms)
+        base = base or tps
+        print(f"sqlite   x{w:<2}: {tps:10.0f} turns/s  (x{tps / base:.2f})")
+
+
+if __name__ == "__main__":
+    main()
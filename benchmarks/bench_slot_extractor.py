@@ -0,0 +1,81 @@
+# benchmarks/bench_slot_extractor.py
+# -*- coding: utf-8 -*-
+# 규칙엔진 슬롯 추출 마이크로 벤치마크: 기존 extract_slots(키워드 목록별 `in` 스캔 + 매번 정규식)
+# vs 컴파일된 SlotGrammar(다중 패턴 1회 스캔 + 사전 컴파일 정규식). 결과 동일성도 함께 확인한다.
+# 두 번째 표는 키워드 수를 늘렸을 때 키워드별 `in` 스캔과 단일 스캔의 비용 변화를 비교한다.
+#
+#   python benchmarks/bench_slot_extractor.py --n 50000
+import argparse, os, random, re, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from slot_grammar import grammar_for, KeywordAutomaton, SLOT_TABLE
+
+SAMPLES = [
+    "나이키 에어포스 270mm 주문번호 20250611123 인데 한 사이즈 작게 교환하고 싶어요",
+    "미개봉 상태이고 색상이 사진이랑 달라서 반품 말고 교환 원해요",
+    "택배 받았는데 오염이 있어서요. 개봉은 했어요",
+    "\"에어맥스\" 한 사이즈 크게 부탁드려요",
+    "네 맞아요 그렇게 진행해 주세요",
+    "주문번호는 98765432 입니다",
+    "안녕하세요 교환 문의 드립니다 사이즈가 작다",
+    "업무 때문에 바빠서 늦게 연락드렸어요 다운 사이즈로 해주세요",
+]
+
+
+def legacy_extract_slots(text: str):
+    # app.py의 이전 구현 그대로 (비교 기준)
+    if not text: return {}
+    t = text.strip(); slots = {}
+    m = re.search(r"(\d{6,})", t)
+    if m: slots["order_number"] = m.group(1)
+    if "미개봉" in t: slots["unopened"] = True
+    elif "개봉" in t: slots["unopened"] = False
+    if any(k in t for k in ["한 사이즈 작", "작게", "다운"]): slots["size_dir"] = "down"
+    if any(k in t for k in ["한 사이즈 크", "크게", "업"]): slots["size_dir"] = "up"
+    if any(k in t for k in ["오염","파손","불량","색상","사이즈","교환","반품","작다","크다"]): slots["issue"] = t[:80]
+    m2 = re.search(r"[\"“]?([가-힣A-Za-z0-9\-\_\s]{2,20})[\"”]?", t)
+    if m2:
+        cand = m2.group(1).strip()
+        if len(cand) >= 2 and not cand.isdigit(): slots["product"] = cand
+    return slots
+
+
+def timeit(fn, texts):
+    t0 = time.perf_counter()
+    fn(texts)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=50000)
+    a = ap.parse_args()
+    random.seed(0)
+    texts = [random.choice(SAMPLES) for _ in range(a.n)]
+    g = grammar_for("exchange")
+
+    mismatches = sum(legacy_extract_slots(t) != g.extract(t) for t in SAMPLES)
+    legacy = timeit(lambda ts: [legacy_extract_slots(t) for t in ts], texts)
+    single = timeit(lambda ts: [g.extract(t) for t in ts], texts)
+    batch = timeit(g.extract_batch, texts)
+
+    print(f"samples={a.n}  mismatches={mismatches}")
+    for name, sec in (("legacy extract_slots", legacy), ("SlotGrammar.extract", single),
+                      ("SlotGrammar.extract_batch", batch)):
+        print(f"{name:26s}: {sec * 1e6 / a.n:7.2f} us/text  ({a.n / sec:10.0f} texts/s)")
+
+    # 키워드 수에 따른 확장성: 전체 시나리오 키워드 + 합성 키워드
+    base = sorted({kw for spec in SLOT_TABLE.values() for rule in spec["slots"].values()
+                   for kw, _ in rule.get("keywords", [])})
+    n = max(1000, a.n // 10)
+    print(f"\nkeywords  per-keyword 'in' (us/text)  single pass (us/text)")
+    for extra in (0, 100, 400):
+        kws = base + [f"합성키워드{i:03d}" for i in range(extra)]
+        ac = KeywordAutomaton([(k, k) for k in kws])
+        naive = timeit(lambda ts: [[k for k in kws if k in t] for t in ts], texts[:n])
+        one = timeit(lambda ts: [ac.matches(t) for t in ts], texts[:n])
+        print(f"{len(kws):8d}  {naive * 1e6 / n:26.2f}  {one * 1e6 / n:22.2f}")
+
+
+if __name__ == "__main__":
+    main()
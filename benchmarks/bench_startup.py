@@ -0,0 +1,89 @@
+# benchmarks/bench_startup.py
+# -*- coding: utf-8 -*-
+# 콜드 스타트 벤치마크. 매번 새 프로세스에서
+#  - import app 시간 (+ 그 시점 RSS, 불러온 무거운 모듈)
+#  - 첫 요청: 페이지(/) / 세션 API(/api/chat/start) / 공지(/notice) / 분석 요약(pandas·pyarrow)
+#    — 첫 사용 때 만드는 하위 시스템 비용 포함
+#  - prefork: 부모가 import(+ APP_WARM=1이면 무거운 모듈/템플릿 예열)한 뒤 fork한 자식의 첫 요청 시간
+# 를 재서 중앙값을 낸다.
+#
+#   python benchmarks/bench_startup.py --runs 5
+import argparse, json, os, statistics, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("gtts", "requests", "firebase_admin", "pandas", "pyarrow")
+
+
+def _rss_mb():
+    with open("/proc/self/statm") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def child(fork):
+    sys.path.insert(0, ROOT)
+    import logging; logging.disable(logging.WARNING)
+    t0 = time.perf_counter()
+    import app as onair
+    out = {"import_ms": (time.perf_counter() - t0) * 1000, "rss_mb": _rss_mb(),
+           "heavy": [m for m in HEAVY if m in sys.modules]}
+    if fork:
+        r, w = os.pipe()
+        if os.fork() == 0:       # 워커: fork 직후 첫 요청들
+            os.close(r)
+            res = first_requests(onair)
+            os.write(w, json.dumps(res).encode()); os._exit(0)
+        os.close(w)
+        data = b""
+        while True:
+            b = os.read(r, 65536)
+            if not b: break
+            data += b
+        os.wait()
+        out.update(json.loads(data))
+    else:
+        out.update(first_requests(onair))
+    print(json.dumps(out))
+
+
+def first_requests(onair):
+    c = onair.app.test_client()
+    out = {}
+    for name, fn in (("page_ms", lambda: c.get("/")),
+                     ("session_ms", lambda: c.post("/api/chat/start", json={"topic": "t", "scenario": "bank"})),
+                     ("notice_ms", lambda: c.get("/notice")),
+                     ("analytics_ms", lambda: c.get("/api/analytics/summary"))):
+        t0 = time.perf_counter()
+        r = fn()
+        out[name] = (time.perf_counter() - t0) * 1000
+        assert r.status_code == 200, (name, r.status_code)
+    return out
+
+
+def run(fork, warm, tmp):
+    env = dict(os.environ, TTS_PREWARM="0", APP_WARM="1" if warm else "0", NOTICE_DB=os.path.join(tmp, "notices.db"),
+               ANALYTICS_DIR=os.path.join(tmp, "analytics"), GEMINI_API_KEY="")
+    out = subprocess.run([sys.executable, __file__, "--child"] + (["--fork"] if fork else []), env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--child", action="store_true")
+    ap.add_argument("--fork", action="store_true")
+    a = ap.parse_args()
+    if a.child: return child(a.fork)
+
+    tmp = tempfile.mkdtemp()
+    for name, fork, warm in (("cold process", False, False), ("prefork child", True, False),
+                             ("prefork child (APP_WARM=1)", True, True)):
+        rs = [run(fork, warm, tmp) for _ in range(a.runs)]
+        med = {k: statistics.median(r[k] for r in rs) for k in ("import_ms", "rss_mb", "page_ms", "session_ms", "notice_ms",
+                                                          "analytics_ms")}
+        print(f"{name:<28}: import {med['import_ms']:6.0f} ms (RSS {med['rss_mb']:5.0f} MB)  first / {med['page_ms']:4.0f} ms"
+              f"  session {med['session_ms']:4.0f} ms  notice {med['notice_ms']:4.0f} ms  analytics {med['analytics_ms']:5.0f} ms"
+              f"  heavy at import: {','.join(rs[0]['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
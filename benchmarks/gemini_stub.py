@@ -0,0 +1,217 @@
+# benchmarks/gemini_stub.py
+# -*- coding: utf-8 -*-
+# 로컬 Gemini REST 스텁. GEMINI_BASE_URL=http://127.0.0.1:<port> 로 앱/벤치마크를 붙여 실제 API 없이 시험한다.
+#  - POST /v1beta/models/<model>:generateContent          → 고정 응답 + usageMetadata
+#  - POST /v1beta/models/<model>:streamGenerateContent    → SSE(alt=sse) 청크
+#  - POST/PATCH/GET/DELETE /v1beta/cachedContents[/<id>]  → 캐시 핸들 (cachedContent 사용 시 cachedContentTokenCount 보고)
+# 지연(latency/jitter), 503 비율(fail_rate), 캐시 최소 토큰(min_cache_tokens), 동시 처리 한도(max_concurrent,
+# 넘으면 429 + Retry-After — 키별 쿼터 흉내)를 조절할 수 있다.
+#
+#   python benchmarks/gemini_stub.py --port 8765 --latency 0.3
+import argparse, json, os, random, re, sys, threading, time, uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from context_window import estimate_tokens
+
+REPLY = "네, 확인해 드릴게요. 주문 번호를 알려주시겠어요?"
+FEEDBACK = {"feedback": "요청 사항을 순서대로 잘 전달했어요. 주문 번호를 먼저 말하면 더 빨라요.", "score": 4}
+_MODEL_PATH = re.compile(r"^/v1beta/models/([^/:]+):(\w+)$")
+
+
+def _texts(obj):
+    # 요청 본문 안의 모든 parts[].text
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            if k == "text" and isinstance(v, str): yield v
+            else: yield from _texts(v)
+    elif isinstance(obj, list):
+        for v in obj: yield from _texts(v)
+
+
+class StubState:
+    def __init__(self, latency=0.0, jitter=0.0, fail_rate=0.0, min_cache_tokens=0, reply=REPLY, chunks=4,
+                 max_concurrent=0):
+        self.latency, self.jitter, self.fail_rate = latency, jitter, fail_rate
+        self.max_concurrent, self.active = max_concurrent, 0
+        self.min_cache_tokens = min_cache_tokens
+        self.reply, self.chunks = reply, chunks
+        self.caches = {}    # name -> {"tokens", "expires"}
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "generate": 0, "stream": 0, "failed": 0, "throttled": 0, "cache_create": 0,
+                      "cache_patch": 0, "prompt_tokens": 0, "cached_tokens": 0, "inline_tokens": 0}
+
+    def bump(self, **kw):
+        with self.lock:
+            for k, v in kw.items(): self.stats[k] += v
+
+    def snapshot(self) -> dict:
+        with self.lock: return dict(self.stats, caches=len(self.caches))
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StubState = None
+
+    def log_message(self, *a): pass
+
+    # ───── 공통 ─────
+    def _body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n) if n else b""
+        return json.loads(raw) if raw else {}
+
+    def _json(self, status, obj, headers=None):
+        b = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(b)))
+        self.end_headers()
+        self.wfile.write(b)
+
+    def _delay(self):
+        st = self.state
+        d = st.latency + (random.random() * st.jitter if st.jitter else 0)
+        if d > 0: time.sleep(d)
+
+    def _path(self):
+        return self.path.split("?", 1)[0]
+
+    # ───── 라우팅 ─────
+    def do_POST(self):
+        st, path = self.state, self._path()
+        st.bump(requests=1)
+        body = self._body()
+        if path == "/v1beta/cachedContents": return self._cache_create(body)
+        m = _MODEL_PATH.match(path)
+        if not m: return self._json(404, {"error": {"code": 404, "message": "not found"}})
+        with st.lock:
+            over = st.max_concurrent and st.active >= st.max_concurrent
+            if not over: st.active += 1
+        if over:
+            st.bump(throttled=1)
+            return self._json(429, {"error": {"code": 429, "message": "Resource has been exhausted"}}, {"Retry-After": "1"})
+        try:
+            self._generate(m, body)
+        finally:
+            with st.lock: st.active -= 1
+
+    def _generate(self, m, body):
+        st = self.state
+        self._delay()
+        if st.fail_rate and random.random() < st.fail_rate:
+            st.bump(failed=1)
+            return self._json(503, {"error": {"code": 503, "message": "stub overloaded"}})
+        usage = self._usage(body)
+        if usage is None: return self._json(404, {"error": {"code": 404, "message": "CachedContent not found"}})
+        cfg = body.get("generationConfig") or {}
+        text = json.dumps(FEEDBACK, ensure_ascii=False) if cfg.get("response_mime_type") == "application/json" else st.reply
+        usage["candidatesTokenCount"] = estimate_tokens(text)
+        usage["totalTokenCount"] = usage["promptTokenCount"] + usage["candidatesTokenCount"]
+        if m.group(2) == "streamGenerateContent": return self._stream(text, usage)
+        st.bump(generate=1)
+        self._json(200, {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+                         "usageMetadata": usage})
+
+    def do_PATCH(self):
+        st, path = self.state, self._path()
+        st.bump(requests=1, cache_patch=1)
+        body, name = self._body(), path[len("/v1beta/"):]
+        with st.lock:
+            c = st.caches.get(name)
+            if c is None or c["expires"] < time.time():
+                return self._json(404, {"error": {"code": 404, "message": "CachedContent not found"}})
+            c["expires"] = time.time() + float(str(body.get("ttl", "3600s")).rstrip("s"))
+        self._json(200, {"name": name, "usageMetadata": {"totalTokenCount": c["tokens"]}})
+
+    def do_GET(self):
+        if self._path() == "/stats": return self._json(200, self.state.snapshot())
+        name = self._path()[len("/v1beta/"):]
+        c = self.state.caches.get(name)
+        if c is None: return self._json(404, {"error": {"code": 404, "message": "not found"}})
+        self._json(200, {"name": name, "usageMetadata": {"totalTokenCount": c["tokens"]}})
+
+    def do_DELETE(self):
+        with self.state.lock: self.state.caches.pop(self._path()[len("/v1beta/"):], None)
+        self._json(200, {})
+
+    # ───── 구현 ─────
+    def _cache_create(self, body):
+        st = self.state
+        tokens = sum(estimate_tokens(t) for t in _texts(body.get("systemInstruction") or {}))
+        if tokens < st.min_cache_tokens:
+            return self._json(400, {"error": {"code": 400, "message": f"Cached content is too small. total_token_count={tokens}, min_total_token_count={st.min_cache_tokens}"}})
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        ttl = float(str(body.get("ttl", "3600s")).rstrip("s"))
+        with st.lock: st.caches[name] = {"tokens": tokens, "expires": time.time() + ttl}
+        st.bump(cache_create=1)
+        self._json(200, {"name": name, "model": body.get("model"), "usageMetadata": {"totalTokenCount": tokens}})
+
+    def _usage(self, body):
+        st = self.state
+        inline = sum(estimate_tokens(t) for t in _texts({k: v for k, v in body.items() if k != "generationConfig"}))
+        cached = 0
+        if body.get("cachedContent"):
+            with st.lock: c = st.caches.get(body["cachedContent"])
+            if c is None or c["expires"] < time.time(): return None
+            cached = c["tokens"]
+        st.bump(prompt_tokens=inline + cached, cached_tokens=cached, inline_tokens=inline)
+        u = {"promptTokenCount": inline + cached}
+        if cached: u["cachedContentTokenCount"] = cached
+        return u
+
+    def _stream(self, text, usage):
+        self.state.bump(stream=1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        n = max(1, self.state.chunks)
+        step = max(1, -(-len(text) // n))
+        pieces = [text[i:i + step] for i in range(0, len(text), step)]
+        self.close_connection = True
+        try:
+            for i, piece in enumerate(pieces):
+                chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}}]}
+                if i == len(pieces) - 1: chunk["usageMetadata"] = usage
+                self.wfile.write(("data: " + json.dumps(chunk, ensure_ascii=False) + "\r\n\r\n").encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass    # 클라이언트가 마감/hedge로 스트림을 먼저 닫은 경우
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024    # 기본 5면 동시 신규 연결이 몰릴 때 SYN 재전송(1s, 3s...)으로 지연이 튄다
+
+
+def start(port: int = 0, **opts):
+    """백그라운드 스레드로 스텁을 띄우고 (server, base_url, state)를 돌려준다. port=0이면 임의 포트."""
+    state = StubState(**opts)
+    handler = type("StubHandler", (Handler,), {"state": state})
+    server = StubServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, name="gemini-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", state
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    ap.add_argument("--min-cache-tokens", type=int, default=0)
+    ap.add_argument("--max-concurrent", type=int, default=0)
+    a = ap.parse_args()
+    server, url, _ = start(a.port, latency=a.latency, jitter=a.jitter, fail_rate=a.fail_rate,
+                           min_cache_tokens=a.min_cache_tokens, max_concurrent=a.max_concurrent)
+    print(f"Gemini stub on {url}  (GEMINI_BASE_URL={url}, stats: {url}/stats)")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/tts_stub.py
+# -*- coding: utf-8 -*-
+# gTTS 대역. app.synthesize_mp3 / app.synthesize_stream 을 바꿔 끼워 Google TTS 없이 시험한다.
+#  - 지연: 호출당 latency(+jitter) 중 first_chunk 비율만큼 뒤 첫 조각, 나머지는 조각마다 나눠서
+#  - 실패: fail_rate 확률로 RuntimeError (gTTS의 gTTSError 흉내)
+#  - 크기: 글자당 bytes_per_char 바이트의 MPEG 프레임 모양 바이트, gTTS처럼 ≤100자 조각마다 한 청크
+#
+#   import tts_stub; stub = tts_stub.install(app, latency=0.3)   # ... stub.stats(), stub.uninstall()
+import random, threading, time
+
+FRAME = b"\xff\xf3\x44\xc4" + b"\x00" * 140      # 24kbps mono MPEG-2 L3 프레임 한 개 크기
+PIECE_CHARS = 100
+
+
+class TTSStub:
+    def __init__(self, latency=0.0, jitter=0.0, fail_rate=0.0, bytes_per_char=600, first_chunk=0.6):
+        self.latency, self.jitter, self.fail_rate = latency, jitter, fail_rate
+        self.bytes_per_char, self.first_chunk = bytes_per_char, first_chunk
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "streams": 0, "failed": 0, "chars": 0, "bytes": 0}
+        self._orig = None
+
+    # ───── 합성 흉내 ─────
+    def _pieces(self, text):
+        return [text[i:i + PIECE_CHARS] for i in range(0, len(text), PIECE_CHARS)] or [""]
+
+    def _audio(self, piece):
+        n = max(len(FRAME), len(piece) * self.bytes_per_char)
+        return (FRAME * (n // len(FRAME) + 1))[:n]
+
+    def _bump(self, **kw):
+        with self._lock:
+            for k, v in kw.items(): self._stats[k] += v
+
+    def synthesize_stream(self, text: str, lang: str = "ko"):
+        self._bump(streams=1, chars=len(text))
+        total = self.latency + (random.random() * self.jitter if self.jitter else 0)
+        pieces = self._pieces(text)
+        rest = total * (1 - self.first_chunk) / max(1, len(pieces) - 1) if len(pieces) > 1 else 0
+        for i, piece in enumerate(pieces):
+            time.sleep(total * self.first_chunk if i == 0 else rest)
+            if self.fail_rate and random.random() < self.fail_rate:
+                self._bump(failed=1)
+                raise RuntimeError("tts stub: synthesis failed")
+            data = self._audio(piece)
+            self._bump(bytes=len(data))
+            yield data
+
+    def synthesize_mp3(self, text: str, lang: str = "ko") -> bytes:
+        self._bump(calls=1)
+        return b"".join(self.synthesize_stream(text, lang))
+
+    # ───── 설치/해제 ─────
+    def install(self, app_module):
+        self._orig = (app_module, app_module.synthesize_mp3, app_module.synthesize_stream)
+        app_module.synthesize_mp3, app_module.synthesize_stream = self.synthesize_mp3, self.synthesize_stream
+        return self
+
+    def uninstall(self):
+        if self._orig:
+            m, mp3, stream = self._orig
+            m.synthesize_mp3, m.synthesize_stream = mp3, stream
+            self._orig = None
+
+    def stats(self) -> dict:
+        with self._lock: return dict(self._stats)
+
+
+def install(app_module, **opts) -> TTSStub:
+    """app 모듈의 합성 함수를 스텁으로 바꾼다. 반환된 TTSStub으로 통계/해제."""
+    return TTSStub(**opts).install(app_module)
@@ -0,0 +1,63 @@
+# call_pipeline.py
+# -*- coding: utf-8 -*-
+# 전화 모드 한 턴 파이프라인: LLM 스트림을 문장 단위로 자르고,
+# 문장이 완성되는 즉시 TTS 합성을 걸어 두면서 다음 문장 생성을 계속 받는다.
+# 결과(문장 + 오디오)는 항상 생성 순서대로 내보낸다.
+import re
+from collections import deque
+
+# 문장 끝: 종결 부호(. ! ? … 。 ~) 뒤에 공백이 오는 지점. "3.5" 같은 숫자는 자르지 않는다.
+_BOUNDARY = re.compile(r"(?<=[.!?…。~？！])\s+")
+
+
+class SentenceSplitter:
+    def __init__(self, min_chars: int = 8):
+        self.min_chars = min_chars   # 너무 짧은 조각("네.")은 다음 문장과 합쳐 TTS 호출 수를 줄인다
+        self._buf = ""
+
+    def feed(self, text: str) -> list:
+        self._buf += text
+        parts = _BOUNDARY.split(self._buf)
+        self._buf = parts.pop()   # 마지막 조각은 아직 끝나지 않은 문장
+        out, pending = [], ""
+        for p in parts:
+            pending = f"{pending} {p}".strip() if pending else p.strip()
+            if len(pending) >= self.min_chars:
+                out.append(pending); pending = ""
+        if pending: self._buf = f"{pending} {self._buf}"   # 잘라낸 경계 공백을 되살린다
+        return out
+
+    def flush(self) -> list:
+        rest, self._buf = self._buf.strip(), ""
+        return [rest] if rest else []
+
+
+def pipeline(pieces, synth, executor, min_chars: int = 8):
+    """pieces(텍스트 조각 iterator)를 받아 (index, 문장, 오디오 bytes)를 순서대로 yield.
+    synth(sentence) -> bytes 는 executor에서 병렬로 실행된다.
+    pieces 쪽 예외는 그대로 올라간다(이미 yield한 문장은 그대로 유효)."""
+    splitter = SentenceSplitter(min_chars)
+    queue = deque()   # (index, sentence, future)
+    idx = 0
+
+    def submit(sentences):
+        nonlocal idx
+        for s in sentences:
+            queue.append((idx, s, executor.submit(synth, s)))
+            idx += 1
+
+    def drain(block: bool):
+        while queue and (block or queue[0][2].done()):
+            i, s, fut = queue.popleft()
+            try: audio = fut.result()
+            except Exception: audio = None   # 합성 실패 문장은 텍스트만 전달
+            yield i, s, audio
+
+    try:
+        for piece in pieces:
+            submit(splitter.feed(piece))
+            yield from drain(block=False)
+        submit(splitter.flush())
+        yield from drain(block=True)
+    finally:
+        for _, _, fut in queue: fut.cancel()
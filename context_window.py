@@ -0,0 +1,135 @@
+# context_window.py
+# -*- coding: utf-8 -*-
+# Gemini 요청 본문을 매 턴 처음부터 다시 만들지 않기 위한 도구.
+#  - PromptBook   : (scenario, mode, role)별 system_instruction 파트 + generationConfig JSON을 한 번만 만든다
+#                   (cachedContents 핸들이 있으면 system_instruction 대신 핸들 이름만 보낸다)
+#  - ctx_*        : 세션마다 Gemini 형식 contents를 메시지 추가 시점에 JSON 문자열로 한 번만 직렬화해 쌓는다
+# 컨텍스트 선택은 토큰 예산 기준: 오프닝은 항상 유지, 최신 턴부터 예산까지 담고,
+# 예산 밖으로 밀려난 오래된 턴은 삭제하지 않고 요약(rolling summary)으로 접어 system_instruction에 붙인다.
+import json, threading
+
+SUMMARY_LABEL = "[이전 대화 요약] "
+
+
+def content_json(role: str, text: str) -> str:
+    return json.dumps({"role": "model" if role == "ai" else "user", "parts": [{"text": text}]}, ensure_ascii=False)
+
+
+def estimate_tokens(text: str) -> int:
+    # Gemini 토크나이저 근사: ASCII ≈ 4자/토큰, 한글 등 비ASCII ≈ 1.5자/토큰, 메시지당 구조 오버헤드 4
+    n_ascii = sum(1 for ch in text if ord(ch) < 128)
+    return int(n_ascii / 4 + (len(text) - n_ascii) / 1.5) + 4
+
+
+class PromptBook:
+    def __init__(self, build_lines, generation_config: dict):
+        self._build = build_lines    # (scenario, mode, role) -> [system 줄]
+        self._gen = json.dumps(generation_config, ensure_ascii=False)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def compile(self, keys):
+        for k in keys: self._entry(*k)
+        return len(self._cache)
+
+    def text(self, scenario, mode, role) -> str:
+        return self._entry(scenario, mode, role)[0]
+
+    def tokens(self, scenario, mode, role) -> int:
+        return self._entry(scenario, mode, role)[2]
+
+    def fragment(self, scenario, mode, role, summary: str = None) -> str:
+        """'"system_instruction":{...},"generationConfig":{...}' (본문 뒷부분에 그대로 이어 붙임)"""
+        part = self._entry(scenario, mode, role)[1]
+        if summary:
+            part += "," + json.dumps({"text": SUMMARY_LABEL + summary}, ensure_ascii=False)
+        return '"system_instruction":{"parts":[' + part + ']},"generationConfig":' + self._gen
+
+    def cached_fragment(self, cache_name: str) -> str:
+        """system_instruction 대신 cachedContents 핸들을 가리키는 조각."""
+        return '"cachedContent":' + json.dumps(cache_name) + ',"generationConfig":' + self._gen
+
+    def _entry(self, scenario, mode, role):
+        key = (scenario, mode, role)
+        hit = self._cache.get(key)
+        if hit is None:
+            text = "\n".join(self._build(scenario, mode, role))
+            part = json.dumps({"text": text}, ensure_ascii=False)
+            with self._lock: hit = self._cache.setdefault(key, (text, part, estimate_tokens(text)))
+        return hit
+
+
+# ───── 세션별 컨텍스트 창 ─────
+# sim["ctx"] = {
+#   "opening": <첫 AI 멘트 JSON 또는 None>, "opening_tokens": int,
+#   "turns":   [[<JSON>, 토큰 추정치], ...],   # 아직 요약에 접히지 않은 턴들
+#   "base":    turns[0]의 절대 턴 번호,
+#   "summary": {"text": str, "upto": 요약이 덮는 절대 턴 번호(미포함)} 또는 None,
+# }
+
+def ctx_new(opening_text: str = None) -> dict:
+    return {"opening": content_json("ai", opening_text) if opening_text else None,
+            "opening_tokens": estimate_tokens(opening_text) if opening_text else 0,
+            "turns": [], "base": 0, "summary": None}
+
+
+def ctx_init(sim: dict):
+    msgs = sim.get("messages") or []
+    opening = msgs[0] if msgs and msgs[0].get("role") == "ai" else None
+    rest = msgs[1:] if opening else msgs
+    ctx = sim["ctx"] = ctx_new(opening["text"] if opening else None)
+    ctx["turns"] = [[content_json(m["role"], m["text"]), estimate_tokens(m["text"])] for m in rest]
+    return ctx
+
+
+def ctx_append(sim: dict, role: str, text: str):
+    ctx = sim.get("ctx") or ctx_init(sim)
+    ctx["turns"].append([content_json(role, text), estimate_tokens(text)])
+
+
+def ctx_select(sim: dict, budget: int, min_recent: int = 2):
+    """토큰 예산 안에서 보낼 contents를 고른다.
+    반환: (contents JSON 목록, 예산 밖 미요약 턴의 절대 범위 (start, end), 추정 토큰 수)"""
+    ctx = sim.get("ctx") or ctx_init(sim)
+    turns, base = ctx["turns"], ctx["base"]
+    floor = max(base, (ctx["summary"] or {}).get("upto", 0))
+    used = ctx["opening_tokens"] + estimate_tokens(ctx["summary"]["text"]) if ctx["summary"] else ctx["opening_tokens"]
+    i = len(turns)
+    while i > floor - base:
+        t = turns[i - 1][1]
+        if used + t > budget and len(turns) - i >= min_recent: break
+        used += t; i -= 1
+    head = [ctx["opening"]] if ctx["opening"] else []
+    return head + [t[0] for t in turns[i:]], (floor, base + i), used
+
+
+def ctx_turn_texts(sim: dict, start: int, end: int) -> list:
+    """절대 범위 [start, end)의 턴을 (role, text)로 되돌린다 (요약 입력용)."""
+    ctx = sim["ctx"]
+    out = []
+    for js, _ in ctx["turns"][start - ctx["base"]:end - ctx["base"]]:
+        c = json.loads(js)
+        out.append(("ai" if c["role"] == "model" else "user", c["parts"][0]["text"]))
+    return out
+
+
+def ctx_apply_summary(sim: dict, text: str, upto: int) -> bool:
+    """새 요약을 반영하고 요약에 접힌 턴을 버린다. 더 최신 요약이 이미 있으면 무시."""
+    ctx = sim.get("ctx") or ctx_init(sim)
+    cur = ctx["summary"]
+    if cur and cur["upto"] >= upto: return False
+    ctx["summary"] = {"text": text, "upto": upto}
+    drop = min(upto - ctx["base"], len(ctx["turns"]))
+    if drop > 0:
+        del ctx["turns"][:drop]
+        ctx["base"] += drop
+    return True
+
+
+def fold_extractive(turns, per_turn: int = 60) -> str:
+    # LLM 요약이 준비되기 전 임시로 쓰는 값싼 요약: 턴마다 앞부분만 잘라 이어 붙임
+    return " / ".join(f"{'상담원' if r == 'ai' else '사용자'}: {t[:per_turn]}" for r, t in turns)
+
+
+def request_body(contents: list, fragment: str) -> str:
+    return '{"contents":[' + ",".join(contents) + '],' + fragment + '}'
@@ -0,0 +1,86 @@
+# feedback_cache.py
+# -*- coding: utf-8 -*-
+# 피드백 결과 메모이제이션 + single-flight.
+# 키 = 세션 ID + 대화록 해시 → 종료된 세션은 대화록이 바뀌지 않으므로 새로고침해도 같은 결과를 재사용한다.
+# 같은 키에 대한 동시 요청은 진행 중인 한 번의 업스트림 호출 결과를 함께 기다린다.
+import hashlib, json, threading, time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def transcript_hash(messages) -> str:
+    raw = json.dumps([(m.get("role"), m.get("text")) for m in messages or []], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class FeedbackCache:
+    def __init__(self, max_entries: int = 2000, ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (result, stored_at), LRU 순서
+        self._inflight = {}          # key -> Future
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "joined": 0, "evictions": 0, "uncached": 0}
+
+    @staticmethod
+    def key(session_id: str, messages) -> str:
+        return f"{session_id}:{transcript_hash(messages)}"
+
+    def peek(self, key: str):
+        with self._lock: return self._lookup(key)
+
+    def inflight(self, key: str):
+        with self._lock: return self._inflight.get(key)
+
+    def get_or_compute(self, key: str, compute, cacheable=lambda r: True):
+        """캐시 → 진행 중 호출 합류 → 직접 계산 순. cacheable(result)가 False면 저장하지 않는다(오류 응답 등)."""
+        with self._lock:
+            hit = self._lookup(key)
+            if hit is not None:
+                self._stats["hits"] += 1
+                return hit
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+                self._stats["misses"] += 1
+            else:
+                self._stats["joined"] += 1
+        if not leader: return fut.result()
+
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock: self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            if cacheable(result): self._store(key, result)
+            else: self._stats["uncached"] += 1
+            self._inflight.pop(key, None)
+        fut.set_result(result)
+        return result
+
+    def put(self, key: str, result):
+        with self._lock: self._store(key, result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._data), inflight=len(self._inflight),
+                        max_entries=self.max_entries, ttl=self.ttl)
+
+    # ───── 내부 (잠금 보유 상태에서 호출) ─────
+    def _lookup(self, key):
+        item = self._data.get(key)
+        if item is None: return None
+        if time.time() - item[1] > self.ttl:
+            del self._data[key]; return None
+        self._data.move_to_end(key)
+        return item[0]
+
+    def _store(self, key, result):
+        self._data[key] = (result, time.time())
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self._stats["evictions"] += 1
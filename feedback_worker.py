@@ -0,0 +1,71 @@
+# feedback_worker.py
+# -*- coding: utf-8 -*-
+# 세션 종료 즉시 피드백 평가를 백그라운드에서 미리 돌려 두는 워커 풀.
+# 동시 실행 수(workers)와 대기열 길이(max_queue)가 모두 제한되며, 대기열이 차면 제출을 거절한다
+# (거절된 세션은 피드백 페이지에서 기존처럼 요청 시점에 계산된다).
+import queue, threading, time
+
+
+class FeedbackPrecomputer:
+    def __init__(self, workers: int = 2, max_queue: int = 100):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._q = queue.Queue(maxsize=max_queue)
+        self._pending = {}   # key -> threading.Event (대기 중 또는 실행 중)
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+                       "running": 0, "total_ms": 0.0}
+        self._threads = [threading.Thread(target=self._run, name=f"feedback-{i}", daemon=True)
+                         for i in range(workers)]
+        for t in self._threads: t.start()
+
+    def submit(self, key: str, job) -> bool:
+        """job()을 백그라운드에서 실행. 이미 대기/실행 중이거나 대기열이 가득 차면 False."""
+        with self._lock:
+            if key in self._pending: return False
+            ev = self._pending[key] = threading.Event()
+        try:
+            self._q.put_nowait((key, job))
+        except queue.Full:
+            with self._lock:
+                self._pending.pop(key, None)
+                self._stats["rejected"] += 1
+            ev.set()
+            return False
+        with self._lock: self._stats["submitted"] += 1
+        return True
+
+    def pending(self, key: str) -> bool:
+        with self._lock: return key in self._pending
+
+    def wait(self, key: str, timeout: float) -> bool:
+        """key 작업이 끝날 때까지 최대 timeout초 대기. 끝났거나(또는 애초에 없으면) True."""
+        with self._lock: ev = self._pending.get(key)
+        return True if ev is None else ev.wait(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s.update(queue_depth=self._q.qsize(), max_queue=self.max_queue, workers=self.workers,
+                     pending=len(self._pending))
+        done = s["completed"] + s["failed"]
+        s["avg_ms"] = round(s.pop("total_ms") / done, 1) if done else 0.0
+        return s
+
+    def _run(self):
+        while True:
+            key, job = self._q.get()
+            with self._lock: self._stats["running"] += 1
+            t0 = time.perf_counter()
+            ok = True
+            try:
+                job()
+            except Exception:
+                ok = False
+            with self._lock:
+                self._stats["running"] -= 1
+                self._stats["completed" if ok else "failed"] += 1
+                self._stats["total_ms"] += (time.perf_counter() - t0) * 1000
+                ev = self._pending.pop(key, None)
+            if ev: ev.set()
+            self._q.task_done()
@@ -0,0 +1,193 @@
+# gemini_client.py
+# -*- coding: utf-8 -*-
+# Gemini REST 호출을 한 곳으로 모은 클라이언트.
+# requests.Session 하나를 재사용해 TCP/TLS 연결을 keep-alive로 유지하고,
+# 커넥션 풀 크기·connect/read 타임아웃·429/503 재시도(backoff)를 여기서만 관리한다.
+# admission(admission.Admission)이 주어지면 priority를 지정한 generate/stream 호출은 키별 입장 제어를 거친다.
+import json, threading, time
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+RETRY_STATUSES = (429, 503)
+
+
+class GeminiClient:
+    def __init__(self, model: str, base_url: str = DEFAULT_BASE_URL, pool_size: int = 10,
+                 connect_timeout: float = 3.05, read_timeout: float = 30,
+                 retries: int = 2, backoff: float = 0.5, admission=None):
+        self.model = model
+        self.admission = admission
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self._retry = Retry(
+            total=retries, connect=retries, read=0, status=retries,
+            backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "POST"}),   # generateContent는 POST지만 멱등하게 취급
+            respect_retry_after_header=True, raise_on_status=False,
+        )
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                    max_retries=self._retry, pool_block=False)
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+
+        self.observer = None     # (method, 초, status 문자열 또는 "error") → 지연 히스토그램 등 외부 집계용
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "errors": 0, "retried": 0, "in_flight": 0,
+                       "max_in_flight": 0, "total_ms": 0.0}
+        self._usage = {"reports": 0, "prompt_tokens": 0, "output_tokens": 0, "cached_tokens": 0,
+                       "last_prompt_tokens": 0, "max_prompt_tokens": 0}
+
+    # ───── URL ─────
+    def url(self, method: str = "generateContent") -> str:
+        return f"{self.base_url}/v1beta/models/{self.model}:{method}"
+
+    # ───── 호출 ─────
+    def post(self, payload, key: str, method: str = "generateContent", timeout=None, **kwargs):
+        """payload(dict 또는 직렬화된 str)를 전송하고 requests.Response를 돌려준다."""
+        body = payload if isinstance(payload, (str, bytes)) else json.dumps(payload, ensure_ascii=False)
+        if isinstance(body, str): body = body.encode("utf-8")
+        params = dict(kwargs.pop("params", None) or {}, key=key)
+        with self.tracked(method) as call:
+            r = self.session.post(self.url(method), params=params, data=body,
+                                  timeout=timeout or self.timeout, **kwargs)
+            call["status"] = r.status_code
+            hist = getattr(getattr(r.raw, "retries", None), "history", None)
+            if hist:
+                with self._lock: self._stats["retried"] += len(hist)
+            return r
+
+    def resource(self, http_method: str, path: str, key: str, payload=None, params=None, timeout=None):
+        """v1beta 리소스 호출 (예: POST cachedContents, PATCH cachedContents/<id>)."""
+        body = None if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        with self.tracked(path.split("/", 1)[0]) as call:
+            r = self.session.request(http_method, f"{self.base_url}/v1beta/{path}", params=dict(params or {}, key=key),
+                                     data=body, timeout=timeout or self.timeout)
+            call["status"] = r.status_code
+            return r
+
+    def generate(self, payload, key: str, timeout=None, priority=None, cost: int = 0, queue_timeout=None):
+        """priority가 있으면 입장 제어(대기/거절 시 admission.Overloaded)를 거쳐 호출한다.
+        cost = 예상 토큰 수(프롬프트 + 출력). 응답 usageMetadata로 정산된다."""
+        if self.admission is None or priority is None:
+            return self.post(payload, key, "generateContent", timeout=timeout)
+        with self.admission.slot(key, priority, cost, queue_timeout) as ticket:
+            r = self.post(payload, key, "generateContent", timeout=timeout)
+            usage = None
+            if r.status_code == 200:
+                try: usage = r.json().get("usageMetadata")
+                except ValueError: pass
+            self._settle(key, ticket, r, usage)
+            return r
+
+    def stream(self, payload, key: str, timeout=None, priority=None, cost: int = 0, queue_timeout=None):
+        """streamGenerateContent(SSE)를 열고 도착하는 청크(dict)를 순서대로 yield한다.
+        HTTP 오류는 requests.HTTPError로 올린다. priority가 있으면 스트림이 닫힐 때까지 입장 슬롯을 점유한다."""
+        if self.admission is None or priority is None:
+            yield from self._stream(payload, key, timeout)
+            return
+        with self.admission.slot(key, priority, cost, queue_timeout) as ticket:
+            usage = None
+            try:
+                for chunk in self._stream(payload, key, timeout):
+                    usage = chunk.get("usageMetadata") or usage
+                    yield chunk
+            except requests.HTTPError as e:
+                if e.response is not None: self._settle(key, ticket, e.response, None)
+                raise
+            if usage: ticket.settle(int(usage.get("totalTokenCount") or 0))
+
+    def _settle(self, key, ticket, r, usage):
+        # 429(재시도 중 포함)를 봤으면 버킷을 비워 속도를 늦추고, 성공이면 실제 토큰 수로 정산
+        hist = getattr(getattr(r.raw, "retries", None), "history", None) or ()
+        if r.status_code == 429 or any(h.status == 429 for h in hist):
+            self.admission.limiter(key).throttle()
+        if usage: ticket.settle(int(usage.get("totalTokenCount") or 0))
+
+    def _stream(self, payload, key: str, timeout=None):
+        r = self.post(payload, key, "streamGenerateContent", timeout=timeout,
+                      params={"alt": "sse"}, stream=True)
+        try:
+            if r.status_code != 200:
+                raise requests.HTTPError(f"HTTP {r.status_code}: {r.text[:200]}", response=r)
+            for line in r.iter_lines(decode_unicode=False):
+                if not line or not line.startswith(b"data:"): continue
+                yield json.loads(line[5:].strip().decode("utf-8"))
+        finally:
+            r.close()
+
+    # ───── 통계 ─────
+    @contextmanager
+    def tracked(self, method: str = "generateContent"):
+        """호출 1건을 요청/오류/지연 통계에 잡는다 (외부 비동기 전송도 같은 통계를 쓰도록 공개).
+        yield된 dict의 "status"에 HTTP 상태를 넣으면 observer에 함께 전달된다."""
+        self._enter()
+        t0 = time.perf_counter()
+        call, ok = {"status": None}, False
+        try:
+            yield call
+            ok = True
+        finally:
+            sec = time.perf_counter() - t0
+            self._exit(sec * 1000, ok)
+            if self.observer:
+                self.observer(method, sec, str(call["status"]) if ok and call["status"] is not None else "error")
+
+    def _enter(self):
+        with self._lock:
+            s = self._stats
+            s["requests"] += 1
+            s["in_flight"] += 1
+            s["max_in_flight"] = max(s["max_in_flight"], s["in_flight"])
+
+    def _exit(self, ms: float, ok: bool):
+        with self._lock:
+            s = self._stats
+            s["in_flight"] -= 1
+            s["total_ms"] += ms
+            if not ok: s["errors"] += 1
+
+    def record_usage(self, usage: dict) -> dict:
+        """응답의 usageMetadata를 누적하고 {prompt, output, cached} 토큰 수를 돌려준다."""
+        u = {"prompt": int((usage or {}).get("promptTokenCount") or 0),
+             "output": int((usage or {}).get("candidatesTokenCount") or 0),
+             "cached": int((usage or {}).get("cachedContentTokenCount") or 0)}
+        if not usage: return u
+        with self._lock:
+            s = self._usage
+            s["reports"] += 1
+            s["prompt_tokens"] += u["prompt"]; s["output_tokens"] += u["output"]; s["cached_tokens"] += u["cached"]
+            s["last_prompt_tokens"] = u["prompt"]
+            s["max_prompt_tokens"] = max(s["max_prompt_tokens"], u["prompt"])
+        return u
+
+    def stats(self) -> dict:
+        with self._lock: s = dict(self._stats); usage = dict(self._usage)
+        pools = []
+        try:
+            # 공개 API로 base_url 풀만 조회 (내부 컨테이너를 잠금 없이 돌지 않게). 풀이 없으면 만들기만, 연결은 안 연다
+            pool = self._adapter.poolmanager.connection_from_url(self.base_url)
+            pools.append({
+                "host": f"{pool.host}:{pool.port}",
+                "maxsize": pool.pool.maxsize if pool.pool is not None else self.pool_size,
+                "idle": pool.pool.qsize() if pool.pool is not None else 0,
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+            })
+        except Exception:
+            pass        # urllib3 버전 차이 등으로 풀 정보를 못 읽어도 나머지 통계는 보고
+        s["avg_ms"] = round(s.pop("total_ms") / s["requests"], 1) if s["requests"] else 0.0
+        s["pool_size"] = self.pool_size
+        s["timeout"] = {"connect": self.timeout[0], "read": self.timeout[1]}
+        usage["avg_prompt_tokens"] = round(usage["prompt_tokens"] / usage["reports"], 1) if usage["reports"] else 0.0
+        s["usage"] = usage
+        s["pools"] = pools
+        return s
+
+    def close(self):
+        self.session.close()
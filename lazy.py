@@ -0,0 +1,54 @@
+# lazy.py
+# -*- coding: utf-8 -*-
+# 첫 사용 때 만드는 하위 시스템 프록시.
+#  - Lazy(factory): 속성 읽기/쓰기, len/in/iter를 factory()가 돌려준 객체에 넘긴다 → 호출부는 그대로 GEMINI.generate(...)
+#  - 한 프로세스에서 한 번만 만든다 (스레드 안전). 만든 pid와 지금 pid가 다르면(fork) 부모 것은 버리고 다시 만든다:
+#    소켓/스레드/DB 연결은 워커마다 새로, 임포트 때 만든 읽기 전용 데이터만 fork 후 copy-on-write로 공유
+#  - is_built(x): 이미 만들어졌는지 (healthz/metrics가 아직 안 쓴 무거운 하위 시스템을 깨우지 않게)
+#  프록시 자신의 메서드는 _로 시작하는 것뿐 → 감싼 객체의 get()/stats() 등과 겹치지 않는다
+import os, threading
+
+
+class Lazy:
+    __slots__ = ("_factory", "_name", "_obj", "_pid", "_lock")
+
+    def __init__(self, factory, name: str = None):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_name", name or getattr(factory, "__name__", "lazy"))
+        object.__setattr__(self, "_obj", None)
+        object.__setattr__(self, "_pid", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _target(self):
+        if self._pid == os.getpid(): return self._obj
+        with self._lock:
+            if self._pid != os.getpid():
+                object.__setattr__(self, "_obj", self._factory())
+                object.__setattr__(self, "_pid", os.getpid())
+        return self._obj
+
+    def __getattr__(self, attr):
+        return getattr(self._target(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._target(), attr, value)
+
+    def __bool__(self):
+        return True      # 꺼진 하위 시스템은 Lazy 대신 None으로 둔다 (if X: 검사가 객체를 만들지 않게)
+
+    def __len__(self):
+        return len(self._target())
+
+    def __contains__(self, item):
+        return item in self._target()
+
+    def __iter__(self):
+        return iter(self._target())
+
+    def __repr__(self):
+        return f"<Lazy {self._name} {'built' if is_built(self) else 'pending'}>"
+
+
+def is_built(obj) -> bool:
+    """Lazy면 이 프로세스에서 이미 만들어졌는지, 그 밖의 객체는 항상 True."""
+    return not isinstance(obj, Lazy) or obj._pid == os.getpid()
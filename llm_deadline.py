@@ -0,0 +1,134 @@
+# llm_deadline.py
+# -*- coding: utf-8 -*-
+# 모드별 지연 SLO 안에서 LLM 응답을 받기 위한 hedged 호출.
+#  - 첫 시도가 hedge_after초 안에 끝나지 않으면(또는 그 전에 실패하면) 같은 요청을 한 번 더 보낸다
+#  - deadline초까지 먼저 성공한 쪽을 쓰고, 마감을 넘기면 None → 호출부가 규칙엔진으로 폴백
+#  - 마감 뒤 도착한 응답은 on_late로 넘겨 기록만 하고 버린다
+#  - 풀이 밀려 아직 시작 못 한 시도는 호출이 끝나면 취소하고, 그래도 늦게 차례가 온 시도는 요청을 보내지 않는다(expired)
+# 모드별 업스트림 결과(llm/deadline/error)와, 실제로 사용자에게 나간 답 중 규칙엔진 폴백 비율을 집계한다.
+import asyncio, threading, time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class _Expired(Exception):
+    """풀 대기 중에 호출이 끝나(승자 결정/마감 초과) 보내지 않은 시도."""
+
+
+class HedgedCaller:
+    def __init__(self, slo: dict, max_workers: int = 32):
+        self.slo = slo              # mode -> (hedge_after, deadline)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def limits(self, mode: str):
+        return self.slo.get(mode) or self.slo["chat"]
+
+    def call(self, mode: str, attempt, accept=lambda r: r is not None, on_late=None):
+        """(결과 또는 None, outcome). outcome ∈ llm | deadline | error"""
+        hedge_after, deadline = self.limits(mode)
+        t0 = time.monotonic()
+        over = threading.Event()        # 호출이 끝나면 set → 풀에서 늦게 시작하는 시도는 보내지 않는다
+        attempt = self._guarded(mode, attempt, over)
+        futs, hedged, winner = [self._pool.submit(attempt)], False, None
+        while winner is None:
+            elapsed = time.monotonic() - t0
+            if elapsed >= deadline: break
+            pending = [f for f in futs if not f.done()]
+            if not hedged and (not pending or elapsed >= hedge_after):
+                futs.append(self._pool.submit(attempt)); hedged = True   # 느리거나 실패 → 두 번째 요청
+                continue
+            if not pending: break
+            limit = deadline if hedged else min(hedge_after, deadline)
+            done, _ = wait(pending, timeout=max(0.0, limit - elapsed), return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None and accept(f.result())), None)
+
+        over.set()
+        for f in futs:
+            if f is winner: continue
+            if f.cancel():                  # 아직 풀 대기 중 → 요청 자체를 보내지 않음
+                with self._lock: self._mode(mode)["expired"] += 1
+                continue
+            f.add_done_callback(lambda f, t0=t0: self._late(mode, f, t0, accept, on_late))
+        outcome = "llm" if winner else ("deadline" if time.monotonic() - t0 >= deadline else "error")
+        self.record(mode, outcome, hedged=hedged, hedge_won=bool(winner) and hedged and winner is futs[-1],
+                    ms=(time.monotonic() - t0) * 1000)
+        return (winner.result() if winner else None), outcome
+
+    def _guarded(self, mode, attempt, over):
+        def run():
+            if over.is_set():
+                with self._lock: self._mode(mode)["expired"] += 1
+                raise _Expired()
+            return attempt()
+        return run
+
+    async def acall(self, mode: str, attempt, accept=lambda r: r is not None, on_late=None):
+        """call()의 asyncio 버전. attempt는 코루틴 함수."""
+        hedge_after, deadline = self.limits(mode)
+        loop = asyncio.get_running_loop()
+        t0, mono0 = loop.time(), time.monotonic()
+        tasks, hedged, winner = [asyncio.ensure_future(attempt())], False, None
+        while winner is None:
+            elapsed = loop.time() - t0
+            if elapsed >= deadline: break
+            pending = [t for t in tasks if not t.done()]
+            if not hedged and (not pending or elapsed >= hedge_after):
+                tasks.append(asyncio.ensure_future(attempt())); hedged = True
+                continue
+            if not pending: break
+            limit = deadline if hedged else min(hedge_after, deadline)
+            done, _ = await asyncio.wait(pending, timeout=max(0.0, limit - elapsed), return_when=asyncio.FIRST_COMPLETED)
+            winner = next((t for t in done if not t.cancelled() and t.exception() is None and accept(t.result())), None)
+
+        for t in tasks:
+            if t is not winner: t.add_done_callback(lambda t: self._late(mode, t, mono0, accept, on_late))
+        outcome = "llm" if winner else ("deadline" if loop.time() - t0 >= deadline else "error")
+        self.record(mode, outcome, hedged=hedged, hedge_won=bool(winner) and hedged and winner is tasks[-1],
+                    ms=(loop.time() - t0) * 1000)
+        return (winner.result() if winner else None), outcome
+
+    def record(self, mode: str, outcome: str, hedged=False, hedge_won=False, ms=0.0):
+        with self._lock:
+            s = self._mode(mode)
+            s["requests"] += 1
+            s[outcome] += 1
+            s["hedged"] += hedged
+            s["hedge_won"] += hedge_won
+            s["total_ms"] += ms
+
+    def reply(self, mode: str, fallback: bool):
+        """사용자에게 나간 답 1건 (fallback=True면 규칙엔진 답)."""
+        with self._lock:
+            s = self._mode(mode)
+            s["replies"] += 1
+            s["fallback"] += fallback
+
+    def _mode(self, mode):
+        # 잠금 보유 상태에서 호출
+        return self._stats.setdefault(mode, {"requests": 0, "llm": 0, "deadline": 0, "error": 0, "hedged": 0,
+                                             "hedge_won": 0, "late": 0, "expired": 0, "total_ms": 0.0, "replies": 0, "fallback": 0})
+
+    def stats(self) -> dict:
+        out = {}
+        with self._lock:
+            for mode, s in self._stats.items():
+                s = dict(s)
+                n = s["requests"]
+                s["avg_ms"] = round(s.pop("total_ms") / n, 1) if n else 0.0
+                s["fallback_rate"] = round(s["fallback"] / s["replies"], 4) if s["replies"] else 0.0
+                hedge_after, deadline = self.limits(mode)
+                s["slo"] = {"hedge_after": hedge_after, "deadline": deadline}
+                out[mode] = s
+        return out
+
+    def _late(self, mode, f, t0, accept, on_late):
+        # 승자가 정해졌거나 마감이 지난 뒤 끝난 시도
+        if f.cancelled() or f.exception() is not None: return
+        r = f.result()
+        if not accept(r): return
+        with self._lock:
+            if mode in self._stats: self._stats[mode]["late"] += 1
+        if on_late:
+            try: on_late(r, (time.monotonic() - t0) * 1000)
+            except Exception: pass
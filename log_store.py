@@ -0,0 +1,110 @@
+# log_store.py
+# -*- coding: utf-8 -*-
+# 종료된 세션 기록 저장소.
+#  - 고정 크기 링 버퍼(O(1) append, seq % capacity 로 O(1) 조회)
+#  - session_id / mode / topic 역색인 (seq 오름차순 목록)
+#  - 밀려난 항목은 선택적으로 JSONL 파일에 덧붙여 보관(spill)
+#  - 각 항목은 append 시점에 JSON으로 한 번만 직렬화해 두고 조회 시 그대로 이어 붙인다
+import json, threading
+from bisect import bisect_left
+
+INDEXED_FIELDS = ("session_id", "mode", "topic")
+
+
+class _Postings:
+    # seq 오름차순 목록. 앞에서 빠지는(가장 오래된) 항목은 head만 옮기고 가끔 압축한다.
+    __slots__ = ("items", "head")
+
+    def __init__(self):
+        self.items, self.head = [], 0
+
+    def append(self, seq):
+        self.items.append(seq)
+
+    def popleft(self):
+        self.head += 1
+        if self.head > 64 and self.head * 2 > len(self.items):
+            del self.items[:self.head]; self.head = 0
+
+    def __len__(self):
+        return len(self.items) - self.head
+
+
+class LogStore:
+    def __init__(self, capacity: int = 5000, spill_path: str = None):
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self._buf = [None] * capacity   # (entry, json_str)
+        self._next = 0                  # 다음에 부여할 seq
+        self._index = {f: {} for f in INDEXED_FIELDS}
+        self._lock = threading.RLock()
+        self._spill = open(spill_path, "a", encoding="utf-8") if spill_path else None
+        self._spilled = 0
+
+    # ───── 쓰기 ─────
+    def append(self, entry: dict) -> dict:
+        with self._lock:
+            seq = self._next
+            if seq >= self.capacity: self._evict(self._buf[seq % self.capacity])
+            entry = dict(entry, seq=seq)
+            self._buf[seq % self.capacity] = (entry, json.dumps(entry, ensure_ascii=False))
+            for f in INDEXED_FIELDS:
+                v = entry.get(f)
+                if v is not None: self._index[f].setdefault(v, _Postings()).append(seq)
+            self._next = seq + 1
+            return entry
+
+    def _evict(self, item):
+        entry, raw = item
+        for f in INDEXED_FIELDS:
+            v = entry.get(f)
+            if v is None: continue
+            p = self._index[f][v]
+            p.popleft()
+            if not len(p): del self._index[f][v]
+        if self._spill:
+            self._spill.write(raw + "\n"); self._spill.flush()
+            self._spilled += 1
+
+    # ───── 읽기 ─────
+    def _first(self):
+        return max(0, self._next - self.capacity)
+
+    def get(self, seq: int):
+        with self._lock:
+            if not (self._first() <= seq < self._next): return None
+            return self._buf[seq % self.capacity][0]
+
+    def query(self, cursor: int = None, limit: int = 50, raw: bool = False, **filters):
+        """최신순 페이지. cursor는 이전 페이지의 next_cursor(이 seq 미만부터).
+        filters: session_id/mode/topic 값이 일치하는 항목만. 반환: (items, next_cursor)"""
+        filters = {f: v for f, v in filters.items() if f in INDEXED_FIELDS and v not in (None, "")}
+        with self._lock:
+            first, upper = self._first(), self._next if cursor is None else min(cursor, self._next)
+            if filters:
+                # 가장 짧은 역색인을 기준으로 훑고 나머지 조건은 항목에서 확인
+                postings = [self._index[f].get(v) for f, v in filters.items()]
+                if any(p is None for p in postings): return [], None
+                base = min(postings, key=len)
+                pos = bisect_left(base.items, upper, lo=base.head)
+                seqs = (base.items[i] for i in range(pos - 1, base.head - 1, -1))
+            else:
+                seqs = range(upper - 1, first - 1, -1)
+
+            out, last = [], None
+            for seq in seqs:
+                entry, js = self._buf[seq % self.capacity]
+                if any(entry.get(f) != v for f, v in filters.items()): continue
+                if len(out) == limit:
+                    return out, last
+                out.append(js if raw else entry); last = seq
+            return out, None
+
+    def __len__(self):
+        return self._next - self._first()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self), "capacity": self.capacity, "appended": self._next,
+                    "spilled": self._spilled, "spill_path": self.spill_path,
+                    "index_keys": {f: len(ix) for f, ix in self._index.items()}}
@@ -0,0 +1,83 @@
+# metrics.py
+# -*- coding: utf-8 -*-
+# Prometheus 텍스트 포맷(0.0.4) 지표. 외부 의존성 없는 최소 구현.
+#  - Histogram: 요청 경로에서 observe() 1회 = 버킷 bisect + 잠금 1회 (라벨 조합별 버킷 배열은 처음 볼 때 한 번 생성)
+#  - 그 밖의 카운터/게이지는 각 구성요소가 이미 집계하는 stats()를 스크레이프 시점에 읽어 내보낸다
+#    (collector 함수 → 요청 경로 비용 0)
+import bisect, math, threading
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra: pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(v) -> str:
+    if v == math.inf: return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help = name, help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children = {}     # label values -> [버킷별 개수(+Inf 포함, 누적 아님), 합계]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)     # le는 경계 포함
+        with self._lock:
+            c = self._children.get(labels)
+            if c is None: c = self._children[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            c[0][i] += 1
+            c[1] += value
+
+    def render(self, out: list):
+        with self._lock: children = [(k, list(c[0]), c[1]) for k, c in self._children.items()]
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} histogram")
+        for labels, counts, total in sorted(children):
+            acc = 0
+            for le, n in zip(self.buckets + (math.inf,), counts):
+                acc += n
+                bucket = _labels(self.labelnames, labels, 'le="' + _num(le) + '"')
+                out.append(f"{self.name}_bucket{bucket} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {acc}")
+
+
+class Registry:
+    def __init__(self):
+        self._histograms = []
+        self._collectors = []
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        h = Histogram(name, help, labelnames, buckets)
+        self._histograms.append(h)
+        return h
+
+    def collector(self, fn):
+        """스크레이프 때 호출될 함수 등록 (데코레이터). fn()은 (name, type, help, [(labels dict, value), ...])를 yield."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        out = []
+        for h in self._histograms: h.render(out)
+        for fn in self._collectors:
+            try: families = list(fn())
+            except Exception: continue     # 한 구성요소 오류로 전체 스크레이프가 실패하지 않게
+            for name, kind, help, samples in families:
+                out.append(f"# HELP {name} {help}")
+                out.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    out.append(f"{name}{_labels(labels.keys(), labels.values())} {_num(value)}")
+        return "\n".join(out) + "\n"
@@ -0,0 +1,194 @@
+# notice_store.py
+# -*- coding: utf-8 -*-
+# 공지사항 저장소 (SQLite, WAL).
+#  - 정렬 = 고정 공지 먼저, 그다음 최신(id 내림차순). 정렬 키 sort_key = pinned·2^40 + id 를 저장형 생성 열로 두고
+#    인덱스를 걸어 삽입/고정 변경 때 함께 갱신되므로, 목록 조회는 정렬 없이 인덱스를 앞에서부터 읽는다.
+#    카테고리별 목록은 (category, sort_key) 인덱스
+#  - 키셋(커서) 페이지네이션: 커서 = "<pinned>.<id>", 다음/이전 페이지 모두 sort_key 범위 탐색
+#    (OFFSET 없이 깊은 페이지도 첫 페이지와 같은 비용. (pinned, id) 행 값 비교는 SQLite가 pinned까지만 탐색에 써서 쓰지 않는다)
+#  - 조회수: 요청마다 UPDATE하지 않고 메모리 카운터에 모았다가 flush_every건 또는 flush_interval초마다 한 트랜잭션으로 반영.
+#    읽을 때는 DB 값 + 아직 반영 안 된 값을 더해 보여준다
+import atexit, os, sqlite3, threading, time
+from collections import Counter
+
+PIN_SHIFT = 1 << 40
+COLUMNS = ("id", "pinned", "category", "title", "author", "created_at", "content", "attach_count", "views")
+_LIST_COLUMNS = "id, pinned, category, title, author, created_at, attach_count, views"
+
+
+def encode_cursor(post) -> str:
+    return f"{int(bool(post['pinned']))}.{post['id']}"
+
+
+def decode_cursor(cursor):
+    """sort_key 또는 형식이 틀리면 None."""
+    try:
+        p, i = str(cursor).split(".", 1)
+        return int(bool(int(p))) * PIN_SHIFT + int(i)
+    except (TypeError, ValueError):
+        return None
+
+
+def _sort_key(post) -> int:
+    return int(bool(post["pinned"])) * PIN_SHIFT + post["id"]
+
+
+class NoticeStore:
+    def __init__(self, path: str, flush_every: int = 200, flush_interval: float = 5.0, seed=None):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._tls = threading.local()
+        self._views = Counter()          # id -> 아직 DB에 반영 안 된 조회수
+        self._pending = 0                # sum(self._views.values())
+        self._views_lock = threading.Lock()
+        self._stats = {"views": 0, "flushes": 0, "flushed_rows": 0}
+        c = self._conn()
+        c.execute("CREATE TABLE IF NOT EXISTS notices (id INTEGER PRIMARY KEY, pinned INTEGER NOT NULL DEFAULT 0, "
+                  "category TEXT, title TEXT NOT NULL, author TEXT, created_at TEXT, content TEXT, "
+                  "attach_count INTEGER NOT NULL DEFAULT 0, views INTEGER NOT NULL DEFAULT 0, "
+                  f"sort_key INTEGER GENERATED ALWAYS AS (pinned * {PIN_SHIFT} + id) STORED)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_notices_order ON notices(sort_key)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_notices_cat_order ON notices(category, sort_key)")
+        if seed: self.add_many(seed, only_if_empty=True)     # 새 DB에 워커 여럿이 동시에 떠도 한 번만
+        self._stop = threading.Event()
+        threading.Thread(target=self._flusher, name="notice-views", daemon=True).start()
+        atexit.register(self.flush)
+
+    def _conn(self):
+        c = getattr(self._tls, "conn", None)
+        if c is None or getattr(self._tls, "pid", None) != os.getpid():   # fork 이후엔 새 연결
+            c = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            c.row_factory = sqlite3.Row
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            self._tls.conn, self._tls.pid = c, os.getpid()
+        return c
+
+    # ───── 쓰기 ─────
+    def add(self, title: str, category: str = "공지", author: str = "관리자", content: str = None,
+            pinned: bool = False, created_at: str = None, attach_count: int = 0, views: int = 0) -> int:
+        cur = self._conn().execute(
+            "INSERT INTO notices (pinned, category, title, author, created_at, content, attach_count, views) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (int(bool(pinned)), category, title, author, created_at or time.strftime("%y.%m.%d"), content,
+             attach_count, views))
+        return cur.lastrowid
+
+    def add_many(self, posts, only_if_empty: bool = False):
+        """dict 목록을 한 트랜잭션으로 넣는다 (id가 있으면 그대로 사용).
+        only_if_empty: 테이블이 비어 있을 때만 (확인과 삽입을 같은 쓰기 트랜잭션에서)."""
+        rows = [(p.get("id"), int(bool(p.get("pinned"))), p.get("category"), p["title"], p.get("author"),
+                 p.get("created_at") or time.strftime("%y.%m.%d"), p.get("content"), p.get("attach_count") or 0,
+                 p.get("views") or 0) for p in posts]
+        c = self._conn()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            if not (only_if_empty and c.execute("SELECT 1 FROM notices LIMIT 1").fetchone()):
+                c.executemany(f"INSERT INTO notices ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+
+
+    def set_pinned(self, post_id: int, pinned: bool):
+        self._conn().execute("UPDATE notices SET pinned=? WHERE id=?", (int(bool(pinned)), post_id))
+
+    # ───── 읽기 ─────
+    @staticmethod
+    def _where(category, op=None, key=None):
+        conds, args = [], []
+        if category: conds.append("category = ?"); args.append(category)
+        if key is not None: conds.append(f"sort_key {op} ?"); args.append(key)
+        return ("WHERE " + " AND ".join(conds)) if conds else "", args
+
+    def page(self, limit: int = 10, after: str = None, before: str = None, category: str = None):
+        """(items, prev_cursor, next_cursor). after/before는 이전 응답의 next_cursor/prev_cursor."""
+        c = self._conn()
+        if before and decode_cursor(before) is not None:
+            # 이전 페이지: 커서보다 위(정렬상 큰 키)를 오름차순으로 읽고 뒤집는다
+            where, args = self._where(category, ">", decode_cursor(before))
+            rows = c.execute(f"SELECT {_LIST_COLUMNS} FROM notices {where} ORDER BY sort_key ASC LIMIT ?",
+                             (*args, limit + 1)).fetchall()
+            items = [self._row(r) for r in reversed(rows[:limit])]
+            prev_cursor = encode_cursor(items[0]) if len(rows) > limit else None
+            return items, prev_cursor, (encode_cursor(items[-1]) if items else None)
+        key = decode_cursor(after)
+        where, args = self._where(category, "<", key)
+        rows = c.execute(f"SELECT {_LIST_COLUMNS} FROM notices {where} ORDER BY sort_key DESC LIMIT ?",
+                         (*args, limit + 1)).fetchall()
+        items = [self._row(r) for r in rows[:limit]]
+        next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+        prev_cursor = None
+        if key is not None and items:
+            where, args = self._where(category, ">", _sort_key(items[0]))
+            if c.execute(f"SELECT 1 FROM notices {where} LIMIT 1", args).fetchone(): prev_cursor = encode_cursor(items[0])
+        return items, prev_cursor, next_cursor
+
+    def get(self, post_id: int):
+        r = self._conn().execute(f"SELECT {', '.join(COLUMNS)} FROM notices WHERE id=?", (post_id,)).fetchone()
+        return self._row(r) if r else None
+
+    def neighbors(self, post, category: str = None):
+        """목록 순서상 (이전 글 = 더 위, 다음 글 = 더 아래). 각각 {id, title} 또는 None.
+        category를 주면 page()처럼 그 분류 안에서만."""
+        c, key = self._conn(), _sort_key(post)
+        where, args = self._where(category, ">", key)
+        newer = c.execute(f"SELECT id, title FROM notices {where} ORDER BY sort_key ASC LIMIT 1", args).fetchone()
+        where, args = self._where(category, "<", key)
+        older = c.execute(f"SELECT id, title FROM notices {where} ORDER BY sort_key DESC LIMIT 1", args).fetchone()
+        return (dict(newer) if newer else None), (dict(older) if older else None)
+
+    def _row(self, r) -> dict:
+        d = dict(r)
+        d["pinned"] = bool(d["pinned"])
+        with self._views_lock: d["views"] += self._views.get(d["id"], 0)
+        return d
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM notices").fetchone()[0]
+
+    # ───── 조회수 ─────
+    def view(self, post_id: int):
+        with self._views_lock:
+            self._views[post_id] += 1
+            self._pending += 1
+            self._stats["views"] += 1
+            full = self._pending >= self.flush_every
+        if full: self.flush()
+
+    def flush(self) -> int:
+        with self._views_lock:
+            pending, self._views, n = self._views, Counter(), self._pending
+            self._pending = 0
+        if not pending: return 0
+        c = self._conn()
+        try:
+            c.execute("BEGIN")
+            c.executemany("UPDATE notices SET views = views + ? WHERE id = ?", [(n, i) for i, n in pending.items()])
+            c.execute("COMMIT")
+        except sqlite3.Error:
+            if c.in_transaction: c.execute("ROLLBACK")
+            with self._views_lock:     # 다음 flush 때 다시 시도
+                self._views.update(pending)
+                self._pending += n
+            raise
+        with self._views_lock:
+            self._stats["flushes"] += 1
+            self._stats["flushed_rows"] += len(pending)
+        return len(pending)
+
+    def _flusher(self):
+        while not self._stop.wait(self.flush_interval):
+            try: self.flush()
+            except sqlite3.Error: pass
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._views_lock: s = dict(self._stats, pending_views=self._pending)
+        return dict(s, path=self.path, notices=len(self), flush_every=self.flush_every,
+                    flush_interval=self.flush_interval)
@@ -0,0 +1,98 @@
+# page_cache.py
+# -*- coding: utf-8 -*-
+# 데이터 없는 템플릿 페이지의 렌더 결과 캐시.
+# 키 = (엔드포인트, 뷰 인자, 쿼리 인자, 로그인 여부) → 적중하면 컨텍스트 프로세서/Jinja 렌더를 건너뛰고 저장된 HTML을 보낸다.
+#  - 본문 해시를 ETag로 붙이고 If-None-Match가 같으면 304 (Cache-Control: private, no-cache → 브라우저는 매번 재검증)
+#  - 템플릿 디렉터리의 (경로, mtime, 크기) 서명을 check_interval초마다 확인해 바뀌면 전체 무효화
+#    (+ on_change: Jinja 템플릿 캐시도 비워 auto_reload가 꺼진 운영 환경에서도 새 템플릿을 읽게 한다)
+#  - 200이 아닌 응답, 스트리밍 응답, GET/HEAD 외 요청은 저장하지 않는다
+import functools, hashlib, os, threading, time
+from collections import OrderedDict
+
+
+class PageCache:
+    def __init__(self, template_dirs, max_entries: int = 256, check_interval: float = 1.0, on_change=None):
+        self.template_dirs = list(template_dirs)
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self.on_change = on_change
+        self._data = OrderedDict()   # key -> (body, etag, 200 헤더, 304 헤더), LRU 순서
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "uncached": 0, "evictions": 0, "invalidations": 0}
+        self._sig = self._signature()
+        self._checked = time.monotonic()
+
+    def _signature(self):
+        files = []
+        for root in self.template_dirs:
+            for d, _, fs in os.walk(root):
+                for f in fs:
+                    p = os.path.join(d, f)
+                    try: st = os.stat(p)
+                    except OSError: continue
+                    files.append((p, st.st_mtime_ns, st.st_size))
+        return hash(tuple(sorted(files)))
+
+    def check(self):
+        """템플릿이 바뀌었으면 비운다 (check_interval마다 한 요청만 실제로 stat)."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked < self.check_interval: return False
+            self._checked = now
+        sig = self._signature()
+        if sig == self._sig: return False
+        with self._lock:
+            self._sig = sig
+            self._data.clear()
+            self._stats["invalidations"] += 1
+        if self.on_change: self.on_change()
+        return True
+
+    def clear(self):
+        with self._lock: self._data.clear()
+
+    def cached(self, view):
+        """라우트 데코레이터: @app.route(...) 아래에 둔다."""
+        from flask import Response, make_response, request, session
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"): return view(*args, **kwargs)
+            self.check()
+            key = (request.endpoint, tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))),
+                   bool(session.get("user")))
+            with self._lock:
+                entry = self._data.get(key)
+                if entry is not None:
+                    self._data.move_to_end(key)
+                    self._stats["hits"] += 1
+            state = "hit"
+            if entry is None:
+                rv = make_response(view(*args, **kwargs))
+                if rv.status_code != 200 or rv.is_streamed or rv.direct_passthrough:
+                    with self._lock: self._stats["uncached"] += 1
+                    return rv
+                body = rv.get_data()
+                etag = hashlib.sha1(body).hexdigest()[:16]
+                # 응답마다 만들 헤더는 저장 때 한 번 계산
+                common = [("ETag", f'"{etag}"'), ("Cache-Control", "private, no-cache"), ("Vary", "Cookie")]
+                entry = (body, etag, common + [("Content-Type", rv.content_type)], common)
+                state = "miss"
+                with self._lock:
+                    self._stats["misses"] += 1
+                    self._data[key] = entry
+                    while len(self._data) > self.max_entries:
+                        self._data.popitem(last=False)
+                        self._stats["evictions"] += 1
+            if request.if_none_match.contains(entry[1]):
+                with self._lock: self._stats["not_modified"] += 1
+                return Response(status=304, headers=entry[3])
+            rv = Response(entry[0], headers=entry[2])
+            rv.headers["X-Page-Cache"] = state
+            return rv
+        return wrapper
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._data), max_entries=self.max_entries,
+                        check_interval=self.check_interval)
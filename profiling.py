@@ -0,0 +1,193 @@
+# profiling.py
+# -*- coding: utf-8 -*-
+# 요청 단위 프로파일링 (옵트인).
+#  - 트리거: 요청 헤더(X-Profile: 1 | sample | cprofile, X-Profile-Token 일치 필요) 또는 sample_rate 확률 샘플링
+#  - 방식: sample  = 요청 스레드의 스택을 interval마다 떠서 접힌 스택(.folded, flamegraph.pl/speedscope 입력)으로 저장
+#          cprofile = cProfile 결과(.prof, `python -m pstats`/snakeviz) + 누적 시간 상위 함수 목록
+#  - 구간(span): 코드 곳곳의 `with span("이름"):` 이 요청별 시작/소요 시간을 남긴다
+#  - 저장: 디렉터리에 <id>.json(+산출물), 최대 개수를 넘으면 오래된 것부터 삭제
+# 프로파일 중인 요청이 없으면 span()은 contextvar 조회 한 번 뒤 공용 no-op을 돌려준다.
+import contextvars, cProfile, glob, hmac, json, marshal, os, pstats, random, sys, threading, time, uuid
+from collections import Counter, OrderedDict
+from contextlib import nullcontext
+
+_NULL = nullcontext()
+_current = contextvars.ContextVar("onair_profile", default=None)
+_cprofile_lock = threading.Lock()     # 3.12+는 cProfile이 프로세스 전체에 하나만 켜질 수 있다
+
+
+def span(name: str):
+    t = _current.get()
+    return _NULL if t is None else t.span(name)
+
+
+def current():
+    return _current.get()
+
+
+class _Span:
+    __slots__ = ("trace", "name", "t0", "depth")
+
+    def __init__(self, trace, name):
+        self.trace, self.name = trace, name
+
+    def __enter__(self):
+        self.depth = self.trace._depth
+        self.trace._depth += 1
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = time.perf_counter()
+        self.trace._depth -= 1
+        self.trace.spans.append({"name": self.name, "depth": self.depth,
+                                 "start_ms": round((self.t0 - self.trace.t0) * 1000, 3),
+                                 "ms": round((t1 - self.t0) * 1000, 3)})
+
+
+class _Sampler(threading.Thread):
+    # 대상 스레드의 현재 프레임을 주기적으로 읽어 "바깥;...;안쪽" 스택별 샘플 수를 센다
+    def __init__(self, thread_id, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id, self.interval = thread_id, interval
+        self.counts = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            f = sys._current_frames().get(self.thread_id)
+            stack = []
+            while f is not None:
+                co = f.f_code
+                stack.append(f"{co.co_name} ({os.path.basename(co.co_filename)}:{co.co_firstlineno})")
+                f = f.f_back
+            if stack: self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set(); self.join(1.0)
+        return self.counts
+
+
+class Trace:
+    def __init__(self, mode, interval, meta):
+        self.id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}"
+        self.mode, self.meta = mode, meta
+        self.ts, self.t0 = time.time(), time.perf_counter()
+        self.spans, self._depth = [], 0
+        self._prof = self._sampler = None
+        if mode == "cprofile" and _cprofile_lock.acquire(blocking=False):
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+        else:
+            self.mode = "sample"
+            self._sampler = _Sampler(threading.get_ident(), interval)
+            self._sampler.start()
+        self._token = _current.set(self)
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def stop(self, **meta):
+        """프로파일을 끝내고 (요약 dict, {확장자: bytes}) 를 돌려준다."""
+        ms = (time.perf_counter() - self.t0) * 1000
+        try: _current.reset(self._token)
+        except ValueError: _current.set(None)      # 다른 컨텍스트에서 닫힌 경우
+        artifacts, top = {}, None
+        if self._prof:
+            self._prof.disable()
+            _cprofile_lock.release()
+            st = pstats.Stats(self._prof)
+            rows = sorted(st.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:30]
+            top = [{"func": f"{name} ({os.path.basename(file)}:{line})", "calls": nc,
+                    "tottime_ms": round(tt * 1000, 3), "cumtime_ms": round(ct * 1000, 3)}
+                   for (file, line, name), (cc, nc, tt, ct, _) in rows]
+            artifacts["prof"] = marshal.dumps(st.stats)      # pstats.Stats.dump_stats와 같은 형식
+        else:
+            counts = self._sampler.stop()
+            artifacts["folded"] = "".join(f"{k} {v}\n" for k, v in counts.most_common()).encode("utf-8")
+            top = [{"stack_leaf": k.rsplit(";", 1)[-1], "samples": v} for k, v in counts.most_common(15)]
+        doc = dict(self.meta, **meta, id=self.id, ts=self.ts, mode=self.mode, ms=round(ms, 3),
+                   spans=sorted(self.spans, key=lambda s: s["start_ms"]), top=top)
+        return doc, artifacts
+
+
+class TraceStore:
+    """<dir>/<id>.json + <id>.<ext>. 메모리에는 요약 색인만 둔다."""
+    SUMMARY_FIELDS = ("id", "ts", "method", "path", "endpoint", "status", "ms", "mode", "reason")
+
+    def __init__(self, path: str, max_traces: int = 200):
+        self.path, self.max_traces = path, max_traces
+        self._index = OrderedDict()     # id -> (summary, [파일 경로])
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        for p in sorted(glob.glob(os.path.join(path, "*.json")), key=os.path.getmtime):
+            try:
+                with open(p, encoding="utf-8") as f: doc = json.load(f)
+                self._index[doc["id"]] = (self._summary(doc), glob.glob(p[:-5] + ".*"))
+            except (OSError, ValueError, KeyError):
+                continue
+        with self._lock: self._evict()
+
+    def _summary(self, doc):
+        s = {k: doc.get(k) for k in self.SUMMARY_FIELDS}
+        s["spans"] = {sp["name"]: sp["ms"] for sp in doc.get("spans", []) if sp["depth"] == 0}
+        return s
+
+    def put(self, doc: dict, artifacts: dict):
+        base = os.path.join(self.path, doc["id"])
+        files = []
+        for ext, data in artifacts.items():
+            with open(f"{base}.{ext}", "wb") as f: f.write(data)
+            files.append(f"{base}.{ext}")
+        doc["artifacts"] = sorted(artifacts)
+        with open(base + ".json", "w", encoding="utf-8") as f: json.dump(doc, f, ensure_ascii=False)
+        files.append(base + ".json")
+        with self._lock:
+            self._index[doc["id"]] = (self._summary(doc), files)
+            self._evict()
+
+    def _evict(self):
+        # 잠금 보유 상태에서 호출
+        while len(self._index) > self.max_traces:
+            _, (_, files) = self._index.popitem(last=False)
+            for p in files:
+                try: os.remove(p)
+                except OSError: pass
+
+    def index(self, limit: int = 50) -> list:
+        with self._lock: items = list(self._index.values())
+        return [s for s, _ in reversed(items[-limit:])]
+
+    def file(self, trace_id: str, ext: str):
+        """저장된 파일 경로 또는 None (색인에 있는 id/확장자만)."""
+        with self._lock: entry = self._index.get(trace_id)
+        if not entry: return None
+        path = os.path.join(self.path, f"{trace_id}.{ext}")
+        return path if path in entry[1] else None
+
+
+class Profiler:
+    def __init__(self, store: TraceStore, sample_rate: float = 0.0, mode: str = "sample",
+                 interval: float = 0.002, token: str = None):
+        self.store, self.sample_rate, self.mode = store, sample_rate, mode
+        self.interval, self.token = interval, token
+
+    def allowed(self, headers) -> bool:
+        """헤더 트리거/트레이스 조회 권한. 토큰이 없으면 아무도 안 됨 (확률 샘플링만 동작)."""
+        given = headers.get("X-Profile-Token") or ""
+        return bool(self.token) and hmac.compare_digest(given.encode(), self.token.encode())
+
+    def start(self, headers, **meta):
+        """이 요청을 프로파일할지 정하고, 하면 Trace를 시작해 돌려준다."""
+        want = (headers.get("X-Profile") or "").strip().lower()
+        if want and want not in ("0", "off") and self.allowed(headers):
+            return Trace(want if want in ("sample", "cprofile") else self.mode, self.interval, dict(meta, reason="header"))
+        if self.sample_rate and random.random() < self.sample_rate:
+            return Trace(self.mode, self.interval, dict(meta, reason="sampled"))
+        return None
+
+    def finish(self, trace: Trace, **meta):
+        doc, artifacts = trace.stop(**meta)
+        try: self.store.put(doc, artifacts)
+        except OSError: pass       # 저장 실패(디스크 부족 등)가 응답 종료를 막지 않게
+        return doc
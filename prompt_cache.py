@@ -0,0 +1,118 @@
+# prompt_cache.py
+# -*- coding: utf-8 -*-
+# Gemini cachedContents 핸들 관리.
+# 고정된 system instruction((scenario, mode, role)별 프롬프트, 피드백 루브릭)을 서버 측 캐시로 한 번 올려 두고
+# generateContent 요청에는 핸들 이름(cachedContent)만 보낸다.
+#  - 생성/갱신은 요청 경로 밖(백그라운드)에서: 핸들이 준비되기 전이나 실패 시에는 인라인 프롬프트로 보낸다
+#  - 만료 refresh_margin초 전부터 TTL 연장(PATCH), 연장 실패 시 재생성
+#  - 생성 실패(최소 토큰 미달 등)는 retry_after초 동안 다시 시도하지 않는다
+#  - api_key는 클라이언트 X-API-Key일 수 있으므로 핸들/실패 기록은 최근 max_entries개까지만 (LRU, 버린 핸들은 서버 TTL로 만료)
+import threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PromptCache:
+    def __init__(self, client, ttl: int = 3600, refresh_margin: int = 300, retry_after: int = 600,
+                 min_tokens: int = 0, workers: int = 1, max_entries: int = 256):
+        self.client = client
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self._entries = OrderedDict()    # (prompt_key, api_key) -> {"name", "expires", "tokens"} (최근 사용 순)
+        self._blocked = OrderedDict()    # (prompt_key, api_key) -> 재시도 가능 시각 (기록 순)
+        self._busy = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prompt-cache")
+        self._stats = {"hits": 0, "misses": 0, "created": 0, "refreshed": 0, "failed": 0,
+                       "invalidated": 0, "skipped_small": 0, "tokens_saved": 0, "cached_requests": 0}
+
+    def handle(self, prompt_key, text: str, api_key: str, tokens: int = 0):
+        """사용 가능한 캐시 이름 또는 None(→ 인라인). 없거나 곧 만료되면 백그라운드 생성/갱신을 예약한다."""
+        k = (prompt_key, api_key)
+        now = time.time()
+        with self._lock:
+            e = self._entries.get(k)
+            if e and e["expires"] > now + 5:
+                self._stats["hits"] += 1
+                self._entries.move_to_end(k)
+                if e["expires"] - now < self.refresh_margin: self._spawn(k, text, e["name"])
+                return e["name"]
+            self._stats["misses"] += 1
+            if tokens and tokens < self.min_tokens:
+                self._stats["skipped_small"] += 1
+                return None
+            if self._blocked.get(k, 0) <= now: self._spawn(k, text, None)
+        return None
+
+    def invalidate(self, prompt_key, api_key: str):
+        # 서버가 핸들을 모른다고 할 때(만료/삭제) 호출 → 다음 요청부터 인라인 + 재생성
+        with self._lock:
+            if self._entries.pop((prompt_key, api_key), None): self._stats["invalidated"] += 1
+
+    def record(self, cached_tokens: int):
+        """핸들을 쓴 요청의 usageMetadata.cachedContentTokenCount 누적 (= 절약된 입력 토큰)."""
+        with self._lock:
+            self._stats["cached_requests"] += 1
+            self._stats["tokens_saved"] += int(cached_tokens or 0)
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), pending=len(self._busy), ttl=self.ttl,
+                        blocked=sum(1 for t in self._blocked.values() if t > now), min_tokens=self.min_tokens)
+
+    # ───── 내부 ─────
+    def _spawn(self, k, text, name):
+        # 잠금 보유 상태에서 호출
+        if k in self._busy: return
+        self._busy.add(k)
+        self._pool.submit(self._refresh, k, text, name)
+
+    def _refresh(self, k, text, name):
+        prompt_key, api_key = k
+        ttl = f"{self.ttl}s"
+        entry, extended = None, False
+        try:
+            if name:   # 기존 핸들 TTL 연장
+                r = self.client.resource("PATCH", name, api_key, {"ttl": ttl}, params={"updateMask": "ttl"})
+                if r.status_code == 200: entry, extended = {"name": name, "tokens": self._tokens(r)}, True
+            if entry is None:
+                r = self.client.resource("POST", "cachedContents", api_key, {
+                    "model": f"models/{self.client.model}",
+                    "displayName": "onair-" + "-".join(str(p) for p in prompt_key if p)[:100],
+                    "systemInstruction": {"parts": [{"text": text}]},
+                    "ttl": ttl,
+                })
+                if r.status_code == 200 and r.json().get("name"):
+                    entry = {"name": r.json()["name"], "tokens": self._tokens(r)}
+        except Exception:
+            entry = None
+        with self._lock:
+            self._busy.discard(k)
+            now = time.time()
+            if entry:
+                entry["expires"] = now + self.ttl
+                self._entries[k] = entry
+                self._entries.move_to_end(k)
+                while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+                self._blocked.pop(k, None)
+                self._stats["refreshed" if extended else "created"] += 1
+            else:
+                self._blocked.pop(k, None)
+                self._blocked[k] = now + self.retry_after
+                # 기록 순 = 만료 순 (retry_after 고정) → 앞에서부터 만료된 것과 넘친 것을 버린다
+                while self._blocked and (next(iter(self._blocked.values())) <= now
+                                         or len(self._blocked) > self.max_entries):
+                    self._blocked.popitem(last=False)
+                self._stats["failed"] += 1
+
+    @staticmethod
+    def _tokens(r) -> int:
+        try: return int((r.json().get("usageMetadata") or {}).get("totalTokenCount") or 0)
+        except ValueError: return 0
+
+    def close(self):
+        self._pool.shutdown(wait=False)
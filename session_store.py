@@ -0,0 +1,204 @@
+# session_store.py
+# -*- coding: utf-8 -*-
+# 시뮬레이션 세션 저장소.
+#  - MemorySessionStore : 단일 프로세스용. OrderedDict(LRU) + idle TTL + 최대 개수 제한
+#  - SQLiteSessionStore : gunicorn 멀티 워커 공유용. WAL 모드 + 세션별 임대(lease) 잠금
+# 공통 사용법:
+#     with store.session(sid) as sim:   # 세션별 잠금 + 로드, 블록 종료 시 저장
+#         ...
+import json, os, sqlite3, threading, time, uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class SessionBusy(Exception):
+    """같은 세션의 다른 요청이 잠금을 잡고 있어 제한 시간 내에 얻지 못함."""
+
+
+class _LocalLocks:
+    # 프로세스 내부 세션별 잠금 (SQLite 백엔드에서도 같은 워커의 스레드끼리는 DB 폴링 없이 직렬화)
+    # 잡고 있거나 기다리는 요청이 있는 동안만 항목을 두고, 마지막 요청이 놓을 때 지운다
+    # → 없는 세션 id를 마구 보내도, 세션이 만료/삭제돼도 잠금이 쌓이지 않는다
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}     # sid -> [Lock, 잡고 있거나 기다리는 요청 수]
+
+    @contextmanager
+    def hold(self, sid, timeout):
+        with self._guard:
+            ent = self._locks.get(sid)
+            if ent is None: ent = self._locks[sid] = [threading.Lock(), 0]
+            ent[1] += 1
+        try:
+            if not ent[0].acquire(timeout=timeout): raise SessionBusy(sid)
+            try:
+                yield
+            finally:
+                ent[0].release()
+        finally:
+            with self._guard:
+                ent[1] -= 1
+                if ent[1] == 0: del self._locks[sid]
+
+    def __len__(self):
+        return len(self._locks)
+
+
+class MemorySessionStore:
+    def __init__(self, ttl: float = 1800, max_sessions: int = 10000, lock_timeout: float = 30):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.lock_timeout = lock_timeout
+        self._data = OrderedDict()   # sid -> [sim, touched]  (touched 오름차순 유지)
+        self._lock = threading.Lock()
+        self._locks = _LocalLocks()
+        self._evicted = 0
+
+    def get(self, sid):
+        if not sid: return None
+        with self._lock:
+            item = self._data.get(sid)
+            if item is None: return None
+            if time.time() - item[1] > self.ttl:
+                self._drop(sid); return None
+            item[1] = time.time()
+            self._data.move_to_end(sid)
+            return item[0]
+
+    def put(self, sid, sim):
+        with self._lock:
+            self._data[sid] = [sim, time.time()]
+            self._data.move_to_end(sid)
+            self._evict()
+
+    def delete(self, sid):
+        with self._lock: self._drop(sid)
+
+    @contextmanager
+    def session(self, sid):
+        with self._locks.hold(sid, self.lock_timeout):
+            yield self.get(sid)   # 메모리 백엔드는 dict를 직접 수정하므로 별도 저장 불필요
+
+    def sweep(self):
+        with self._lock: self._evict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, sid):
+        return self.get(sid) is not None
+
+    def stats(self):
+        return {"backend": "memory", "sessions": len(self._data), "evicted": self._evicted, "locks": len(self._locks),
+                "ttl": self.ttl, "max_sessions": self.max_sessions}
+
+    # 가장 오래 안 쓴 세션이 항상 맨 앞이므로 앞에서부터만 보면 된다 (O(제거 개수))
+    def _evict(self):
+        cutoff = time.time() - self.ttl
+        while self._data:
+            sid, (_, touched) = next(iter(self._data.items()))
+            if touched >= cutoff and len(self._data) <= self.max_sessions: break
+            self._drop(sid)
+
+    def _drop(self, sid):
+        if self._data.pop(sid, None) is not None:
+            self._evicted += 1
+
+
+class SQLiteSessionStore:
+    def __init__(self, path: str, ttl: float = 1800, max_sessions: int = 100000,
+                 lock_timeout: float = 30, lease: float = 120, sweep_every: int = 200):
+        self.path = path
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.lock_timeout = lock_timeout
+        self.lease = lease              # 워커가 죽어도 잠금이 영구히 남지 않도록 임대 만료
+        self.sweep_every = sweep_every
+        self._tls = threading.local()
+        self._locks = _LocalLocks()
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._puts = 0
+        self._evicted = 0
+        with self._conn() as c:
+            c.execute("CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, touched REAL NOT NULL)")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_touched ON sessions(touched)")
+            c.execute("CREATE TABLE IF NOT EXISTS session_locks (sid TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+
+    def _conn(self):
+        c = getattr(self._tls, "conn", None)
+        if c is None or getattr(self._tls, "pid", None) != os.getpid():   # fork 이후엔 새 연결
+            c = sqlite3.connect(self.path, timeout=self.lock_timeout, isolation_level=None,
+                                check_same_thread=False)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            self._tls.conn, self._tls.pid = c, os.getpid()
+        return c
+
+    def get(self, sid):
+        if not sid: return None
+        row = self._conn().execute("SELECT data, touched FROM sessions WHERE sid=?", (sid,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl: return None
+        return json.loads(row[0])
+
+    def put(self, sid, sim):
+        self._conn().execute("INSERT OR REPLACE INTO sessions (sid, data, touched) VALUES (?, ?, ?)",
+                             (sid, json.dumps(sim, ensure_ascii=False), time.time()))
+        self._puts += 1
+        if self._puts % self.sweep_every == 0: self.sweep()
+
+    def delete(self, sid):
+        self._conn().execute("DELETE FROM sessions WHERE sid=?", (sid,))
+
+    @contextmanager
+    def session(self, sid):
+        with self._locks.hold(sid, self.lock_timeout):
+            self._acquire_lease(sid)
+            try:
+                sim = self.get(sid)
+                yield sim
+                if sim is not None: self.put(sid, sim)
+            finally:
+                self._conn().execute("DELETE FROM session_locks WHERE sid=? AND owner=?", (sid, self._owner))
+
+    def _acquire_lease(self, sid):
+        deadline = time.time() + self.lock_timeout
+        delay = 0.002
+        while True:
+            now = time.time()
+            cur = self._conn().execute(
+                "INSERT INTO session_locks (sid, owner, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(sid) DO UPDATE SET owner=excluded.owner, expires=excluded.expires "
+                "WHERE session_locks.expires < ?", (sid, self._owner, now + self.lease, now))
+            if cur.rowcount == 1: return
+            if now >= deadline: raise SessionBusy(sid)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def sweep(self):
+        c = self._conn()
+        now = time.time()
+        n = c.execute("DELETE FROM sessions WHERE touched < ?", (now - self.ttl,)).rowcount
+        over = c.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - self.max_sessions
+        if over > 0:
+            n += c.execute("DELETE FROM sessions WHERE sid IN (SELECT sid FROM sessions ORDER BY touched LIMIT ?)",
+                           (over,)).rowcount
+        c.execute("DELETE FROM session_locks WHERE expires < ?", (now,))
+        self._evicted += n
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def __contains__(self, sid):
+        return self.get(sid) is not None
+
+    def stats(self):
+        return {"backend": "sqlite", "path": self.path, "sessions": len(self), "evicted": self._evicted,
+                "locks": len(self._locks),
+                "ttl": self.ttl, "max_sessions": self.max_sessions}
+
+
+def make_session_store(backend: str = "memory", **kw):
+    if backend == "sqlite":
+        return SQLiteSessionStore(kw.pop("path", "sessions.db"), **kw)
+    kw.pop("path", None)
+    return MemorySessionStore(**kw)
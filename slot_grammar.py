@@ -0,0 +1,209 @@
+# slot_grammar.py
+# -*- coding: utf-8 -*-
+# 규칙엔진용 슬롯 추출기.
+# 시나리오별 슬롯 표(SLOT_TABLE)를 시작 시 한 번 컴파일해서
+#  - 키워드 슬롯: 모든 키워드를 하나의 다중 패턴 매처로 한 번에 스캔 (겹치는 키워드까지 모두 보고)
+#  - 정규식 슬롯: 미리 컴파일한 패턴
+# 으로 추출한다. 같은 슬롯에 여러 키워드가 걸리면 표에 먼저 적힌 키워드가 이긴다.
+# 정규식 슬롯에 reject가 있으면 그 단어들과 이 시나리오의 키워드는 값으로 받지 않고 다음 매치를 본다
+# (예: "상담입니다"의 "상담"은 이름이 아님).
+import re
+
+TEXT = "$TEXT"   # 값 = 입력 문장 앞 80자 (사유/문의 내용 등)
+KW = "$KW"       # 값 = 매칭된 키워드 자체
+
+_NAME = (r"(?:저는|제 이름은|이름은|예약자는?|수령인은?|성함은)\s*"
+         r"([가-힣]{2,4}?)(?=\s*(?:입니다|이에요|예요|이고|이요|요)|[^가-힣]|$)|"  # 뒤 조사/어미는 이름에서 뺀다
+         r"([가-힣]{2,4})\s*(?:입니다|이에요|예요)\b")
+# "○○입니다" 꼴로 자주 오지만 이름이 아닌 말
+_NAME_STOP = ["고객", "환자", "학생", "본인", "직원", "회사원", "처음", "다음", "문의", "예약", "주문", "배송", "교환",
+              "반품", "변경", "취소", "확인", "부탁", "감사", "괜찮", "맞습", "네네", "그거", "이거", "저거", "제가"]
+_DATE = r"\d{1,2}\s*월\s*\d{1,2}\s*일|\d{1,2}[./-]\d{1,2}(?![\d.])"
+_TIME = r"(?:오전|오후)?\s*\d{1,2}\s*시(?:\s*\d{1,2}\s*분|\s*반)?|\d{1,2}:\d{2}"
+_DAY_WORDS = [("오늘", KW), ("내일", KW), ("모레", KW), ("이번 주", KW), ("다음 주", KW), ("주말", KW)]
+_ISSUE_WORDS = [(k, TEXT) for k in ["오염", "파손", "불량", "색상", "사이즈", "교환", "반품", "작다", "크다"]]
+
+# 시나리오 → needed(질문 순서), prefix(규칙엔진 응답 머리말), slots(추출 규칙; 순서 = 결과 dict 순서)
+SLOT_TABLE = {
+    "exchange": {
+        "needed": ["product", "order_number", "issue", "size_dir", "unopened"],
+        "prefix": "교환 요청 계속 도와드릴게요.",
+        "slots": {
+            "order_number": {"regex": r"(\d{6,})"},
+            "unopened": {"keywords": [("미개봉", True), ("개봉", False)]},
+            "size_dir": {"keywords": [("한 사이즈 크", "up"), ("크게", "up"), ("업", "up"),
+                                      ("한 사이즈 작", "down"), ("작게", "down"), ("다운", "down")]},
+            "issue": {"keywords": _ISSUE_WORDS},
+            "product": {"regex": r"[\"“]?([가-힣A-Za-z0-9\-\_\s]{2,20})[\"”]?", "reject_digits": True},
+        },
+    },
+    "inquiry": {
+        "needed": ["product", "issue"],
+        "prefix": "문의 내용 계속 도와드릴게요.",
+        "slots": {
+            "order_number": {"regex": r"(\d{6,})"},
+            "issue": {"keywords": [(k, TEXT) for k in ["문의", "궁금", "사용법", "재고", "가격", "사이즈", "색상", "불량", "작동"]]},
+            "product": {"regex": r"[\"“]?([가-힣A-Za-z0-9\-\_\s]{2,20})[\"”]?", "reject_digits": True},
+        },
+    },
+    "order": {
+        "needed": ["order_number", "product"],
+        "prefix": "주문 제작 확인 계속 도와드릴게요.",
+        "slots": {
+            "order_number": {"regex": r"(\d{6,})"},
+            "issue": {"keywords": [(k, TEXT) for k in ["제작", "진행", "언제", "변경", "취소", "각인", "옵션"]]},
+            "product": {"regex": r"[\"“]?([가-힣A-Za-z0-9\-\_\s]{2,20})[\"”]?", "reject_digits": True},
+        },
+    },
+    "shipping": {
+        "needed": ["order_number", "issue"],
+        "prefix": "배송 문의 계속 도와드릴게요.",
+        "slots": {
+            "order_number": {"regex": r"(\d{6,})"},
+            "carrier": {"keywords": [("CJ", "CJ대한통운"), ("대한통운", "CJ대한통운"), ("한진", "한진택배"),
+                                     ("롯데", "롯데택배"), ("우체국", "우체국택배"), ("로젠", "로젠택배")]},
+            "issue": {"keywords": [(k, TEXT) for k in ["배송", "도착", "안 와", "안와", "누락", "분실", "파손", "조회", "송장"]]},
+        },
+    },
+    "shipping_delay": {
+        "needed": ["order_number", "name", "issue"],
+        "prefix": "배송 지연 건 계속 확인해 드릴게요.",
+        "slots": {
+            "order_number": {"regex": r"(\d{6,})"},
+            "name": {"regex": _NAME, "reject": _NAME_STOP},
+            "issue": {"keywords": [(k, TEXT) for k in ["지연", "늦", "안 와", "안와", "언제", "도착", "환불", "재발송"]]},
+        },
+    },
+    "reschedule": {
+        "needed": ["name", "date", "time"],
+        "prefix": "예약 변경 계속 도와드릴게요.",
+        "slots": {
+            "name": {"regex": _NAME, "reject": _NAME_STOP},
+            "reservation_number": {"regex": r"(\d{6,})"},
+            "date": {"regex": _DATE, "keywords": _DAY_WORDS},
+            "time": {"regex": _TIME},
+        },
+    },
+    "consult": {
+        "needed": ["name", "date", "time"],
+        "prefix": "상담 예약 계속 도와드릴게요.",
+        "slots": {
+            "name": {"regex": _NAME, "reject": _NAME_STOP},
+            "date": {"regex": _DATE, "keywords": _DAY_WORDS},
+            "time": {"regex": _TIME},
+            "issue": {"keywords": [(k, TEXT) for k in ["진료", "상담", "검사", "통증", "처방", "초진", "재진"]]},
+        },
+    },
+    "make_appointment": {
+        "needed": ["date", "time", "place"],
+        "prefix": "약속 정리 계속 도와드릴게요.",
+        "slots": {
+            "date": {"regex": _DATE, "keywords": _DAY_WORDS},
+            "time": {"regex": _TIME},
+            # 한 글자 장소(역/집)는 조사·"앞"이 붙은 꼴만 (역시/집중 같은 말에 걸리지 않게)
+            "place": {"keywords": [(k, KW) for k in ["카페", "식당", "학교", "회사", "공원", "도서관", "영화관"]]
+                                  + [(w + tail, w) for w in ("역", "집")
+                                     for tail in ("에서", "으로", "에", " 앞", "앞", "이요", "이에요")]},
+        },
+    },
+}
+DEFAULT_SCENARIO = "exchange"
+
+
+def _trie_pattern(words) -> str:
+    # 공통 접두사를 묶은 정규식 (예: 작게|작다 → 작(?:게|다)). 분기 수가 줄어 스캔이 빨라지고,
+    # 접두사 관계인 키워드는 긴 쪽이 먼저 매칭된다.
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w: node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        alts = [re.escape(ch) + build(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts: return ""
+        body = alts[0] if len(alts) == 1 else f"(?:{'|'.join(alts)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordAutomaton:
+    """키워드 → payload 다중 패턴 매처. 결과는 `kw in text`를 키워드마다 따로 검사한 것과 같다.
+    - 모든 키워드를 접두사 트라이 모양의 정규식 하나로 컴파일해 C 정규식 엔진으로 한 번만 스캔
+    - 매칭된 키워드 안에 포함된 다른 키워드(예: 미개봉 ⊃ 개봉)는 미리 계산한 표로 함께 보고
+    - 매칭 끝부분에 걸쳐 시작하는 키워드(예: 크다|다운)만 따로 확인"""
+
+    def __init__(self, patterns):
+        payloads = {}
+        for kw, payload in patterns:
+            if kw: payloads.setdefault(kw, []).append(payload)
+        kws = list(payloads)
+        self._rx = re.compile(_trie_pattern(kws)) if kws else None
+        self._hits = {k: [(c, p) for c in kws if c in k for p in payloads[c]] for k in kws}   # k에 포함된 키워드들
+        # k의 진접미사로 시작하는(= k와 일부만 겹칠 수 있는) 키워드
+        self._straddle = {k: tuple(c for c in kws if c not in k and
+                                   any(c.startswith(k[i:]) for i in range(1, len(k))))
+                          for k in kws}
+        self._straddle = {k: v for k, v in self._straddle.items() if v}
+
+    def matches(self, text: str) -> list:
+        """[(키워드, payload)]. 같은 키워드가 중복될 수 있다."""
+        if self._rx is None: return []
+        hits = self._hits
+        found = self._rx.findall(text)
+        out = [h for kw in found for h in hits[kw]]
+        if self._straddle:
+            extra = {c for kw in found for c in self._straddle.get(kw, ())}
+            for c in extra:
+                if c in text: out += hits[c]
+        return out
+
+
+class SlotGrammar:
+    def __init__(self, spec: dict):
+        self.needed = list(spec.get("needed", []))
+        self.prefix = spec.get("prefix", "")
+        self.order = list(spec["slots"])
+        patterns, self._regex = [], []
+        for slot, rule in spec["slots"].items():
+            for prio, (kw, value) in enumerate(rule.get("keywords", [])):
+                patterns.append((kw, (slot, prio, value)))
+            if rule.get("regex"):
+                rx = re.compile(rule["regex"])
+                reject = frozenset(rule["reject"]) if "reject" in rule else None
+                self._regex.append((slot, rx, rx.groups > 0, rule.get("reject_digits", False), reject))
+        keywords = {kw for rule in spec["slots"].values() for kw, _ in rule.get("keywords", [])}
+        self._regex = [(slot, rx, grouped, digits, reject | keywords if reject is not None else None)
+                       for slot, rx, grouped, digits, reject in self._regex]
+        self._kw = KeywordAutomaton(patterns)
+
+    def extract(self, text: str) -> dict:
+        if not text: return {}
+        t = text.strip()
+        best = {}   # slot -> (우선순위, 값). 정규식(-1)이 키워드보다, 표에서 앞선 키워드가 뒤의 것보다 우선
+        for slot, rx, grouped, reject_digits, reject in self._regex:
+            for m in (rx.finditer(t) if reject else (rx.search(t),)):
+                if m is None: break
+                val = (next((g for g in m.groups() if g), "") if grouped else m.group(0)).strip()
+                if len(val) < 2 or (reject_digits and val.isdigit()): break
+                if reject and val in reject: continue
+                best[slot] = (-1, val)
+                break
+        for kw, (slot, prio, value) in self._kw.matches(t):
+            cur = best.get(slot)
+            if cur is None or prio < cur[0]:
+                best[slot] = (prio, t[:80] if value == TEXT else kw if value == KW else value)
+        if not best: return {}
+        return {slot: best[slot][1] for slot in self.order if slot in best}
+
+    def extract_batch(self, texts) -> list:
+        extract = self.extract
+        return [extract(t) for t in texts]
+
+
+GRAMMARS = {name: SlotGrammar(spec) for name, spec in SLOT_TABLE.items()}
+
+
+def grammar_for(scenario: str) -> SlotGrammar:
+    return GRAMMARS.get(scenario) or GRAMMARS[DEFAULT_SCENARIO]
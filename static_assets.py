@@ -0,0 +1,187 @@
+# static_assets.py
+# -*- coding: utf-8 -*-
+# 정적 파일 빌드(지문 + 사전 압축)와 서빙.
+#  - build: static/ → static_dist/
+#      내용 해시를 넣은 이름(styles/main.css → styles/main.<hash10>.css)으로 복사하고,
+#      텍스트 계열(css/js/svg/json/ico/txt/map)은 .gz(+ brotli 모듈이 있으면 .br)를 미리 만들어 둔다.
+#      CSS 안의 url(...)도 지문 이름으로 바꾼 뒤 해시하므로 이미지가 바뀌면 CSS 이름도 바뀐다.
+#      해시 이름 파일은 내용이 같으면 다시 쓰지 않고, 이전 빌드 파일도 남겨 둔다(배포 중 옛 HTML 대응, --prune으로 정리)
+#  - install(app): manifest.json이 있을 때만 동작 (없으면 개발 모드 그대로)
+#      url_for('static', filename=...) → 지문 이름 (app.url_defaults)
+#      지문 파일: Cache-Control immutable 1년, Accept-Encoding에 맞춰 .br/.gz, 강한 ETag = 내용 해시,
+#      Range/206 (If-Range 포함, 파일은 요청 구간만 읽는다)
+#      그 밖의 파일(원래 이름)은 기존 static 뷰 그대로(no-cache 재검증) + Accept-Ranges
+#
+#   python static_assets.py [--src static] [--out static_dist] [--prune]
+import argparse, gzip, hashlib, json, logging, mimetypes, os, re
+
+try:
+    import brotli      # 선택 의존성: 없으면 .br 생략
+except ImportError:
+    brotli = None
+
+log = logging.getLogger("onair")
+
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".ico", ".txt", ".map", ".html")
+MIN_COMPRESS_BYTES = 512
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MANIFEST = "manifest.json"
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _hashed_name(rel: str, digest: str) -> str:
+    base, ext = os.path.splitext(rel)
+    return f"{base}.{digest}{ext}"
+
+
+def _rewrite_css(css: str, rel: str, files: dict) -> str:
+    """CSS 안의 정적 경로(절대 /static/... 또는 상대 경로)를 지문 이름으로 바꾼다."""
+    here = os.path.dirname(rel)
+
+    def sub(m):
+        quote, url = m.group(1), m.group(2).strip()
+        if url.startswith(("data:", "http:", "https:", "//", "#")): return m.group(0)
+        path, tail = re.match(r"([^?#]*)(.*)", url).groups()
+        if path.startswith("/static/"):
+            target = files.get(path[len("/static/"):])
+            new = "/static/" + target if target else None
+        else:
+            target = files.get(os.path.normpath(os.path.join(here, path)).replace(os.sep, "/"))
+            new = os.path.relpath(target, here or ".").replace(os.sep, "/") if target else None
+        return f"url({quote}{new}{tail}{quote})" if new else m.group(0)
+    return _CSS_URL.sub(sub, css)
+
+
+def _write(path: str, data: bytes):
+    if os.path.exists(path): return False       # 해시 이름 = 내용, 이미 있으면 같은 파일
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f: f.write(data)
+    os.replace(tmp, path)
+    return True
+
+
+def build(src: str, out: str, prune: bool = False) -> dict:
+    rels = sorted(os.path.relpath(os.path.join(d, f), src).replace(os.sep, "/")
+                  for d, _, fs in os.walk(src) for f in fs if not f.startswith("."))
+    files, entries, stats = {}, {}, {"files": 0, "written": 0, "bytes": 0, "gz_bytes": 0, "br_bytes": 0}
+    previous = {}
+    if not prune:
+        # 이전 빌드 항목은 서빙 목록에 남긴다 (옛 HTML이 가리키는 지문 이름)
+        try:
+            with open(os.path.join(out, MANIFEST), encoding="utf-8") as f: previous = json.load(f)["entries"]
+        except (OSError, ValueError, KeyError):
+            pass
+    # CSS는 참조 대상의 지문 이름이 정해진 뒤 처리
+    for rel in sorted(rels, key=lambda r: r.endswith(".css")):
+        with open(os.path.join(src, rel), "rb") as f: data = f.read()
+        if rel.endswith(".css"):
+            data = _rewrite_css(data.decode("utf-8"), rel, files).encode("utf-8")
+        digest = _hash(data)
+        name = files[rel] = _hashed_name(rel, digest)
+        dst = os.path.join(out, name)
+        stats["written"] += _write(dst, data)
+        encodings = []
+        if rel.lower().endswith(COMPRESSIBLE) and len(data) >= MIN_COMPRESS_BYTES:
+            variants = [("gzip", ".gz", lambda d: gzip.compress(d, 9, mtime=0))]
+            if brotli: variants.insert(0, ("br", ".br", lambda d: brotli.compress(d, quality=11)))
+            for enc, ext, fn in variants:
+                if os.path.exists(dst + ext):
+                    size = os.path.getsize(dst + ext)
+                else:
+                    packed = fn(data)
+                    if len(packed) > len(data) * 0.9: continue      # 거의 안 줄면 원본만
+                    _write(dst + ext, packed); size = len(packed)
+                encodings.append(enc)
+                stats["gz_bytes" if enc == "gzip" else "br_bytes"] += size
+        entries[name] = {"src": rel, "etag": digest, "size": len(data), "encodings": encodings}
+        stats["files"] += 1
+        stats["bytes"] += len(data)
+
+    previous = {n: e for n, e in previous.items() if n not in entries and os.path.exists(os.path.join(out, n))}
+    manifest = {"files": files, "entries": dict(previous, **entries)}
+    tmp = os.path.join(out, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f: json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(out, MANIFEST))
+    if prune:
+        keep = {os.path.normpath(os.path.join(out, n + ext)) for n in entries for ext in ("", ".gz", ".br")}
+        keep.add(os.path.normpath(os.path.join(out, MANIFEST)))
+        for d, _, fs in os.walk(out):
+            for f in fs:
+                p = os.path.normpath(os.path.join(d, f))
+                if p not in keep: os.remove(p); stats["pruned"] = stats.get("pruned", 0) + 1
+    return stats
+
+
+class StaticAssets:
+    def __init__(self, dist_dir: str):
+        self.dist_dir = dist_dir
+        with open(os.path.join(dist_dir, MANIFEST), encoding="utf-8") as f: m = json.load(f)
+        self.files, self.entries = m["files"], m["entries"]
+        self._stats = {"hashed": 0, "br": 0, "gzip": 0, "fallback": 0}
+
+    def url_defaults(self, endpoint, values):
+        if endpoint == "static":
+            name = self.files.get(values.get("filename"))
+            if name: values["filename"] = name
+
+    def serve(self, filename, fallback):
+        from flask import request, send_file
+        entry = self.entries.get(filename)
+        if entry is None:
+            self._stats["fallback"] += 1
+            rv = fallback(filename=filename)
+            rv.headers.setdefault("Accept-Ranges", "bytes")
+            return rv
+        self._stats["hashed"] += 1
+        path, enc = os.path.join(self.dist_dir, filename), None
+        for e in entry["encodings"]:     # br 우선 (빌드 순서)
+            if request.accept_encodings[e]:
+                path, enc = path + (".br" if e == "br" else ".gz"), e
+                self._stats[e] += 1
+                break
+        mimetype = mimetypes.guess_type(entry["src"])[0] or "application/octet-stream"
+        rv = send_file(path, mimetype=mimetype, conditional=True, etag=entry["etag"] + (f"-{enc}" if enc else ""),
+                       download_name=os.path.basename(filename), max_age=IMMUTABLE_MAX_AGE)
+        rv.cache_control.public = True
+        rv.cache_control.immutable = True
+        rv.headers["Accept-Ranges"] = "bytes"
+        if entry["encodings"]: rv.vary.add("Accept-Encoding")
+        if enc: rv.headers["Content-Encoding"] = enc
+        return rv
+
+    def stats(self) -> dict:
+        return dict(self._stats, dist_dir=self.dist_dir, assets=len(self.entries))
+
+
+def install(app, dist_dir: str):
+    """manifest가 있으면 지문 URL/서빙을 켜고 StaticAssets를, 없으면 None을 돌려준다."""
+    if not os.path.exists(os.path.join(dist_dir, MANIFEST)):
+        return None
+    assets = StaticAssets(dist_dir)
+    app.url_defaults(assets.url_defaults)
+    fallback = app.view_functions["static"]
+    app.view_functions["static"] = lambda filename: assets.serve(filename, fallback)
+    log.info("static: %d fingerprinted assets from %s", len(assets.entries), dist_dir)
+    return assets
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", default=os.path.join(here, "static"))
+    ap.add_argument("--out", default=os.path.join(here, "static_dist"))
+    ap.add_argument("--prune", action="store_true", help="현재 manifest에 없는 이전 빌드 파일 삭제")
+    a = ap.parse_args()
+    s = build(a.src, a.out, a.prune)
+    print(f"{s['files']} files ({s['bytes'] / 1e6:.1f} MB), {s['written']} written, "
+          f"gzip {s['gz_bytes'] / 1e3:.0f} KB, br {s['br_bytes'] / 1e3:.0f} KB" + ("" if brotli else " (brotli 미설치)")
+          + (f", pruned {s['pruned']}" if s.get("pruned") else ""))
+
+
+if __name__ == "__main__":
+    main()
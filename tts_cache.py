@@ -0,0 +1,183 @@
+# tts_cache.py
+# -*- coding: utf-8 -*-
+# TTS 결과(mp3 bytes) 캐시. 키 = sha256(lang + 정규화된 텍스트)
+#  - 메모리 LRU: 바이트 예산 초과 시 가장 오래 안 쓴 항목부터 제거
+#  - 디스크: <dir>/<key[:2]>/<key>.mp3, 총 용량 초과 시 mtime 오래된 파일부터 제거
+import hashlib, os, re, threading, time, unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+class TTSCache:
+    def __init__(self, mem_budget: int = 32 << 20, disk_dir: str = None, disk_budget: int = 256 << 20):
+        self.mem_budget = mem_budget
+        self.disk_dir = disk_dir
+        self.disk_budget = disk_budget
+        self._mem = OrderedDict()
+        self._mem_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.observe = None     # (kind "mp3"|"stream", 초, 성공 여부) → 합성 지연 외부 집계용
+        self._stats = {"mem_hits": 0, "disk_hits": 0, "misses": 0, "synth_errors": 0,
+                       "mem_evictions": 0, "disk_evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(os.path.getsize(p) for p in self._disk_files())
+
+    @staticmethod
+    def key(text: str, lang: str = "ko") -> str:
+        return hashlib.sha256(f"{lang}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    # ───── 조회/저장 ─────
+    def get(self, key: str):
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self._stats["mem_hits"] += 1
+                return data
+        data = self._disk_get(key)
+        if data is not None:
+            with self._lock: self._stats["disk_hits"] += 1
+            self._mem_put(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        self._mem_put(key, data)
+        self._disk_put(key, data)
+
+    def get_or_create(self, text: str, lang: str, synth):
+        """(key, mp3 bytes). 같은 키를 동시에 요청하면 합성은 한 번만 수행한다."""
+        key = self.key(text, lang)
+        data = self.get(key)
+        if data is not None: return key, data
+        with self._lock:
+            ev = self._inflight.get(key)
+            leader = ev is None
+            if leader:
+                ev = self._inflight[key] = threading.Event()
+                self._stats["misses"] += 1
+        if not leader:
+            ev.wait()
+            data = self.get(key)
+            if data is not None: return key, data
+            return key, synth(normalize_text(text), lang)   # 선행 합성이 실패한 경우
+        t0 = time.perf_counter()
+        try:
+            data = synth(normalize_text(text), lang)
+            self._observe("mp3", t0, True)
+            self.put(key, data)
+            return key, data
+        except Exception:
+            self._observe("mp3", t0, False)
+            with self._lock: self._stats["synth_errors"] += 1
+            raise
+        finally:
+            with self._lock: self._inflight.pop(key, None)
+            ev.set()
+
+    def stream_through(self, key: str, chunks):
+        """합성 청크를 받는 대로 흘려보내고, 끝까지 받았을 때만 캐시에 저장한다."""
+        with self._lock: self._stats["misses"] += 1
+        buf, t0 = [], time.perf_counter()
+        try:
+            for c in chunks:
+                buf.append(c)
+                yield c
+        except Exception:
+            self._observe("stream", t0, False)
+            with self._lock: self._stats["synth_errors"] += 1
+            raise
+        self._observe("stream", t0, True)
+        self.put(key, b"".join(buf))
+
+    def _observe(self, kind, t0, ok):
+        if self.observe: self.observe(kind, time.perf_counter() - t0, ok)
+
+    def prewarm(self, texts, lang: str, synth, log=None):
+        done = 0
+        for t in texts:
+            try:
+                self.get_or_create(t, lang, synth); done += 1
+            except Exception as e:
+                if log: log.warning(f"[TTS prewarm] {t[:20]}… 실패: {e}")
+        return done
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s.update(mem_items=len(self._mem), mem_bytes=self._mem_bytes, mem_budget=self.mem_budget,
+                     disk_bytes=self._disk_bytes, disk_budget=self.disk_budget if self.disk_dir else 0)
+        lookups = s["mem_hits"] + s["disk_hits"] + s["misses"]
+        s["hit_ratio"] = round((s["mem_hits"] + s["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return s
+
+    # ───── 메모리 계층 ─────
+    def _mem_put(self, key, data):
+        if len(data) > self.mem_budget: return
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None: self._mem_bytes -= len(old)
+            self._mem[key] = data
+            self._mem_bytes += len(data)
+            while self._mem_bytes > self.mem_budget:
+                _, ev = self._mem.popitem(last=False)
+                self._mem_bytes -= len(ev)
+                self._stats["mem_evictions"] += 1
+
+    # ───── 디스크 계층 ─────
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.mp3")
+
+    def _disk_files(self):
+        for root, _, files in os.walk(self.disk_dir):
+            for f in files:
+                if f.endswith(".mp3"): yield os.path.join(root, f)
+
+    def _disk_get(self, key):
+        if not self.disk_dir: return None
+        p = self._path(key)
+        try:
+            with open(p, "rb") as f: data = f.read()
+            os.utime(p)   # LRU 근사: 최근 사용 파일의 mtime 갱신
+            return data
+        except OSError:
+            return None
+
+    def _disk_put(self, key, data):
+        if not self.disk_dir: return
+        p = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(p), exist_ok=True)
+            tmp = f"{p}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f: f.write(data)
+            existed = os.path.exists(p)
+            old = os.path.getsize(p) if existed else 0
+            os.replace(tmp, p)   # 워커 간 경쟁에도 부분 파일이 보이지 않도록 원자적 교체
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes += len(data) - old
+            over = self._disk_bytes > self.disk_budget
+        if over: self._disk_evict()
+
+    def _disk_evict(self):
+        files = []
+        for p in self._disk_files():
+            try: st = os.stat(p)
+            except OSError: continue
+            files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        total = sum(f[1] for f in files)
+        target = int(self.disk_budget * 0.9)
+        for _, size, p in files:
+            if total <= target: break
+            try: os.remove(p)
+            except OSError: continue
+            total -= size
+            with self._lock: self._stats["disk_evictions"] += 1
+        with self._lock: self._disk_bytes = total